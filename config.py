@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -33,14 +34,97 @@ TESTING = os.getenv('TESTING', 'False').lower() == 'true'
 
 # Ollama settings
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+# Comma-separated pool of inference hosts; defaults to the single base URL
+OLLAMA_BASE_URLS = [u.strip() for u in os.getenv('OLLAMA_BASE_URLS', OLLAMA_BASE_URL).split(',') if u.strip()]
+OLLAMA_BACKEND_FAILURE_THRESHOLD = int(os.getenv('OLLAMA_BACKEND_FAILURE_THRESHOLD', 3))
+OLLAMA_BACKEND_BACKOFF = float(os.getenv('OLLAMA_BACKEND_BACKOFF', 5))
+OLLAMA_BACKEND_MAX_BACKOFF = float(os.getenv('OLLAMA_BACKEND_MAX_BACKOFF', 300))
+OLLAMA_HEALTH_INTERVAL = float(os.getenv('OLLAMA_HEALTH_INTERVAL', 15))
+
+# Admission control: interactive > query > extraction > embedding
+OLLAMA_MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', 4))
+OLLAMA_INTERACTIVE_RESERVED = int(os.getenv('OLLAMA_INTERACTIVE_RESERVED', 1))
+OLLAMA_CLASS_LIMITS = {
+    'interactive': int(os.getenv('OLLAMA_LIMIT_INTERACTIVE', 4)),
+    'query': int(os.getenv('OLLAMA_LIMIT_QUERY', 2)),
+    'extraction': int(os.getenv('OLLAMA_LIMIT_EXTRACTION', 1)),
+    'embedding': int(os.getenv('OLLAMA_LIMIT_EMBEDDING', 2)),
+}
+OLLAMA_ADMISSION_TIMEOUT = float(os.getenv('OLLAMA_ADMISSION_TIMEOUT', 120))
+
+# Tail latency: read deadline for non-streaming calls, circuit breaker and hedging
+OLLAMA_GENERATE_TIMEOUT = float(os.getenv('OLLAMA_GENERATE_TIMEOUT', 120))
+OLLAMA_BREAKER_THRESHOLD = int(os.getenv('OLLAMA_BREAKER_THRESHOLD', 5))
+OLLAMA_BREAKER_RESET = float(os.getenv('OLLAMA_BREAKER_RESET', 30))
+OLLAMA_HEDGE_MAX_PROMPT_CHARS = int(os.getenv('OLLAMA_HEDGE_MAX_PROMPT_CHARS', 0))  # 0 disables hedging
+OLLAMA_HEDGE_MIN_SAMPLES = int(os.getenv('OLLAMA_HEDGE_MIN_SAMPLES', 20))
+
 MODEL_NAME = os.getenv('MODEL_NAME', 'gemma3:12b-it-qat')
+SUMMARIZE_MODEL_NAME = os.getenv('SUMMARIZE_MODEL_NAME', 'phi3:mini')
+# Per-model settings as JSON, e.g. {"phi3:mini": {"min_p": 0.05}} and {"phi3:mini": 2}
+MODEL_OPTIONS = json.loads(os.getenv('MODEL_OPTIONS', '{}'))
+MODEL_MAX_CONCURRENCY = json.loads(os.getenv('MODEL_MAX_CONCURRENCY', '{}'))
 MAX_CONVERSATION_HISTORY = int(os.getenv('MAX_CONVERSATION_HISTORY', 10))
+# Tokens of history kept per session; 0 derives it from NUM_CTX, MAX_TOKENS and the system prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 0))
+# Conversation session store: LRU-evicted past these caps, expired when idle
+SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', 10000))
+SESSION_MAX_MB = int(os.getenv('SESSION_MAX_MB', 64))
+SESSION_IDLE_TTL_HOURS = float(os.getenv('SESSION_IDLE_TTL_HOURS', 24))
+# Conversation persistence: 'memory' (per process) or 'sqlite' (shared by all workers)
+CONVERSATION_BACKEND = os.getenv('CONVERSATION_BACKEND', 'memory').lower()
+CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH', None)
+CONVERSATION_FLUSH_MS = int(os.getenv('CONVERSATION_FLUSH_MS', 50))
+# Summarize turns trimmed from long conversations with SUMMARIZE_MODEL_NAME
+CONVERSATION_SUMMARY_ENABLED = os.getenv('CONVERSATION_SUMMARY_ENABLED', 'True').lower() == 'true'
+CONVERSATION_SUMMARY_MAX_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_MAX_TOKENS', 256))
+# Model tokenizer.json for exact token counts (needs the tokenizers package)
+TOKENIZER_PATH = os.getenv('TOKENIZER_PATH', None)
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv('TOKEN_COUNT_CACHE_SIZE', 4096))
+# Learn chars-per-token per model from Ollama's eval counts (used when no tokenizer is set)
+TOKEN_CALIBRATION_ENABLED = os.getenv('TOKEN_CALIBRATION_ENABLED', 'True').lower() == 'true'
+TOKEN_CALIBRATION_PATH = os.getenv('TOKEN_CALIBRATION_PATH', None)
+TOKEN_CALIBRATION_MIN_SAMPLES = int(os.getenv('TOKEN_CALIBRATION_MIN_SAMPLES', 20))
+# Documents kept for incremental /tokens counting (least recently used are dropped)
+TOKEN_DOCUMENTS_MAX = int(os.getenv('TOKEN_DOCUMENTS_MAX', 1000))
+# /api/chat/batch limits
+CHAT_BATCH_MAX_ITEMS = int(os.getenv('CHAT_BATCH_MAX_ITEMS', 500))
+CHAT_BATCH_CONCURRENCY = int(os.getenv('CHAT_BATCH_CONCURRENCY', 4))
+# Resumable parse streams: frames kept per generation, how long after the end,
+# and how long a generation runs with no client before it is cancelled
+RESUME_BUFFER_FRAMES = int(os.getenv('RESUME_BUFFER_FRAMES', 4096))
+RESUME_BUFFER_TTL = float(os.getenv('RESUME_BUFFER_TTL', 300))
+RESUME_ABANDON_SECONDS = float(os.getenv('RESUME_ABANDON_SECONDS', 60))
+# Semantic answer cache for /api/chat/stream (without a session) and /api/parse/stream:
+# prompts whose embedding is at least this similar to a cached one replay its answer
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'False').lower() == 'true'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 2048))
+SEMANTIC_CACHE_TTL_HOURS = float(os.getenv('SEMANTIC_CACHE_TTL_HOURS', 24))
+# Seconds a lookup waits to embed the prompt before treating it as a miss
+SEMANTIC_CACHE_EMBED_TIMEOUT = float(os.getenv('SEMANTIC_CACHE_EMBED_TIMEOUT', 0.5))
+
+# Ollama HTTP transport (shared keep-alive connection pool)
+OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', 10))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', 5))
+OLLAMA_READ_TIMEOUT = float(os.getenv('OLLAMA_READ_TIMEOUT', 300))
+OLLAMA_HTTP_KEEP_ALIVE = os.getenv('OLLAMA_HTTP_KEEP_ALIVE', 'True').lower() == 'true'
+
+# Record/replay Ollama traffic: OLLAMA_CASSETTE_MODE is 'record', 'replay' or empty
+OLLAMA_CASSETTE_MODE = os.getenv('OLLAMA_CASSETTE_MODE', '')
+OLLAMA_CASSETTE_PATH = os.getenv('OLLAMA_CASSETTE_PATH', './data/ollama_cassette.jsonl.gz')
+OLLAMA_REPLAY_SPEED = float(os.getenv('OLLAMA_REPLAY_SPEED', 1.0))  # 0 replays without delays
 
 # Model performance settings (optimized for RTX 4080)
 MAX_TOKENS = int(os.getenv('MAX_TOKENS', 2048))  # Optimized for 4K context window
 TEMPERATURE = float(os.getenv('TEMPERATURE', 0.7))
 NUM_CTX = int(os.getenv('NUM_CTX', 4096))  # 4K context - maximum speed
 
+# Stream framing: coalesce tokens into frames by time window and/or count
+# (clients may override per request with coalesce_ms / coalesce_tokens)
+STREAM_COALESCE_MS = float(os.getenv('STREAM_COALESCE_MS', 0))
+STREAM_COALESCE_TOKENS = int(os.getenv('STREAM_COALESCE_TOKENS', 1))
+
 # System prompts
 SYSTEM_PROMPT = os.getenv('SYSTEM_PROMPT', 
     'You are a helpful AI assistant. Provide clear, accurate, and well-structured responses.')
@@ -74,6 +158,13 @@ else:
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# LLM response cache for deterministic generate() calls (stored next to the database)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', None)
+LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', 64))
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', 168))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', 0.3))
+
 # Vector database settings
 # Support both absolute and relative paths
 CHROMA_PERSIST_DIRECTORY = os.getenv('CHROMA_PERSIST_DIRECTORY', './data/chroma_db')
@@ -82,6 +173,14 @@ CHROMA_PERSIST_DIRECTORY = os.path.abspath(CHROMA_PERSIST_DIRECTORY)
 # Keyword extraction model (smaller model for parsing)
 EXTRACTION_MODEL = os.getenv('EXTRACTION_MODEL', 'phi3')
 
+# Embedding model used by the vector store
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
+
+# Model warm-up: preload models at startup and keep them resident
+MODEL_KEEP_ALIVE = os.getenv('MODEL_KEEP_ALIVE', '30m')
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', 'True').lower() == 'true'
+WARMUP_INTERVAL = float(os.getenv('WARMUP_INTERVAL', 600))  # seconds; 0 warms only at startup
+
 # Work assistant settings
 MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', 10))
 DELIVERABLE_WARNING_DAYS = int(os.getenv('DELIVERABLE_WARNING_DAYS', 7))
\ No newline at end of file
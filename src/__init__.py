@@ -65,10 +65,17 @@ def create_app():
     try:
         # Try the optimized Ollama-based vector store first
         from src.services.vector_store_ollama import VectorStoreOllama
+        from src.utils.extensions import get_ollama_transport, get_admission_scheduler
+        with app.app_context():
+            transport = get_ollama_transport()
+            scheduler = get_admission_scheduler()
         app.vector_store = VectorStoreOllama(
             config.CHROMA_PERSIST_DIRECTORY,
             config.OLLAMA_BASE_URL,
-            "nomic-embed-text"  # Ollama's embedding model
+            config.EMBEDDING_MODEL,  # Ollama's embedding model
+            transport=transport,
+            scheduler=scheduler,
+            keep_alive=config.MODEL_KEEP_ALIVE
         )
         app.vector_store_available = True
         logging.info("Using Ollama-based vector store (fast)")
@@ -101,4 +108,10 @@ def create_app():
     from src import routes
     routes.init_app(app)
     
+    # Preload models in the background so the first request skips the cold load
+    if config.WARMUP_ON_STARTUP and not app.config.get('TESTING'):
+        from src.utils.extensions import get_model_warmer
+        with app.app_context():
+            get_model_warmer().start()
+    
     return app
\ No newline at end of file
@@ -1,10 +1,15 @@
 """Chat API endpoints."""
 from flask import Blueprint, request, Response, stream_with_context, current_app, jsonify
 import json
+import threading
 import time
 import logging
-from src.utils.extensions import get_ollama_service
-from src.utils.token_counter import TokenCounter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.utils.extensions import (get_ollama_service, get_generation_registry, get_conversation_service,
+                                  get_token_documents, get_semantic_cache)
+from src.services.conversation_service import context_budget
+from src.services.semantic_cache import replay_frames
+from src.utils.stream_framing import TokenFramer, encode_frame, relay_tokens
 
 bp = Blueprint('chat', __name__, url_prefix='/api')
 logger = logging.getLogger(__name__)
@@ -23,99 +28,289 @@ def chat_stream():
             mimetype='application/json'
         )
     
+    framer = TokenFramer.from_request(
+        data, 'token',
+        default_ms=current_app.config.get('STREAM_COALESCE_MS', 0),
+        default_tokens=current_app.config.get('STREAM_COALESCE_TOKENS', 1)
+    )
+    
     return Response(
-        stream_with_context(generate_chat_stream(user_input, session_id)),
+        stream_with_context(generate_chat_stream(user_input, session_id, framer)),
         mimetype='application/json'
     )
 
 
-def generate_chat_stream(user_input: str, session_id: str = None):
+def chat_options():
+    """Generation options for chat from config."""
+    return {
+        "num_predict": current_app.config.get('MAX_TOKENS', 1000),
+        "temperature": current_app.config.get('TEMPERATURE', 0.7),
+        "top_k": current_app.config.get('TOP_K', 40),
+        "top_p": current_app.config.get('TOP_P', 0.9),
+        "num_ctx": current_app.config.get('NUM_CTX', 8192),
+        "num_batch": current_app.config.get('NUM_BATCH', 512),
+        "num_thread": current_app.config.get('NUM_THREAD', 8),
+        "repeat_penalty": current_app.config.get('REPEAT_PENALTY', 1.1),
+        "num_gpu": current_app.config.get('NUM_GPU', -1),
+        "gpu_layers": current_app.config.get('GPU_LAYERS', 99)
+    }
+
+
+def generate_chat_stream(user_input: str, session_id: str = None, framer: TokenFramer = None):
     """Generate streaming chat response."""
     ollama = get_ollama_service()
+    framer = framer or TokenFramer('token')
     
+    with get_generation_registry().track('chat') as generation:
+        try:
+            context = user_input
+            
+            # Get system prompt from config
+            system_prompt = current_app.config.get('SYSTEM_PROMPT', None)
+            
+            # Multi-turn when the client sends a session id: earlier turns go
+            # ahead of the new message as an append-only messages array,
+            # packed into what NUM_CTX leaves after the reply and system prompt
+            conversation = get_conversation_service() if session_id else None
+            history = None
+            if conversation:
+                budget = context_budget(current_app.config.get('NUM_CTX', 8192),
+                                        current_app.config.get('MAX_TOKENS', 1000),
+                                        system_prompt, conversation.token_counter)
+                history = conversation.build_messages(session_id, context, budget)
+            
+            # Send the full prompt immediately if requested
+            display = conversation.format_context(history, context) if conversation else context
+            full_prompt = f"System: {system_prompt}\n\nUser: {display}" if system_prompt else display
+            first = {'full_prompt': full_prompt, 'model': ollama.model_name, 'generation_id': generation.id}
+            if session_id:
+                first['session_id'] = session_id
+            yield encode_frame(first)
+            
+            # Start timing
+            start_time = time.time()
+            
+            # Prepare options from config
+            options = chat_options()
+            
+            # Without a session the answer depends only on the prompt, so an
+            # earlier answer to an equivalent prompt can be replayed
+            semantic_cache = None if conversation else get_semantic_cache()
+            cached = semantic_cache.lookup(
+                semantic_cache.namespace('chat', ollama.model_name, system_prompt, options), context,
+                priority='interactive'
+            ) if semantic_cache else None
+            if cached and cached.hit:
+                for frame in replay_frames(framer, cached.response):
+                    yield frame
+                generation.tokens_delivered = len(framer.parts)
+                yield encode_frame({
+                    'done': True,
+                    'total_time': time.time() - start_time,
+                    'model': ollama.model_name,
+                    'cached': True,
+                    'similarity': round(cached.similarity, 4),
+                    'turn': 1
+                })
+                return
+            
+            # Stream response from Ollama; tokens are buffered by the framer
+            stream = ollama.generate_stream(context, options, system_prompt,
+                                            history=history, session_id=session_id)
+            chunk = yield from relay_tokens(generation, framer, stream)
+            if chunk is None:
+                return
+            
+            if conversation:
+                conversation.add_exchange(session_id, user_input, framer.text)
+            elif semantic_cache:
+                semantic_cache.store(cached, framer.text)
+            
+            total_time = time.time() - start_time
+            # Prompt eval stays flat across turns when the prefix is cached
+            yield encode_frame({
+                'done': True,
+                'total_time': total_time,
+                'model': chunk.get('model', ''),
+                'eval_count': chunk.get('eval_count', 0),
+                'eval_duration': chunk.get('eval_duration', 0),
+                'prompt_eval_count': chunk.get('prompt_eval_count', 0),
+                'prompt_eval_duration': chunk.get('prompt_eval_duration', 0),
+                'turn': len(history or []) // 2 + 1
+            })
+            
+            logger.info(f"Chat completed in {total_time:.2f}s "
+                        f"(prompt eval {chunk.get('prompt_eval_duration', 0) / 1e6:.0f}ms)")
+                    
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            generation.outcome = 'error'
+            yield encode_frame({
+                'error': f'An error occurred: {str(e)}',
+                'done': True
+            })
+
+
+@bp.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Run many prompts with shared options, streaming each result as it completes.
+    
+    Send ``prompts`` (a list), or a ``template`` containing ``{input}`` with
+    ``inputs``. ``options`` override the chat defaults for every item and
+    ``concurrency`` caps how many run at once.
+    """
+    data = request.json or {}
+    user_options = data.get('options') or {}
+    if not isinstance(user_options, dict):
+        return jsonify({'success': False, 'message': 'options must be an object'}), 400
+    prompts = data.get('prompts')
+    if prompts is None and 'template' in data:
+        inputs = data.get('inputs') or []
+        if not isinstance(inputs, list):
+            return jsonify({'success': False, 'message': 'inputs must be a list'}), 400
+        template = str(data['template'])
+        prompts = [template.replace('{input}', str(item)) for item in inputs]
+    
+    max_items = current_app.config.get('CHAT_BATCH_MAX_ITEMS', 500)
+    if not isinstance(prompts, list) or not prompts or not all(isinstance(p, str) and p for p in prompts):
+        return jsonify({'success': False, 'message': 'Provide a non-empty list of prompts'}), 400
+    if len(prompts) > max_items:
+        return jsonify({'success': False, 'message': f'At most {max_items} prompts per batch'}), 400
     
+    max_concurrency = current_app.config.get('CHAT_BATCH_CONCURRENCY', 4)
     try:
-        # Just use the user input directly, no conversation history
-        context = user_input
-        
-        # Get system prompt from config
-        system_prompt = current_app.config.get('SYSTEM_PROMPT', None)
-        
-        # Send the full prompt immediately if requested
-        full_prompt = f"System: {system_prompt}\n\nUser: {context}" if system_prompt else context
-        yield json.dumps({'full_prompt': full_prompt, 'model': ollama.model_name}) + '\n'
-        
-        # Start timing
-        start_time = time.time()
-        
-        # Prepare options from config
-        options = {
-            "num_predict": current_app.config.get('MAX_TOKENS', 1000),
-            "temperature": current_app.config.get('TEMPERATURE', 0.7),
-            "top_k": current_app.config.get('TOP_K', 40),
-            "top_p": current_app.config.get('TOP_P', 0.9),
-            "num_ctx": current_app.config.get('NUM_CTX', 8192),
-            "num_batch": current_app.config.get('NUM_BATCH', 512),
-            "num_thread": current_app.config.get('NUM_THREAD', 8),
-            "repeat_penalty": current_app.config.get('REPEAT_PENALTY', 1.1),
-            "num_gpu": current_app.config.get('NUM_GPU', -1),
-            "gpu_layers": current_app.config.get('GPU_LAYERS', 99)
-        }
-        
-        # Stream response from Ollama
-        full_response = ""
-        for chunk in ollama.generate_stream(context, options, system_prompt):
+        concurrency = max(1, min(int(data.get('concurrency', max_concurrency)), max_concurrency))
+    except (TypeError, ValueError):
+        concurrency = max_concurrency
+    options = {**chat_options(), **user_options}
+    system_prompt = current_app.config.get('SYSTEM_PROMPT', None)
+    
+    return Response(
+        stream_with_context(generate_batch_stream(prompts, options, system_prompt, concurrency)),
+        mimetype='application/json'
+    )
+
+
+def _run_batch_item(ollama, index: int, prompt: str, options, system_prompt, submitted: float,
+                    stop: threading.Event, generation):
+    """Generate one batch item on a worker thread and return its result frame."""
+    start = time.time()
+    result = {'index': index, 'queued_ms': round((start - submitted) * 1000, 1)}
+    parts = []
+    first_token = None
+    stream = ollama.generate_stream(prompt, options, system_prompt, priority='query')
+    try:
+        for chunk in stream:
+            if stop.is_set() or generation.cancelled:
+                result['error'] = 'Batch cancelled'
+                break
             if 'error' in chunk:
-                yield json.dumps({
-                    'error': chunk['error'],
-                    'done': True
-                }) + '\n'
-                return
-            
-            if 'response' in chunk:
-                full_response += chunk['response']
-                yield json.dumps({
-                    'token': chunk['response'],
-                    'done': chunk.get('done', False)
-                }) + '\n'
+                result['error'] = chunk['error']
+                break
+            token = chunk.get('response')
+            if token:
+                if first_token is None:
+                    first_token = time.time()
+                parts.append(token)
+            if chunk.get('done'):
+                result['eval_count'] = chunk.get('eval_count', 0)
+                result['prompt_eval_count'] = chunk.get('prompt_eval_count', 0)
+                break
+    finally:
+        if hasattr(stream, 'close'):
+            stream.close()
+    if 'error' not in result:
+        result['response'] = ''.join(parts)
+    result['ttft_ms'] = round((first_token - start) * 1000, 1) if first_token else None
+    result['total_ms'] = round((time.time() - start) * 1000, 1)
+    return result
+
+
+def generate_batch_stream(prompts, options, system_prompt, concurrency: int):
+    """Stream batch results tagged by index, in completion order."""
+    ollama = get_ollama_service()
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='chat-batch')
+    
+    with get_generation_registry().track('batch') as generation:
+        try:
+            yield encode_frame({'generation_id': generation.id, 'model': ollama.model_name,
+                                'count': len(prompts), 'done': False})
+            start_time = time.time()
+            submitted = time.time()
+            futures = [
+                executor.submit(_run_batch_item, ollama, i, prompt, options, system_prompt, submitted, stop,
+                                generation)
+                for i, prompt in enumerate(prompts)
+            ]
             
-            if chunk.get('done', False):
-                # No longer storing conversation history
+            failed = 0
+            for future in as_completed(futures):
+                if generation.cancelled:
+                    generation.outcome = 'cancelled'
+                    yield encode_frame({'cancelled': True, 'done': True})
+                    return
                 
-                total_time = time.time() - start_time
-                yield json.dumps({
-                    'done': True,
-                    'total_time': total_time,
-                    'model': chunk.get('model', ''),
-                    'eval_count': chunk.get('eval_count', 0),
-                    'eval_duration': chunk.get('eval_duration', 0)
-                }) + '\n'
-                
-                logger.info(f"Chat completed in {total_time:.2f}s")
-                
-    except Exception as e:
-        logger.error(f"Chat stream error: {e}")
-        yield json.dumps({
-            'error': f'An error occurred: {str(e)}',
-            'done': True
-        }) + '\n'
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Batch item failed: {e}")
+                    result = {'index': futures.index(future), 'error': str(e)}
+                if 'error' in result:
+                    failed += 1
+                generation.tokens_received += result.get('eval_count', 0)
+                generation.tokens_delivered = generation.tokens_received
+                yield encode_frame(result)
+            
+            total_time = time.time() - start_time
+            yield encode_frame({
+                'done': True,
+                'completed': len(prompts) - failed,
+                'failed': failed,
+                'total_time': total_time
+            })
+            logger.info(f"Chat batch of {len(prompts)} completed in {total_time:.2f}s ({failed} failed)")
+        finally:
+            # Client gone or batch cancelled: drop queued items and stop running ones
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+@bp.route('/chat/cancel', methods=['POST'])
+def cancel_generation():
+    """Stop a running generation by the id sent in its first stream frame."""
+    data = request.json or {}
+    generation_id = data.get('generation_id')
+    if not generation_id:
+        return jsonify({'success': False, 'message': 'No generation ID provided'}), 400
+    
+    if not get_generation_registry().cancel(generation_id):
+        return jsonify({'success': False, 'message': 'Generation not found'}), 404
+    
+    return jsonify({'success': True})
 
 
 @bp.route('/chat/tokens', methods=['POST'])
 def count_tokens():
-    """Count tokens in the current message."""
+    """Count tokens in the current message.
+    
+    Send ``message`` with a ``document_id`` once, then only ``edits``
+    (``[{start, end, text}]``) and the new ``length``, both in code points;
+    a 409 asks for the full message again.
+    """
     data = request.json
     message = data.get('message', '')
     
-    token_counter = TokenCounter()
+    documents = get_token_documents()
+    try:
+        token_count = documents.count(message, data.get('document_id'), data.get('edits'), data.get('length'))
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'Document out of sync', 'resync': True}), 409
     
     # Include system prompt in token count
-    system_prompt = current_app.config.get('SYSTEM_PROMPT', '')
-    full_context = f"System: {system_prompt}\n\nUser: {message}" if system_prompt else message
-    
-    token_count = token_counter.count(full_context)
+    token_count += documents.prefix_tokens(current_app.config.get('SYSTEM_PROMPT', ''))
     
     return jsonify({
         'count': token_count,
         'limit': current_app.config.get('NUM_CTX', 8192)
-    })
\ No newline at end of file
+    })
@@ -1,6 +1,10 @@
 """Health check API endpoints."""
 from flask import Blueprint, jsonify, current_app
-from src.utils.extensions import get_ollama_service
+from src.utils.extensions import (get_ollama_service, get_ollama_transport, get_llm_cache, get_backend_pool,
+                                   get_admission_scheduler, get_model_warmer, get_generation_registry,
+                                   get_model_registry, get_circuit_breaker, get_conversation_service,
+                                   get_token_counter, get_token_calibrator,
+                                   get_token_documents, get_semantic_cache)
 
 bp = Blueprint('health', __name__, url_prefix='/api')
 
@@ -19,4 +23,33 @@ def health_check():
     # Add current model info
     result['current_model'] = current_app.config.get('MODEL_NAME', 'phi3:mini')
     
-    return jsonify(result)
\ No newline at end of file
+    return jsonify(result)
+
+
+@bp.route('/health/metrics')
+def metrics():
+    """Report runtime counters for the Ollama serving path."""
+    cache = get_llm_cache()
+    calibrator = get_token_calibrator()
+    semantic_cache = get_semantic_cache()
+    return jsonify({
+        'transport': get_ollama_transport().get_stats(),
+        'coalescing': get_ollama_service().single_flight.get_stats(),
+        'backends': get_backend_pool().get_stats()['backends'],
+        'admission': get_admission_scheduler().get_stats(),
+        'models': get_model_registry().get_stats(),
+        'circuit': get_circuit_breaker().get_stats(),
+        'generations': get_generation_registry().get_stats(),
+        'conversations': get_conversation_service().get_stats(),
+        'token_counter': get_token_counter().get_stats(),
+        'token_documents': get_token_documents().get_stats(),
+        'token_calibration': calibrator.get_stats() if calibrator else None,
+        'llm_cache': cache.get_stats() if cache else None,
+        'semantic_cache': semantic_cache.get_stats() if semantic_cache else None
+    })
+
+
+@bp.route('/health/models')
+def model_warmup():
+    """Report per-model warm-up load latency and residency."""
+    return jsonify(get_model_warmer().get_report())
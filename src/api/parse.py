@@ -3,7 +3,10 @@ from flask import Blueprint, request, Response, stream_with_context, current_app
 import json
 import time
 import logging
-from src.utils.extensions import get_ollama_service
+from src.utils.extensions import get_ollama_service, get_generation_registry, get_semantic_cache
+from src.services.semantic_cache import replay_frames
+from src.services.stream_buffer import StreamBuffer, OffsetExpired, run_detached
+from src.utils.stream_framing import TokenFramer, encode_frame, relay_tokens
 
 bp = Blueprint('parse', __name__, url_prefix='/api')
 logger = logging.getLogger(__name__)
@@ -11,7 +14,12 @@ logger = logging.getLogger(__name__)
 
 @bp.route('/parse/stream', methods=['POST'])
 def parse_stream():
-    """Handle streaming parse requests."""
+    """Handle streaming parse requests.
+    
+    With ``resumable`` set the generation runs detached from the request
+    and its frames are buffered, so a dropped client can pick up where it
+    left off through /api/parse/resume.
+    """
     data = request.json
     text_input = data.get('text', '')
     
@@ -21,63 +29,128 @@ def parse_stream():
             mimetype='application/json'
         )
     
+    framer = TokenFramer.from_request(
+        data, 'content',
+        default_ms=current_app.config.get('STREAM_COALESCE_MS', 0),
+        default_tokens=current_app.config.get('STREAM_COALESCE_TOKENS', 1)
+    )
+    
+    if data.get('resumable'):
+        registry = get_generation_registry()
+        buffer = StreamBuffer(current_app.config.get('RESUME_BUFFER_FRAMES', 4096))
+        run_detached(
+            generate_parse_stream(text_input, framer, buffer),
+            buffer,
+            current_app._get_current_object().app_context,
+            on_abandon=lambda: registry.cancel(buffer.generation_id),
+            abandon_after=current_app.config.get('RESUME_ABANDON_SECONDS', 60.0)
+        )
+        return Response(read_buffer(buffer, 0), mimetype='application/json')
+    
     return Response(
-        stream_with_context(generate_parse_stream(text_input)),
+        stream_with_context(generate_parse_stream(text_input, framer)),
         mimetype='application/json'
     )
 
 
-def generate_parse_stream(text_input: str):
+@bp.route('/parse/resume', methods=['POST'])
+def parse_resume():
+    """Continue a resumable parse stream from the number of frames already received."""
+    data = request.json or {}
+    buffer = get_generation_registry().get_buffer(data.get('generation_id') or '')
+    if buffer is None:
+        return jsonify({'success': False, 'message': 'Generation not found'}), 404
+    
+    try:
+        offset = int(data.get('offset', 0))
+        buffer.check_offset(offset)
+    except OffsetExpired as e:
+        return jsonify({'success': False, 'message': str(e)}), 410
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return Response(read_buffer(buffer, offset), mimetype='application/json')
+
+
+def read_buffer(buffer: StreamBuffer, offset: int):
+    """Stream buffered frames to a client, ending with an error frame if it falls behind."""
+    try:
+        yield from buffer.read(offset)
+    except OffsetExpired as e:
+        yield encode_frame({'error': str(e), 'done': True})
+
+
+def generate_parse_stream(text_input: str, framer: TokenFramer = None, buffer: StreamBuffer = None):
     """Generate streaming parse response."""
     ollama = get_ollama_service()
+    framer = framer or TokenFramer('content')
     
-    try:
-        # Create a parsing prompt
-        parse_prompt = f"""Parse the following text and extract structured information from it. 
+    with get_generation_registry().track('parse', buffer) as generation:
+        try:
+            first = {'generation_id': generation.id, 'done': False}
+            if buffer is not None:
+                first['resumable'] = True
+            yield encode_frame(first)
+            
+            # Create a parsing prompt
+            parse_prompt = f"""Parse the following text and extract structured information from it. 
 Identify key entities, relationships, and important data points. 
 Present the results in a clear, organized format.
 
 Text to parse:
 {text_input}"""
-        
-        # Get parsing system prompt from config or use default
-        system_prompt = current_app.config.get('PARSE_SYSTEM_PROMPT', 
-            'You are a text parsing assistant. Extract and structure information from the provided text.')
-        
-        # Prepare options
-        options = {
-            "num_predict": current_app.config.get('MAX_TOKENS', 8192),
-            "temperature": 0.3,  # Lower temperature for more consistent parsing
-            "top_k": current_app.config.get('TOP_K', 40),
-            "top_p": 0.9,
-            "num_ctx": current_app.config.get('NUM_CTX', 8192),
-            "num_batch": current_app.config.get('NUM_BATCH', 512),
-            "num_thread": current_app.config.get('NUM_THREAD', 8),
-            "repeat_penalty": current_app.config.get('REPEAT_PENALTY', 1.1),
-            "num_gpu": current_app.config.get('NUM_GPU', -1),
-            "gpu_layers": current_app.config.get('GPU_LAYERS', 99)
-        }
-        
-        # Use generate_stream with the combined prompt
-        full_prompt = parse_prompt
-        
-        # Stream the response with system prompt
-        for chunk in ollama.generate_stream(full_prompt, options, system_prompt):
-            if 'response' in chunk:
-                yield json.dumps({
-                    'content': chunk['response'],
-                    'done': chunk.get('done', False)
-                }) + '\n'
-        
-        # Send done signal
-        yield json.dumps({
-            'content': '',
-            'done': True
-        }) + '\n'
-        
-    except Exception as e:
-        logger.error(f"Parse error: {str(e)}")
-        yield json.dumps({
-            'error': str(e),
-            'done': True
-        }) + '\n'
\ No newline at end of file
+            
+            # Get parsing system prompt from config or use default
+            system_prompt = current_app.config.get('PARSE_SYSTEM_PROMPT', 
+                'You are a text parsing assistant. Extract and structure information from the provided text.')
+            
+            # Prepare options
+            options = {
+                "num_predict": current_app.config.get('MAX_TOKENS', 8192),
+                "temperature": 0.3,  # Lower temperature for more consistent parsing
+                "top_k": current_app.config.get('TOP_K', 40),
+                "top_p": 0.9,
+                "num_ctx": current_app.config.get('NUM_CTX', 8192),
+                "num_batch": current_app.config.get('NUM_BATCH', 512),
+                "num_thread": current_app.config.get('NUM_THREAD', 8),
+                "repeat_penalty": current_app.config.get('REPEAT_PENALTY', 1.1),
+                "num_gpu": current_app.config.get('NUM_GPU', -1),
+                "gpu_layers": current_app.config.get('GPU_LAYERS', 99)
+            }
+            
+            # Use generate_stream with the combined prompt
+            full_prompt = parse_prompt
+            
+            # Replay the parse of an equivalent earlier text if there is one
+            semantic_cache = get_semantic_cache()
+            cached = semantic_cache.lookup(
+                semantic_cache.namespace('parse', ollama.model_name, system_prompt, options), text_input,
+                priority='interactive'
+            ) if semantic_cache else None
+            if cached and cached.hit:
+                for frame in replay_frames(framer, cached.response):
+                    yield frame
+                generation.tokens_delivered = len(framer.parts)
+                yield encode_frame({'content': '', 'done': True, 'cached': True,
+                                    'similarity': round(cached.similarity, 4)})
+                return
+            
+            # Stream the response with system prompt
+            stream = ollama.generate_stream(full_prompt, options, system_prompt)
+            chunk = yield from relay_tokens(generation, framer, stream,
+                                            {'content': '', 'done': True, 'cancelled': True})
+            if chunk is None:
+                return
+            
+            # Send done signal
+            if semantic_cache:
+                semantic_cache.store(cached, framer.text)
+            yield encode_frame({'content': '', 'done': True})
+            
+        except Exception as e:
+            logger.error(f"Parse error: {str(e)}")
+            generation.outcome = 'error'
+            yield encode_frame({
+                'error': str(e),
+                'done': True
+            })
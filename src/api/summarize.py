@@ -3,8 +3,8 @@ from flask import Blueprint, request, Response, stream_with_context, current_app
 import json
 import time
 import logging
-from src.utils.extensions import get_ollama_service
-from src.utils.token_counter import TokenCounter
+from src.utils.extensions import get_ollama_service, get_generation_registry, get_token_documents
+from src.utils.stream_framing import TokenFramer, encode_frame, relay_tokens
 
 bp = Blueprint('summarize', __name__, url_prefix='/api')
 logger = logging.getLogger(__name__)
@@ -27,96 +27,91 @@ def summarize_stream():
             mimetype='application/json'
         )
     
+    framer = TokenFramer.from_request(
+        data, 'token',
+        default_ms=current_app.config.get('STREAM_COALESCE_MS', 0),
+        default_tokens=current_app.config.get('STREAM_COALESCE_TOKENS', 1)
+    )
+    
     return Response(
-        stream_with_context(generate_summarization_stream(user_input)),
+        stream_with_context(generate_summarization_stream(user_input, framer)),
         mimetype='application/json'
     )
 
 
-def generate_summarization_stream(user_input: str):
+def generate_summarization_stream(user_input: str, framer: TokenFramer = None):
     """Generate streaming summarization response using Phi3:mini."""
-    # Create a temporary Ollama service instance for summarization model
-    ollama = get_ollama_service()
-    original_model = ollama.model_name
-    ollama.model_name = current_app.config.get('SUMMARIZE_MODEL_NAME', 'phi3:mini')  # Use configured summarization model
+    framer = framer or TokenFramer('token')
+    # Use the handle for the configured summarization model
+    ollama = get_ollama_service(current_app.config.get('SUMMARIZE_MODEL_NAME', 'phi3:mini'))
     
-    try:
-        # Start timing
-        start_time = time.time()
-        
-        # Prepare options from config (but use Phi3:mini)
-        options = {
-            "num_predict": current_app.config.get('MAX_TOKENS', 8192),
-            "temperature": 0.3,  # Lower temperature for more focused summaries
-            "top_k": current_app.config.get('TOP_K', 40),
-            "top_p": 0.9,
-            "num_ctx": current_app.config.get('NUM_CTX', 8192),
-            "num_batch": current_app.config.get('NUM_BATCH', 512),
-            "num_thread": current_app.config.get('NUM_THREAD', 8),
-            "repeat_penalty": current_app.config.get('REPEAT_PENALTY', 1.1),
-            "num_gpu": current_app.config.get('NUM_GPU', -1),
-            "gpu_layers": current_app.config.get('GPU_LAYERS', 99)
-        }
-        
-        # Get the current summarization system prompt from config
-        system_prompt = current_app.config.get('SUMMARIZE_SYSTEM_PROMPT', DEFAULT_SUMMARIZATION_PROMPT)
-        
-        # Stream response from Ollama with system prompt
-        full_response = ""
-        for chunk in ollama.generate_stream(user_input, options, system_prompt):
-            if 'error' in chunk:
-                yield json.dumps({
-                    'error': chunk['error'],
-                    'done': True
-                }) + '\n'
+    with get_generation_registry().track('summarize') as generation:
+        try:
+            yield encode_frame({'generation_id': generation.id, 'done': False})
+            
+            # Start timing
+            start_time = time.time()
+            
+            # Prepare options from config (but use Phi3:mini)
+            options = {
+                "num_predict": current_app.config.get('MAX_TOKENS', 8192),
+                "temperature": 0.3,  # Lower temperature for more focused summaries
+                "top_k": current_app.config.get('TOP_K', 40),
+                "top_p": 0.9,
+                "num_ctx": current_app.config.get('NUM_CTX', 8192),
+                "num_batch": current_app.config.get('NUM_BATCH', 512),
+                "num_thread": current_app.config.get('NUM_THREAD', 8),
+                "repeat_penalty": current_app.config.get('REPEAT_PENALTY', 1.1),
+                "num_gpu": current_app.config.get('NUM_GPU', -1),
+                "gpu_layers": current_app.config.get('GPU_LAYERS', 99)
+            }
+            
+            # Get the current summarization system prompt from config
+            system_prompt = current_app.config.get('SUMMARIZE_SYSTEM_PROMPT', DEFAULT_SUMMARIZATION_PROMPT)
+            
+            # Stream response from Ollama with system prompt
+            stream = ollama.generate_stream(user_input, options, system_prompt)
+            chunk = yield from relay_tokens(generation, framer, stream)
+            if chunk is None:
                 return
             
-            if 'response' in chunk:
-                full_response += chunk['response']
-                yield json.dumps({
-                    'token': chunk['response'],
-                    'done': chunk.get('done', False)
-                }) + '\n'
+            total_time = time.time() - start_time
+            yield encode_frame({
+                'done': True,
+                'total_time': total_time,
+                'model': ollama.model_name,
+                'eval_count': chunk.get('eval_count', 0),
+                'eval_duration': chunk.get('eval_duration', 0)
+            })
             
-            if chunk.get('done', False):
-                total_time = time.time() - start_time
-                yield json.dumps({
-                    'done': True,
-                    'total_time': total_time,
-                    'model': current_app.config.get('SUMMARIZE_MODEL_NAME', 'phi3:mini'),
-                    'eval_count': chunk.get('eval_count', 0),
-                    'eval_duration': chunk.get('eval_duration', 0)
-                }) + '\n'
-                
-                logger.info(f"Summarization completed in {total_time:.2f}s")
-                
-    except Exception as e:
-        logger.error(f"Summarization stream error: {e}")
-        yield json.dumps({
-            'error': f'An error occurred: {str(e)}',
-            'done': True
-        }) + '\n'
-    finally:
-        # Restore original model
-        ollama.model_name = original_model
+            logger.info(f"Summarization completed in {total_time:.2f}s")
+                    
+        except Exception as e:
+            logger.error(f"Summarization stream error: {e}")
+            generation.outcome = 'error'
+            yield encode_frame({
+                'error': f'An error occurred: {str(e)}',
+                'done': True
+            })
 
 
 @bp.route('/summarize/tokens', methods=['POST'])
 def count_summarize_tokens():
-    """Count tokens in the text to be summarized."""
+    """Count tokens in the text to be summarized (incrementally, like /api/chat/tokens)."""
     data = request.json
     text = data.get('text', '')
     
-    token_counter = TokenCounter()
+    documents = get_token_documents()
+    try:
+        token_count = documents.count(text, data.get('document_id'), data.get('edits'), data.get('length'))
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'message': 'Document out of sync', 'resync': True}), 409
     
-    # Get the current summarization system prompt from config
+    # Include the current summarization system prompt in the count
     system_prompt = current_app.config.get('SUMMARIZE_SYSTEM_PROMPT', DEFAULT_SUMMARIZATION_PROMPT)
-    
-    # Include system prompt in token count
-    full_context = f"System: {system_prompt}\n\nUser: {text}"
-    token_count = token_counter.count(full_context)
+    token_count += documents.prefix_tokens(system_prompt)
     
     return jsonify({
         'count': token_count,
         'limit': current_app.config.get('NUM_CTX', 8192)
-    })
\ No newline at end of file
+    })
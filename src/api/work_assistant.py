@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from dateutil import parser as date_parser
 import logging
 
-from src.models.database import db, Project, Email, StatusUpdate, Deliverable, Person
+from src.models.database import db, Project, Email, StatusUpdate, Deliverable, Person, serialize_list
 from src.services.keyword_extractor import KeywordExtractor
 from src.utils.extensions import get_ollama_service
 
@@ -127,8 +127,8 @@ def process_email():
             received_date = datetime.utcnow()
         
         # Initialize keyword extractor
-        ollama = get_ollama_service()
-        extractor = KeywordExtractor(ollama, current_app.config.get('EXTRACTION_MODEL', 'phi3'))
+        extraction_model = current_app.config.get('EXTRACTION_MODEL', 'phi3')
+        extractor = KeywordExtractor(get_ollama_service(extraction_model), extraction_model)
         
         # Extract information from email
         extracted_info = extractor.extract_email_info(email_content, subject)
@@ -235,8 +235,8 @@ def create_status_update():
         project = Project.query.get_or_404(project_id)
         
         # Extract keywords and information
-        ollama = get_ollama_service()
-        extractor = KeywordExtractor(ollama, current_app.config.get('EXTRACTION_MODEL', 'phi3'))
+        extraction_model = current_app.config.get('EXTRACTION_MODEL', 'phi3')
+        extractor = KeywordExtractor(get_ollama_service(extraction_model), extraction_model)
         extracted_info = extractor.extract_status_update_info(content, project.name)
         
         # Create status update
@@ -320,9 +320,9 @@ def deliverables():
                 query = query.filter(Deliverable.due_date <= deadline)
                 query = query.filter(Deliverable.due_date >= datetime.utcnow())
             
-            deliverables = query.order_by(Deliverable.due_date.asc()).all()
+            query = query.order_by(Deliverable.due_date.asc())
             
-            return jsonify([d.to_dict() for d in deliverables])
+            return jsonify(serialize_list(query, Deliverable))
             
         except Exception as e:
             logger.error(f"Failed to fetch deliverables: {e}")
@@ -426,8 +426,8 @@ Return ONLY JSON."""
                     if project:
                         deliverables = deliverables.filter_by(project_id=project.id)
                 
-                deliverables = deliverables.order_by(Deliverable.due_date.asc()).all()
-                results['deliverables'] = [d.to_dict() for d in deliverables]
+                deliverables = deliverables.order_by(Deliverable.due_date.asc())
+                results['deliverables'] = serialize_list(deliverables, Deliverable)
             
             # Also do semantic search (if available)
             if current_app.vector_store:
@@ -503,9 +503,9 @@ def get_emails():
         if importance:
             query = query.filter_by(importance=importance)
         
-        emails = query.order_by(Email.received_date.desc()).limit(limit).all()
+        query = query.order_by(Email.received_date.desc())
         
-        return jsonify([e.to_dict() for e in emails])
+        return jsonify(serialize_list(query, Email, limit))
         
     except Exception as e:
         logger.error(f"Failed to fetch emails: {e}")
@@ -517,10 +517,9 @@ def get_status_updates(project_id):
     """Get status updates for a project."""
     try:
         updates = StatusUpdate.query.filter_by(project_id=project_id)\
-                                   .order_by(StatusUpdate.created_at.desc())\
-                                   .all()
+                                   .order_by(StatusUpdate.created_at.desc())
         
-        return jsonify([u.to_dict() for u in updates])
+        return jsonify(serialize_list(updates, StatusUpdate))
         
     except Exception as e:
         logger.error(f"Failed to fetch status updates: {e}")
@@ -1,11 +1,33 @@
 """Database models for work assistant."""
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Index
+from sqlalchemy import Index, func
 from sqlalchemy.dialects.sqlite import JSON
 
 db = SQLAlchemy()
 
+# Email bodies are cut to this many characters in listings
+EMAIL_PREVIEW_CHARS = 500
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def serialize_list(query, model, limit=None):
+    """Serialize a list query of ``model`` rows in one SELECT.
+
+    Selects only the columns ``model.serialize`` reads, joined to the
+    project name, so no ORM objects are built and no per-row project
+    lookups are made. Pass ``limit`` here rather than on the query, since
+    the join has to come first.
+    """
+    rows = query.outerjoin(Project, model.project_id == Project.id)\
+                .with_entities(*model.list_columns(), Project.name.label('project_name'))
+    if limit is not None:
+        rows = rows.limit(limit)
+    return [model.serialize(row, row.project_name) for row in rows]
+
 
 class Project(db.Model):
     """Project model for tracking work projects."""
@@ -61,20 +83,34 @@ class Email(db.Model):
     )
     
     def to_dict(self):
+        return self.serialize(self, self.project.name if self.project else None)
+    
+    @classmethod
+    def list_columns(cls):
+        # Fetch one character past the preview so serialize() knows to add '...'
+        return [cls.id, cls.subject, cls.sender, cls.recipients, cls.cc,
+                func.substr(cls.content, 1, EMAIL_PREVIEW_CHARS + 1).label('content'),
+                cls.keywords, cls.people_mentioned, cls.project_id, cls.importance,
+                cls.received_date, cls.processed_at]
+    
+    @staticmethod
+    def serialize(row, project_name=None):
+        """Serialize an Email or a row from ``list_columns``."""
+        content = row.content
         return {
-            'id': self.id,
-            'subject': self.subject,
-            'sender': self.sender,
-            'recipients': self.recipients,
-            'cc': self.cc,
-            'content': self.content[:500] + '...' if len(self.content) > 500 else self.content,
-            'keywords': self.keywords,
-            'people_mentioned': self.people_mentioned,
-            'project_id': self.project_id,
-            'project_name': self.project.name if self.project else None,
-            'importance': self.importance,
-            'received_date': self.received_date.isoformat() if self.received_date else None,
-            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+            'id': row.id,
+            'subject': row.subject,
+            'sender': row.sender,
+            'recipients': row.recipients,
+            'cc': row.cc,
+            'content': content[:EMAIL_PREVIEW_CHARS] + '...' if len(content) > EMAIL_PREVIEW_CHARS else content,
+            'keywords': row.keywords,
+            'people_mentioned': row.people_mentioned,
+            'project_id': row.project_id,
+            'project_name': project_name,
+            'importance': row.importance,
+            'received_date': _iso(row.received_date),
+            'processed_at': _iso(row.processed_at)
         }
 
 
@@ -97,15 +133,25 @@ class StatusUpdate(db.Model):
     )
     
     def to_dict(self):
+        return self.serialize(self, self.project.name if self.project else None)
+    
+    @classmethod
+    def list_columns(cls):
+        return [cls.id, cls.project_id, cls.content, cls.update_type, cls.keywords,
+                cls.created_by, cls.created_at]
+    
+    @staticmethod
+    def serialize(row, project_name=None):
+        """Serialize a StatusUpdate or a row from ``list_columns``."""
         return {
-            'id': self.id,
-            'project_id': self.project_id,
-            'project_name': self.project.name if self.project else None,
-            'content': self.content,
-            'update_type': self.update_type,
-            'keywords': self.keywords,
-            'created_by': self.created_by,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'id': row.id,
+            'project_id': row.project_id,
+            'project_name': project_name,
+            'content': row.content,
+            'update_type': row.update_type,
+            'keywords': row.keywords,
+            'created_by': row.created_by,
+            'created_at': _iso(row.created_at)
         }
 
 
@@ -132,19 +178,29 @@ class Deliverable(db.Model):
     )
     
     def to_dict(self):
+        return self.serialize(self, self.project.name if self.project else None)
+    
+    @classmethod
+    def list_columns(cls):
+        return [cls.id, cls.project_id, cls.title, cls.description, cls.due_date, cls.status,
+                cls.priority, cls.assigned_to, cls.completed_at, cls.created_at, cls.updated_at]
+    
+    @staticmethod
+    def serialize(row, project_name=None):
+        """Serialize a Deliverable or a row from ``list_columns``."""
         return {
-            'id': self.id,
-            'project_id': self.project_id,
-            'project_name': self.project.name if self.project else None,
-            'title': self.title,
-            'description': self.description,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'status': self.status,
-            'priority': self.priority,
-            'assigned_to': self.assigned_to,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'id': row.id,
+            'project_id': row.project_id,
+            'project_name': project_name,
+            'title': row.title,
+            'description': row.description,
+            'due_date': _iso(row.due_date),
+            'status': row.status,
+            'priority': row.priority,
+            'assigned_to': row.assigned_to,
+            'completed_at': _iso(row.completed_at),
+            'created_at': _iso(row.created_at),
+            'updated_at': _iso(row.updated_at)
         }
 
 
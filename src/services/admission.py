@@ -0,0 +1,150 @@
+"""Priority admission control for calls into Ollama."""
+import heapq
+import itertools
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Request classes in priority order (lower value is served first)
+PRIORITIES = {
+    'interactive': 0,
+    'query': 1,
+    'extraction': 2,
+    'embedding': 3,
+}
+
+
+class AdmissionTimeout(Exception):
+    """Raised when a request waits too long for an Ollama slot."""
+
+
+class _Ticket:
+    __slots__ = ('priority', 'seq', 'request_class')
+
+    def __init__(self, priority: int, seq: int, request_class: str):
+        self.priority = priority
+        self.seq = seq
+        self.request_class = request_class
+
+    def __lt__(self, other: '_Ticket') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionScheduler:
+    """Admits Ollama calls by priority under global and per-class concurrency limits.
+
+    Waiting requests are served strictly by class priority, then arrival
+    order. A number of global slots can be reserved for interactive traffic
+    so that a burst of background work never fills the whole backend.
+    """
+
+    WAIT_SAMPLES = 256
+
+    def __init__(self, max_concurrency: int = 4, class_limits: Optional[Dict[str, int]] = None,
+                 interactive_reserved: int = 1):
+        self.max_concurrency = max_concurrency
+        self.class_limits = {name: max_concurrency for name in PRIORITIES}
+        self.class_limits.update(class_limits or {})
+        self.interactive_reserved = min(interactive_reserved, max_concurrency - 1)
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: List[_Ticket] = []
+        self._active = {name: 0 for name in PRIORITIES}
+        self._total_active = 0
+        self._admitted = {name: 0 for name in PRIORITIES}
+        self._timeouts = {name: 0 for name in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {
+            name: deque(maxlen=self.WAIT_SAMPLES) for name in PRIORITIES
+        }
+
+    def _has_capacity(self, request_class: str) -> bool:
+        limit = self.max_concurrency
+        if request_class != 'interactive':
+            limit -= self.interactive_reserved
+        return (self._total_active < limit
+                and self._active[request_class] < self.class_limits[request_class])
+
+    def _can_admit(self, ticket: _Ticket) -> bool:
+        if not self._has_capacity(ticket.request_class):
+            return False
+        # Do not overtake a higher-priority waiter that could run now
+        for other in self._waiting:
+            if other is not ticket and other < ticket and self._has_capacity(other.request_class):
+                return False
+        return True
+
+    def acquire(self, request_class: str, timeout: Optional[float] = None) -> None:
+        """Block until a slot for ``request_class`` is available."""
+        if request_class not in PRIORITIES:
+            raise ValueError(f"Unknown request class: {request_class}")
+
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            ticket = _Ticket(PRIORITIES[request_class], next(self._seq), request_class)
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while not self._can_admit(ticket):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._timeouts[request_class] += 1
+                        raise AdmissionTimeout(
+                            f"Timed out after {timeout}s waiting for an Ollama slot ({request_class})"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                # Our departure may unblock lower-priority waiters
+                self._cond.notify_all()
+
+            self._active[request_class] += 1
+            self._total_active += 1
+            self._admitted[request_class] += 1
+            self._waits[request_class].append(time.monotonic() - start)
+
+    def release(self, request_class: str) -> None:
+        """Return a slot and wake waiting requests."""
+        with self._cond:
+            self._active[request_class] -= 1
+            self._total_active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, request_class: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold a slot for the duration of the block."""
+        self.acquire(request_class, timeout)
+        try:
+            yield
+        finally:
+            self.release(request_class)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return per-class queue depth, concurrency and wait-time metrics."""
+        with self._cond:
+            classes = {}
+            for name in PRIORITIES:
+                waits = sorted(self._waits[name])
+                classes[name] = {
+                    'queued': sum(1 for t in self._waiting if t.request_class == name),
+                    'active': self._active[name],
+                    'limit': self.class_limits[name],
+                    'admitted': self._admitted[name],
+                    'timeouts': self._timeouts[name],
+                    'wait_avg_ms': round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+                    'wait_p95_ms': round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+                    'wait_max_ms': round(1000 * waits[-1], 2) if waits else 0.0
+                }
+            return {
+                'max_concurrency': self.max_concurrency,
+                'active': self._total_active,
+                'queued': len(self._waiting),
+                'classes': classes
+            }
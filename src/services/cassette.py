@@ -0,0 +1,223 @@
+"""Record/replay of Ollama HTTP traffic.
+
+A cassette is a JSON Lines file (gzip-compressed when the name ends in
+``.gz``) with one request/response interaction per line. Streaming
+responses keep each NDJSON line with its offset from the start of the
+request, so replay reproduces time-to-first-token and token pacing.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+import logging
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from .ollama_transport import OllamaTransport, Timeout
+
+logger = logging.getLogger(__name__)
+
+
+def interaction_key(method: str, url: str, body: Any) -> str:
+    """Identify a request by method, path and canonical JSON body (host is ignored)."""
+    path = urlsplit(url).path
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{method.upper()} {path} {canonical}".encode('utf-8')).hexdigest()
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class _RecordingStream:
+    """Wraps a streamed response and records its lines as they are read."""
+
+    def __init__(self, response: requests.Response, interaction: Dict[str, Any],
+                 start: float, on_done):
+        self._response = response
+        self._interaction = interaction
+        self._start = start
+        self._on_done = on_done
+        self._finished = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    def __enter__(self) -> '_RecordingStream':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def iter_lines(self, *args, **kwargs) -> Iterator[bytes]:
+        chunks = self._interaction['chunks']
+        for line in self._response.iter_lines(*args, **kwargs):
+            chunks.append([round(time.monotonic() - self._start, 4), line.decode('utf-8')])
+            yield line
+
+    def close(self) -> None:
+        self._response.close()
+        if not self._finished:
+            self._finished = True
+            self._on_done(self._interaction)
+
+
+class ReplayResponse:
+    """A recorded response, served back with its original (or scaled) timing."""
+
+    def __init__(self, interaction: Dict[str, Any], url: str, speed: float):
+        self._interaction = interaction
+        self._speed = speed
+        self._start = time.monotonic()
+        self.url = url
+        self.status_code = interaction['status']
+
+    def _wait_until(self, offset: float) -> None:
+        if self._speed > 0:
+            delay = self._start + offset / self._speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    @property
+    def text(self) -> str:
+        if 'chunks' in self._interaction:
+            return '\n'.join(line for _, line in self._interaction['chunks'])
+        self._wait_until(self._interaction.get('elapsed', 0.0))
+        return self._interaction.get('body', '')
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode('utf-8')
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error (replayed) for url: {self.url}",
+                                                response=self)
+
+    def iter_lines(self, *args, **kwargs) -> Iterator[bytes]:
+        for offset, line in self._interaction.get('chunks', []):
+            self._wait_until(offset)
+            yield line.encode('utf-8')
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'ReplayResponse':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CassetteTransport:
+    """Drop-in for OllamaTransport that records to or replays from a cassette.
+
+    In ``record`` mode requests go through the wrapped transport and every
+    interaction is appended to the cassette. In ``replay`` mode nothing
+    touches the network: requests are matched by method, path and body and
+    answered from the cassette in recorded order, at ``speed`` times the
+    recorded pace (``0`` replays without delays). Unmatched requests raise
+    ``requests.ConnectionError`` just like an unreachable server.
+    """
+
+    def __init__(self, path: str, mode: str = 'replay', inner: Optional[OllamaTransport] = None,
+                 speed: float = 1.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.inner = inner or OllamaTransport()
+        self.timeout = self.inner.timeout
+        self._lock = threading.Lock()
+        self._recorded = 0
+        self._replayed = 0
+        self._misses = 0
+        self._tapes: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        if mode == 'replay':
+            self._load()
+
+    def _load(self) -> None:
+        count = 0
+        with _open(self.path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._tapes[interaction['key']].append(interaction)
+                    count += 1
+        logger.info(f"Loaded {count} Ollama interactions from {self.path}")
+
+    def _append(self, interaction: Dict[str, Any]) -> None:
+        with self._lock:
+            with _open(self.path, 'a') as f:
+                f.write(json.dumps(interaction, separators=(',', ':')) + '\n')
+            self._recorded += 1
+
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None,
+                **kwargs: Any):
+        """Record or replay one request."""
+        body = kwargs.get('json')
+        key = interaction_key(method, url, body)
+        if self.mode == 'replay':
+            return self._replay(key, method, url)
+
+        start = time.monotonic()
+        response = self.inner.request(method, url, timeout=timeout, **kwargs)
+        interaction = {
+            'key': key,
+            'method': method.upper(),
+            'path': urlsplit(url).path,
+            'request': body,
+            'status': response.status_code
+        }
+        if kwargs.get('stream'):
+            interaction['chunks'] = []
+            return _RecordingStream(response, interaction, start, self._append)
+
+        interaction['body'] = response.text
+        interaction['elapsed'] = round(time.monotonic() - start, 4)
+        self._append(interaction)
+        return response
+
+    def _replay(self, key: str, method: str, url: str) -> ReplayResponse:
+        with self._lock:
+            tape = self._tapes.get(key)
+            if not tape:
+                self._misses += 1
+                raise requests.exceptions.ConnectionError(
+                    f"No recorded interaction for {method.upper()} {urlsplit(url).path}"
+                )
+            # Serve recordings in order, then keep repeating the last one
+            interaction = tape.popleft() if len(tape) > 1 else tape[0]
+            self._replayed += 1
+        return ReplayResponse(interaction, url, self.speed)
+
+    def get(self, url: str, **kwargs: Any):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.inner.get_stats() if self.mode == 'record' else {}
+        with self._lock:
+            stats['cassette'] = {
+                'mode': self.mode,
+                'path': self.path,
+                'recorded': self._recorded,
+                'replayed': self._replayed,
+                'misses': self._misses
+            }
+        return stats
+
+    def close(self) -> None:
+        self.inner.close()
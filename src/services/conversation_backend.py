@@ -0,0 +1,276 @@
+"""Durable storage for conversation history shared across workers."""
+import os
+import sqlite3
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .session_store import Turn, trim_count
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationBackend(ABC):
+    """Persistence interface used by ConversationService.
+
+    Every mutation bumps a per-session version so a worker can tell when
+    another worker changed a session it holds in memory.
+    """
+
+    @abstractmethod
+    def version(self, session_id: str) -> int:
+        """Return the session's version, or 0 if it was never stored."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Tuple[int, List[Turn]]:
+        """Return the session's version and turns."""
+
+    @abstractmethod
+    def append(self, session_id: str, turn: Turn, max_turns: int, max_tokens: Optional[int] = None) -> None:
+        """Add a turn, then trim the stored turns to the limits (see ``trim_count``)."""
+
+    @abstractmethod
+    def replace(self, session_id: str, turns: List[Turn]) -> None:
+        """Overwrite a session's turns (and drop its summary)."""
+
+    def save_summary(self, session_id: str, summary: str, tokens: int) -> None:
+        """Store the summary of a session's trimmed turns."""
+
+    def load_summary(self, session_id: str) -> Optional[Tuple[str, int]]:
+        """Return the session's summary and its token count, if any."""
+        return None
+
+    def pending(self, session_id: str) -> bool:
+        """Return True while writes for the session are not yet durable."""
+        return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class SQLiteConversationBackend(ConversationBackend):
+    """Conversation history in SQLite with write-behind batching.
+
+    Writes are queued and applied by a background thread, many per
+    transaction, so ``add_exchange`` never waits on disk. The database runs
+    in WAL mode, so several worker processes can share one file.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.05, batch_size: int = 200):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_sessions (
+                session_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                user TEXT NOT NULL,
+                assistant TEXT NOT NULL,
+                tokens INTEGER
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversation_turns_session ON conversation_turns(session_id, id)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                tokens INTEGER NOT NULL
+            )
+        """)
+
+        self._queue: Deque[Tuple[str, str, Any]] = deque()
+        self._pending: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._written = 0
+        self._batches = 0
+        self._errors = 0
+        self._writer = threading.Thread(target=self._run, name='conversation-writer', daemon=True)
+        self._writer.start()
+
+    # -- reads ---------------------------------------------------------------
+
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM conversation_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def load(self, session_id: str) -> Tuple[int, List[Turn]]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                row = self._conn.execute(
+                    "SELECT version FROM conversation_sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                rows = self._conn.execute(
+                    "SELECT user, assistant, tokens FROM conversation_turns WHERE session_id = ? ORDER BY id",
+                    (session_id,)
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        return (row[0] if row else 0), [Turn(*r) for r in rows]
+
+    def load_summary(self, session_id: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, tokens FROM conversation_summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    # -- write-behind --------------------------------------------------------
+
+    def _enqueue(self, op: str, session_id: str, payload: Any) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Conversation backend is closed")
+            self._queue.append((op, session_id, payload))
+            self._pending[session_id] = self._pending.get(session_id, 0) + 1
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def append(self, session_id: str, turn: Turn, max_turns: int, max_tokens: Optional[int] = None) -> None:
+        self._enqueue('append', session_id, (turn.user, turn.assistant, turn.tokens, max_turns, max_tokens))
+
+    def replace(self, session_id: str, turns: List[Turn]) -> None:
+        self._enqueue('replace', session_id, [(t.user, t.assistant, t.tokens) for t in turns])
+
+    def save_summary(self, session_id: str, summary: str, tokens: int) -> None:
+        self._enqueue('summary', session_id, (summary, tokens))
+
+    def pending(self, session_id: str) -> bool:
+        with self._cond:
+            return session_id in self._pending
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._queue and len(self._queue) < self.batch_size and not self._closed:
+                    # Let a few more writes arrive so they share one transaction
+                    self._cond.wait(self.flush_interval)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_size))]
+                if not batch and self._closed:
+                    return
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Tuple[str, str, Any]]) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for op, session_id, payload in batch:
+                        self._apply(op, session_id, payload, now)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self._written += len(batch)
+            self._batches += 1
+        except sqlite3.Error as e:
+            self._errors += 1
+            logger.error(f"Failed to persist {len(batch)} conversation writes: {e}")
+        finally:
+            with self._cond:
+                for _, session_id, _ in batch:
+                    remaining = self._pending.get(session_id, 0) - 1
+                    if remaining > 0:
+                        self._pending[session_id] = remaining
+                    else:
+                        self._pending.pop(session_id, None)
+                self._cond.notify_all()
+
+    def _apply(self, op: str, session_id: str, payload: Any, now: float) -> None:
+        if op == 'append':
+            user, assistant, tokens, max_turns, max_tokens = payload
+            self._conn.execute(
+                "INSERT INTO conversation_turns (session_id, user, assistant, tokens) VALUES (?, ?, ?, ?)",
+                (session_id, user, assistant, tokens)
+            )
+            # Trim by what is stored, which may include other workers' turns
+            rows = self._conn.execute(
+                "SELECT id, tokens FROM conversation_turns WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+            drop = trim_count((row[1] for row in rows), len(rows), sum(row[1] or 0 for row in rows),
+                              max_turns, max_tokens)
+            if drop:
+                self._conn.execute(
+                    "DELETE FROM conversation_turns WHERE session_id = ? AND id <= ?",
+                    (session_id, rows[drop - 1][0])
+                )
+        elif op == 'summary':
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversation_summaries (session_id, summary, tokens) VALUES (?, ?, ?)",
+                (session_id,) + payload
+            )
+        else:
+            self._conn.execute("DELETE FROM conversation_turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM conversation_summaries WHERE session_id = ?", (session_id,))
+            self._conn.executemany(
+                "INSERT INTO conversation_turns (session_id, user, assistant, tokens) VALUES (?, ?, ?, ?)",
+                [(session_id,) + turn for turn in payload]
+            )
+        self._conn.execute(
+            """INSERT INTO conversation_sessions (session_id, version, updated_at) VALUES (?, 1, ?)
+               ON CONFLICT(session_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at""",
+            (session_id, now)
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued writes are durable; return False on timeout."""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def close(self) -> None:
+        """Write out anything queued and stop the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._queue)
+        return {
+            'path': self.path,
+            'queued': queued,
+            'written': self._written,
+            'batches': self._batches,
+            'errors': self._errors
+        }
@@ -0,0 +1,152 @@
+"""Background summarization of conversation turns that fall out of history."""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.token_counter import TokenCounter
+from .session_store import Turn
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant.
+Keep names, decisions, facts, open questions and anything the user asked to remember.
+Write plain prose of at most {max_words} words and output only the summary.
+
+Current summary:
+{summary}
+
+Earlier exchanges to fold in:
+{turns}
+
+Updated summary:"""
+
+
+class ConversationCompactor:
+    """Folds evicted turns into a rolling per-session summary.
+
+    Turns are queued by ``submit`` and summarized on a background thread
+    with the (lightweight) model behind ``ollama_service``, so the chat
+    request that evicted them never waits. Turns evicted from the same
+    session while it waits are folded in together with one model call.
+    
+    Summaries are held in memory; ``on_summary`` is called with each new
+    one so it can be persisted (see ConversationService) and ``restore``
+    seeds a summary loaded from elsewhere.
+    """
+
+    def __init__(self, ollama_service, max_summary_tokens: int = 256,
+                 token_counter: Optional[TokenCounter] = None):
+        self.ollama = ollama_service
+        self.max_summary_tokens = max_summary_tokens
+        self.token_counter = token_counter or TokenCounter()
+        self._cond = threading.Condition()
+        self._queue: 'OrderedDict[str, List[Turn]]' = OrderedDict()
+        self._summaries: Dict[str, Tuple[str, int]] = {}
+        self.on_summary: Optional[Callable[[str, str, int], None]] = None
+        # The session being summarized, and whether forget() ran meanwhile
+        self._running: Optional[str] = None
+        self._discard = False
+        self._compactions = 0
+        self._turns_folded = 0
+        self._errors = 0
+        self._last_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name='conversation-compactor', daemon=True)
+        self._thread.start()
+
+    def submit(self, session_id: str, turns: List[Turn]) -> None:
+        """Queue evicted turns to be folded into the session's summary."""
+        if not turns:
+            return
+        with self._cond:
+            self._queue.setdefault(session_id, []).extend(turns)
+            self._cond.notify_all()
+
+    def get(self, session_id: str) -> Optional[Tuple[str, int]]:
+        """Return the session's summary and its token count, if any."""
+        with self._cond:
+            return self._summaries.get(session_id)
+
+    def restore(self, session_id: str, summary: Optional[Tuple[str, int]]) -> None:
+        """Replace the session's summary with one loaded from storage."""
+        with self._cond:
+            if summary:
+                self._summaries[session_id] = summary
+            else:
+                self._summaries.pop(session_id, None)
+    
+    def forget(self, session_id: str) -> None:
+        """Drop a session's summary and any queued turns."""
+        with self._cond:
+            self._summaries.pop(session_id, None)
+            self._queue.pop(session_id, None)
+            if self._running == session_id:
+                # The summary being written is of turns the session no longer has
+                self._discard = True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued turns are summarized; return False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and self._running is None, timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                session_id, turns = self._queue.popitem(last=False)
+                previous = self._summaries.get(session_id)
+                self._running = session_id
+                self._discard = False
+            try:
+                summary = self._summarize(previous[0] if previous else None, turns)
+            except Exception as e:
+                summary = None
+                logger.error(f"Error compacting conversation {session_id}: {e}")
+            saved = None
+            with self._cond:
+                if summary is None:
+                    self._errors += 1
+                elif not self._discard:
+                    saved = self._summaries[session_id] = (summary, self.token_counter.count(summary))
+                    self._compactions += 1
+                    self._turns_folded += len(turns)
+            if saved is not None and self.on_summary is not None:
+                try:
+                    self.on_summary(session_id, *saved)
+                except Exception as e:
+                    logger.error(f"Error saving summary of conversation {session_id}: {e}")
+            with self._cond:
+                self._running = None
+                self._cond.notify_all()
+
+    def _summarize(self, summary: Optional[str], turns: List[Turn]) -> Optional[str]:
+        exchanges = '\n\n'.join(f"User: {t.user}\nAssistant: {t.assistant}" for t in turns)
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(self.max_summary_tokens * 0.75),
+            summary=summary or '(none yet)',
+            turns=exchanges
+        )
+        start = time.time()
+        result = self.ollama.generate(
+            prompt,
+            options={'temperature': 0.2, 'num_predict': self.max_summary_tokens},
+            priority='extraction'
+        )
+        self._last_ms = round((time.time() - start) * 1000, 1)
+        if 'error' in result:
+            logger.warning(f"Conversation summary failed: {result['error']}")
+            return None
+        return result.get('response', '').strip() or None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'model': self.ollama.model_name,
+                'queued_sessions': len(self._queue),
+                'summaries': len(self._summaries),
+                'compactions': self._compactions,
+                'turns_folded': self._turns_folded,
+                'errors': self._errors,
+                'last_ms': self._last_ms
+            }
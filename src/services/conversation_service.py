@@ -1,23 +1,119 @@
 """Service for managing conversation history."""
 import uuid
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 
+from src.utils.token_counter import TokenCounter
+from .session_store import SessionStore, Turn, trim_count
+from .conversation_backend import ConversationBackend
+from .conversation_compactor import ConversationCompactor
+
 logger = logging.getLogger(__name__)
 
+# Approximate tokens added per turn by the chat template (role markers)
+TURN_OVERHEAD_TOKENS = 8
+
+
+def context_budget(num_ctx: int, max_tokens: int, system_prompt: Optional[str] = None,
+                   token_counter: Optional[TokenCounter] = None) -> int:
+    """Tokens left for history and the new message once the reply and system prompt fit."""
+    counter = token_counter or TokenCounter()
+    system_tokens = counter.count(system_prompt) + TURN_OVERHEAD_TOKENS if system_prompt else 0
+    return max(0, num_ctx - max_tokens - system_tokens)
+
 
 class ConversationService:
-    """Manages conversation history and context."""
+    """Manages conversation history and context.
+    
+    Each turn's token count is computed once when it is added and a running
+    total is kept per session, so packing history into a token budget never
+    recounts earlier messages. Sessions live in a bounded SessionStore, so
+    idle or excess sessions are evicted instead of accumulating forever.
+    
+    With a ``backend`` the store is only a hot set: writes are persisted
+    behind the request, and a session is reloaded whenever another worker
+    has changed it or it was evicted, so any worker can serve any session.
+    The backend is checked once per request, by the call that reads the
+    session (``build_messages``, ``get_history`` ...); ``add_exchange``
+    only loads a session it does not hold.
+    
+    With a ``compactor`` turns trimmed from history are summarized in the
+    background and the summary is sent ahead of the remaining turns; with
+    a backend too, summaries are stored alongside the turns.
+    """
     
-    def __init__(self, max_history: int = 10):
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
+    def __init__(self, max_history: int = 10, token_budget: Optional[int] = None,
+                 token_counter: Optional[TokenCounter] = None, store: Optional[SessionStore] = None,
+                 backend: Optional[ConversationBackend] = None,
+                 compactor: Optional[ConversationCompactor] = None):
+        self.conversations = store if store is not None else SessionStore()
+        self.conversations.on_evict = self._on_evict
         self.max_history = max_history
+        # Most history tokens kept per session; None limits by turn count only
+        self.token_budget = token_budget
+        self.token_counter = token_counter or TokenCounter()
+        self.token_totals: Dict[str, int] = {}
+        self.backend = backend
+        # Backend version each in-memory session corresponds to
+        self.versions: Dict[str, int] = {}
+        self.compactor = compactor
+        if compactor is not None and backend is not None:
+            compactor.on_summary = self._save_summary
+    
+    def _on_evict(self, session_id: str, turns: List[Turn]) -> None:
+        """Drop per-session state when the store evicts a session."""
+        self.token_totals.pop(session_id, None)
+        self.versions.pop(session_id, None)
+        if self.compactor is not None:
+            self.compactor.forget(session_id)
+    
+    def _save_summary(self, session_id: str, summary: str, tokens: int) -> None:
+        self.backend.save_summary(session_id, summary, tokens)
+        self._persisted(session_id)
+    
+    def _summary(self, session_id: str) -> Optional[Tuple[str, int]]:
+        return self.compactor.get(session_id) if self.compactor is not None else None
+    
+    def _sync(self, session_id: Optional[str]) -> None:
+        """Reload a session from the backend if another worker changed it."""
+        if self.backend is None or not session_id or self.backend.pending(session_id):
+            return
+        version = self.backend.version(session_id)
+        if version and (version > self.versions.get(session_id, 0) or session_id not in self.conversations):
+            version, turns = self.backend.load(session_id)
+            self.conversations[session_id] = turns
+            self.token_totals.pop(session_id, None)
+            self.versions[session_id] = version
+            if self.compactor is not None:
+                self.compactor.restore(session_id, self.backend.load_summary(session_id))
+    
+    def _persisted(self, session_id: str) -> None:
+        # The backend bumps the version once per write
+        self.versions[session_id] = self.versions.get(session_id, 0) + 1
+    
+    def _turn_tokens(self, turn: Turn) -> int:
+        tokens = turn.tokens
+        if tokens is None:
+            tokens = (self.token_counter.count(turn.user) + self.token_counter.count(turn.assistant)
+                      + 2 * TURN_OVERHEAD_TOKENS)
+            turn.tokens = tokens
+        return tokens
+    
+    def get_token_total(self, session_id: str) -> int:
+        """Return the running token total of a session's history."""
+        total = self.token_totals.get(session_id)
+        if total is None:
+            # History was set directly; count it once
+            total = sum(self._turn_tokens(msg) for msg in self.conversations.get(session_id, []))
+            self.token_totals[session_id] = total
+        return total
     
     def get_or_create_session(self, session_id: Optional[str] = None) -> str:
         """Get existing session or create new one."""
         if not session_id:
             session_id = str(uuid.uuid4())
         
+        self._sync(session_id)
         if session_id not in self.conversations:
             self.conversations[session_id] = []
             
@@ -26,42 +122,114 @@ class ConversationService:
     def add_exchange(self, session_id: str, user_input: str, assistant_response: str) -> None:
         """Add a conversation exchange to history."""
         if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        
-        self.conversations[session_id].append({
-            'user': user_input,
-            'assistant': assistant_response
-        })
+            self._sync(session_id)
+        turn = Turn(user_input, assistant_response)
+        total = self.get_token_total(session_id) + self._turn_tokens(turn)
+        history = self.conversations.append(session_id, turn)
         
-        # Limit conversation history
-        if len(self.conversations[session_id]) > self.max_history:
-            self.conversations[session_id] = self.conversations[session_id][-self.max_history:]
+        # Limit conversation history by turn count and token budget (see
+        # trim_count: history is cut to half a limit in one step, so it and
+        # the model's cached prompt prefix stay stable for many turns); the
+        # running total is adjusted by the turns added and dropped only
+        drop = trim_count(map(self._turn_tokens, history), len(history), total,
+                          self.max_history, self.token_budget)
+        if drop:
+            dropped = history[:drop]
+            total -= sum(self._turn_tokens(t) for t in dropped)
+            if self.compactor is not None:
+                self.compactor.submit(session_id, dropped)
+            history = history[drop:]
+            self.conversations[session_id] = history
+        self.token_totals[session_id] = total
+        if self.backend is not None:
+            self.backend.append(session_id, turn, self.max_history, self.token_budget)
+            self._persisted(session_id)
     
     def build_context(self, session_id: str, user_input: str) -> str:
         """Build conversation context for the model."""
+        self._sync(session_id)
+        return self.format_context(
+            self._as_messages(self.conversations.get(session_id, []), self._summary(session_id)),
+            user_input
+        )
+    
+    @staticmethod
+    def format_context(messages: List[Dict[str, str]], user_input: str) -> str:
+        """Render chat messages (as from ``build_messages``) as one plain-text prompt."""
         context = ""
-        
-        if session_id in self.conversations:
-            for msg in self.conversations[session_id]:
-                context += f"Human: {msg['user']}\n\n{msg['assistant']}\n\n"
-        
+        for msg in messages:
+            if msg['role'] == 'user':
+                context += f"Human: {msg['content']}\n\n"
+            else:
+                context += f"{msg['content']}\n\n"
         context += f"Human: {user_input}\n\n"
         return context
     
-    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+    @staticmethod
+    def _as_messages(turns: List[Turn], summary: Optional[Tuple[str, int]]) -> List[Dict[str, str]]:
+        messages = []
+        if summary:
+            messages.append({'role': 'system', 'content': f"Summary of earlier conversation: {summary[0]}"})
+        for msg in turns:
+            messages.append({'role': 'user', 'content': msg.user})
+            messages.append({'role': 'assistant', 'content': msg.assistant})
+        return messages
+    
+    def build_messages(self, session_id: str, user_input: Optional[str] = None,
+                       budget: Optional[int] = None) -> List[Dict[str, str]]:
+        """Build earlier turns as chat messages for the model.
+        
+        Turns are emitted in order and never rewritten, and ``add_exchange``
+        trims history in large steps, so between trims each request's
+        messages extend the previous request's and the backend can reuse
+        its cached prompt prefix. With a ``budget`` (defaulting to the
+        service's) the oldest turns are skipped until history plus the new
+        message fit. A summary of already-trimmed turns, when there is one
+        and it fits, leads as a system message.
+        """
+        self._sync(session_id)
+        history = self.conversations.get(session_id, [])
+        budget = self.token_budget if budget is None else budget
+        summary = self._summary(session_id)
+        start = 0
+        if budget is not None:
+            available = budget - (self.token_counter.count(user_input) + TURN_OVERHEAD_TOKENS
+                                  if user_input else 0)
+            if summary:
+                if summary[1] + TURN_OVERHEAD_TOKENS <= available:
+                    available -= summary[1] + TURN_OVERHEAD_TOKENS
+                else:
+                    summary = None
+            total = self.get_token_total(session_id)
+            while start < len(history) and total > available:
+                total -= self._turn_tokens(history[start])
+                start += 1
+        
+        return self._as_messages(history[start:], summary)
+    
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Get conversation history for a session."""
-        return self.conversations.get(session_id, [])
+        self._sync(session_id)
+        return [turn.to_dict() for turn in self.conversations.get(session_id, [])]
     
     def clear_session(self, session_id: str) -> bool:
         """Clear conversation history for a session."""
+        self._sync(session_id)
         if session_id in self.conversations:
             self.conversations[session_id] = []
+            self.token_totals[session_id] = 0
+            if self.compactor is not None:
+                self.compactor.forget(session_id)
+            if self.backend is not None:
+                self.backend.replace(session_id, [])
+                self._persisted(session_id)
             logger.info(f"Cleared conversation for session: {session_id}")
             return True
         return False
     
     def get_token_estimate(self, session_id: str) -> int:
         """Estimate token count for conversation (rough estimate)."""
+        self._sync(session_id)
         if session_id not in self.conversations:
             return 0
         
@@ -70,4 +238,13 @@ class ConversationService:
         for msg in self.conversations[session_id]:
             char_count += len(msg['user']) + len(msg['assistant'])
         
-        return char_count // 4
\ No newline at end of file
+        return char_count // 4
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hot-set stats and, if persistent, backend write stats."""
+        stats = self.conversations.get_stats()
+        if self.backend is not None:
+            stats['backend'] = self.backend.get_stats()
+        if self.compactor is not None:
+            stats['compactor'] = self.compactor.get_stats()
+        return stats
@@ -0,0 +1,146 @@
+"""Tracking and cancellation of in-flight streaming generations."""
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from .stream_buffer import StreamBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class Generation:
+    """One streaming response and the upstream token stream feeding it."""
+
+    def __init__(self, endpoint: str):
+        self.id = uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.started_at = time.time()
+        self.cancel_event = threading.Event()
+        # 'completed', 'cancelled', 'disconnected' or 'error'
+        self.outcome = 'completed'
+        self.tokens_received = 0
+        self.tokens_delivered = 0
+        self._stream = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def attach(self, stream):
+        """Remember the upstream stream so it can be closed when we finish."""
+        self._stream = stream
+        return stream
+
+    def close_stream(self) -> None:
+        """Close the upstream stream, which drops the connection to Ollama."""
+        stream, self._stream = self._stream, None
+        close = getattr(stream, 'close', None)
+        if close is not None:
+            close()
+
+
+class GenerationRegistry:
+    """Registry of active generations with cancel and waste accounting.
+
+    Streaming endpoints run inside ``track()``. If the client goes away the
+    server closes the response generator, ``GeneratorExit`` reaches the
+    block and the upstream stream is closed right away instead of being
+    drained to the end. ``cancel()`` asks a generation to stop at its next
+    token. Tokens read from Ollama but never delivered are counted as wasted.
+
+    Resumable generations also register a StreamBuffer, kept for
+    ``buffer_ttl`` seconds after the stream ends so clients can reconnect.
+    """
+
+    def __init__(self, buffer_ttl: float = 300.0, max_buffers: int = 1000):
+        self._lock = threading.Lock()
+        self._active: Dict[str, Generation] = {}
+        self._counts = {'started': 0, 'completed': 0, 'cancelled': 0, 'disconnected': 0, 'error': 0}
+        self._wasted_tokens = 0
+        self.buffer_ttl = buffer_ttl
+        self.max_buffers = max_buffers
+        self._buffers: 'OrderedDict[str, StreamBuffer]' = OrderedDict()
+
+    def start(self, endpoint: str) -> Generation:
+        generation = Generation(endpoint)
+        with self._lock:
+            self._active[generation.id] = generation
+            self._counts['started'] += 1
+        return generation
+
+    def get(self, generation_id: str) -> Optional[Generation]:
+        with self._lock:
+            return self._active.get(generation_id)
+
+    def cancel(self, generation_id: str) -> bool:
+        """Request cancellation; returns False if the generation is not running."""
+        generation = self.get(generation_id)
+        if generation is None:
+            return False
+        generation.cancel_event.set()
+        return True
+
+    def finish(self, generation: Generation) -> None:
+        """Close the upstream stream and record how the generation ended."""
+        try:
+            generation.close_stream()
+        except Exception as e:
+            logger.warning(f"Closing upstream stream for {generation.id} failed: {e}")
+
+        wasted = 0
+        if generation.outcome in ('cancelled', 'disconnected'):
+            wasted = max(0, generation.tokens_received - generation.tokens_delivered)
+            logger.info(f"Generation {generation.id} ({generation.endpoint}) {generation.outcome} "
+                        f"after {generation.tokens_delivered} tokens, {wasted} wasted")
+        with self._lock:
+            self._active.pop(generation.id, None)
+            self._counts[generation.outcome] += 1
+            self._wasted_tokens += wasted
+
+    def get_buffer(self, generation_id: str) -> Optional[StreamBuffer]:
+        """Return the resume buffer of a running or recently finished generation."""
+        with self._lock:
+            self._sweep()
+            return self._buffers.get(generation_id)
+
+    def _sweep(self) -> None:
+        """Drop buffers of streams that ended more than ``buffer_ttl`` ago, then the oldest over the cap."""
+        now = time.monotonic()
+        for generation_id, buffer in list(self._buffers.items()):
+            if buffer.closed and now - buffer.closed_at > self.buffer_ttl:
+                del self._buffers[generation_id]
+        while len(self._buffers) > self.max_buffers:
+            self._buffers.popitem(last=False)
+
+    @contextmanager
+    def track(self, endpoint: str, buffer: Optional[StreamBuffer] = None) -> Iterator[Generation]:
+        """Register a generation for the duration of a streaming response."""
+        generation = self.start(endpoint)
+        if buffer is not None:
+            buffer.generation_id = generation.id
+            with self._lock:
+                self._sweep()
+                self._buffers[generation.id] = buffer
+        try:
+            yield generation
+        except GeneratorExit:
+            generation.outcome = 'disconnected'
+            raise
+        except Exception:
+            generation.outcome = 'error'
+            raise
+        finally:
+            self.finish(generation)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return active, outcome and wasted-token counters."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+            stats['active'] = len(self._active)
+            stats['wasted_tokens'] = self._wasted_tokens
+            stats['resume_buffers'] = len(self._buffers)
+            return stats
@@ -13,6 +13,7 @@ class KeywordExtractor:
     """Extract keywords and entities from text using LLM."""
     
     def __init__(self, ollama_service, model_name: str = "phi3"):
+        """``ollama_service`` is the registry handle serving ``model_name``."""
         self.ollama = ollama_service
         self.model_name = model_name
         
@@ -39,7 +40,9 @@ Return ONLY valid JSON, no other text."""
             response = self.ollama.generate(prompt, options={
                 "temperature": 0.3,
                 "num_predict": 500
-            })
+            }, priority='extraction')
+            if 'error' in response:
+                raise RuntimeError(response['error'])
             
             response_text = response.get('response', '{}')
             
@@ -81,7 +84,9 @@ Return ONLY valid JSON, no other text."""
             response = self.ollama.generate(prompt, options={
                 "temperature": 0.3,
                 "num_predict": 400
-            })
+            }, priority='extraction')
+            if 'error' in response:
+                raise RuntimeError(response['error'])
             
             response_text = response.get('response', '{}')
             
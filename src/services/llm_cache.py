@@ -0,0 +1,176 @@
+"""Persistent SQLite cache for deterministic LLM generate() calls."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from .single_flight import request_key
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """LRU + TTL cache of generate() responses stored in SQLite.
+
+    Entries are keyed by model, prompt hash and options. Total stored bytes
+    are capped; past the cap the least recently used entries are evicted
+    down to ``LOW_WATER`` of it, so a full cache does not evict on every
+    write. Expired entries are missed on read and swept in bulk at most
+    every ``sweep_interval`` seconds.
+    """
+
+    # Fraction of max_bytes left after a size eviction
+    LOW_WATER = 0.9
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 7 * 24 * 3600, max_temperature: float = 0.3,
+                 sweep_interval: float = 60.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                options TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()[0]
+
+    def accepts(self, options: Optional[Dict[str, Any]] = None) -> bool:
+        """Return True if a call with these options is deterministic enough to cache.
+
+        The temperature must be set explicitly: without one Ollama samples
+        at its default (0.8), so the call is not repeatable.
+        """
+        temperature = (options or {}).get('temperature')
+        return temperature is not None and temperature <= self.max_temperature
+
+    def get(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached response, or None on a miss or expired entry."""
+        key = request_key(model, prompt, options)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, size, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, size, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return json.loads(response)
+
+    def put(self, model: str, prompt: str, options: Optional[Dict[str, Any]],
+            response: Dict[str, Any]) -> None:
+        """Store a response, evicting old entries when a sweep is due or the cap is passed."""
+        key = request_key(model, prompt, options)
+        payload = json.dumps(response, separators=(',', ':'))
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, model,
+                    hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+                    json.dumps(options or {}, sort_keys=True),
+                    payload, size, now, now
+                )
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Sweep expired entries when due, then least recently used ones over the cap."""
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            cutoff = time.time() - self.ttl_seconds
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache WHERE created_at < ?", (cutoff,)
+            ).fetchone()
+            if count:
+                self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,))
+                self._total_bytes -= size
+                self.evictions += count
+
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        doomed = []
+        excess = self._total_bytes - int(self.max_bytes * self.LOW_WATER)
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+            doomed.append((key,))
+            excess -= size
+            self._total_bytes -= size
+            if excess <= 0:
+                break
+
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and storage usage."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
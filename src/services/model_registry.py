@@ -0,0 +1,61 @@
+"""Registry of per-model Ollama service handles."""
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+from .ollama_service import OllamaService
+from .ollama_transport import OllamaTransport
+from .ollama_backends import BackendPool
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Hands out one OllamaService per model name.
+
+    Handles share the HTTP transport, backend pool, admission scheduler,
+    response cache and request coalescing, but each has its own model name,
+    default options and optional concurrency budget. Callers ask for the
+    model they need instead of switching a shared service between models.
+    """
+
+    def __init__(self, base_url: str, model_options: Optional[Dict[str, Dict[str, Any]]] = None,
+                 model_concurrency: Optional[Dict[str, int]] = None, **shared: Any):
+        """``shared`` holds OllamaService keyword arguments common to every handle."""
+        self.base_url = base_url
+        self.model_options = model_options or {}
+        self.model_concurrency = model_concurrency or {}
+        shared.setdefault('transport', OllamaTransport())
+        shared.setdefault('backends', BackendPool([base_url]))
+        shared.setdefault('single_flight', SingleFlight())
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._handles: Dict[str, OllamaService] = {}
+
+    def get(self, model_name: str) -> OllamaService:
+        """Return the handle for ``model_name``, creating it on first use."""
+        with self._lock:
+            handle = self._handles.get(model_name)
+            if handle is None:
+                handle = OllamaService(
+                    self.base_url,
+                    model_name,
+                    default_options=self.model_options.get(model_name),
+                    max_concurrency=self.model_concurrency.get(model_name),
+                    **self.shared
+                )
+                self._handles[model_name] = handle
+                logger.info(f"Created Ollama handle for {model_name}")
+            return handle
+
+    @property
+    def models(self) -> List[str]:
+        with self._lock:
+            return list(self._handles)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return each handle's concurrency budget and defaults."""
+        with self._lock:
+            handles = dict(self._handles)
+        return {name: handle.get_stats() for name, handle in handles.items()}
@@ -0,0 +1,98 @@
+"""Model warm-up and keep_alive pinning for Ollama backends."""
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmer:
+    """Preloads models on every backend and keeps them resident.
+
+    Each warm-up issues an empty generation (or a tiny embedding) with a
+    controlled ``keep_alive``, records Ollama's reported ``load_duration``
+    and then checks ``/api/ps`` to verify the model is actually loaded.
+    """
+
+    def __init__(self, ollama_service, models: List[Tuple[str, str]], keep_alive: str = '30m',
+                 interval: Optional[float] = None):
+        """``models`` is a list of (model name, 'generate' | 'embed') pairs."""
+        self.ollama = ollama_service
+        self.models = models
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._report: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def warm_model(self, backend_url: str, model: str, kind: str = 'generate') -> Dict[str, Any]:
+        """Load one model on one backend and return its warm-up result."""
+        if kind == 'embed':
+            url = f"{backend_url}/api/embed"
+            payload = {"model": model, "input": "warmup", "keep_alive": self.keep_alive}
+        else:
+            url = f"{backend_url}/api/generate"
+            payload = {"model": model, "prompt": "", "stream": False, "keep_alive": self.keep_alive}
+
+        start = time.time()
+        result = {
+            'model': model,
+            'backend': backend_url,
+            'warmed_at': datetime.utcnow().isoformat()
+        }
+        try:
+            response = self.ollama.transport.post(url, json=payload)
+            response.raise_for_status()
+            body = response.json()
+            result['status'] = 'ok'
+            # Ollama reports durations in nanoseconds
+            result['load_ms'] = round(body.get('load_duration', 0) / 1e6, 1)
+            result['loaded'] = self._is_loaded(backend_url, model)
+        except Exception as e:
+            logger.warning(f"Warm-up of {model} on {backend_url} failed: {e}")
+            result['status'] = 'error'
+            result['error'] = str(e)
+            result['loaded'] = False
+        result['total_ms'] = round((time.time() - start) * 1000, 1)
+        return result
+
+    def _is_loaded(self, backend_url: str, model: str) -> bool:
+        """Check /api/ps to confirm the model is resident."""
+        response = self.ollama.transport.get(f"{backend_url}/api/ps", timeout=5)
+        if response.status_code != 200:
+            return False
+        names = {m.get('name') for m in response.json().get('models', [])}
+        return model in names or f"{model}:latest" in names
+
+    def warm_all(self) -> Dict[str, Dict[str, Any]]:
+        """Warm every configured model on every backend."""
+        for backend in self.ollama.backends.backends:
+            for model, kind in self.models:
+                result = self.warm_model(backend.url, model, kind)
+                if result['status'] == 'ok':
+                    logger.info(f"Warmed {model} on {backend.url}: load {result['load_ms']}ms")
+                with self._lock:
+                    self._report[f"{backend.url}|{model}"] = result
+        return self.get_report()
+
+    def start(self) -> None:
+        """Warm up in the background now, then every ``interval`` seconds if set."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                self.warm_all()
+                if not self.interval:
+                    return
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(target=run, name='ollama-model-warmup', daemon=True)
+        self._thread.start()
+
+    def get_report(self) -> Dict[str, Dict[str, Any]]:
+        """Return the latest warm-up result per backend and model."""
+        with self._lock:
+            return {key: dict(value) for key, value in self._report.items()}
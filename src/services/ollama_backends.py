@@ -0,0 +1,168 @@
+"""Pool of Ollama backends with least-outstanding-requests routing."""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_model(name: str) -> str:
+    """Treat 'phi3' and 'phi3:latest' as the same model."""
+    return name if ':' in name else f"{name}:latest"
+
+
+class OllamaBackend:
+    """Routing state for one Ollama host."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.models: Optional[Set[str]] = None
+        self.consecutive_failures = 0
+        self.error_rate = 0.0
+        self.ejected_until = 0.0
+        self.backoff = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > time.monotonic()
+
+    def has_model(self, model: Optional[str]) -> bool:
+        """Return True if the model is known to be available (or unknown)."""
+        if not model or self.models is None:
+            return True
+        return _normalize_model(model) in self.models
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'outstanding': self.outstanding,
+            'ejected': self.ejected,
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate, 3),
+            'models': sorted(self.models) if self.models is not None else None
+        }
+
+
+class BackendPool:
+    """Routes each call to the admitted backend with the fewest in-flight requests.
+
+    Backends are ejected after repeated failures or a high error rate and
+    re-admitted once an exponentially growing backoff has elapsed.
+    """
+
+    ERROR_RATE_ALPHA = 0.2
+    # Sessions remembered for backend affinity
+    MAX_AFFINITY = 10000
+
+    def __init__(self, urls: Iterable[str], failure_threshold: int = 3,
+                 error_rate_threshold: float = 0.5, base_backoff: float = 5.0,
+                 max_backoff: float = 300.0):
+        self.backends: List[OllamaBackend] = [OllamaBackend(url) for url in urls]
+        if not self.backends:
+            raise ValueError("BackendPool requires at least one URL")
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._monitor: Optional[threading.Thread] = None
+        self._affinity: 'OrderedDict[str, OllamaBackend]' = OrderedDict()
+
+    def acquire(self, model: Optional[str] = None, exclude: Optional[OllamaBackend] = None,
+                affinity: Optional[str] = None) -> Optional[OllamaBackend]:
+        """Pick a backend for a call and count it as in flight.
+
+        With ``exclude`` only other admitted backends are considered and
+        None is returned if there are none. Calls sharing an ``affinity``
+        key (e.g. a chat session) stay on the same backend while it is
+        healthy, so Ollama can reuse its KV cache for the earlier turns.
+        """
+        with self._lock:
+            admitted = [b for b in self.backends if not b.ejected]
+            if exclude is not None:
+                admitted = [b for b in admitted if b is not exclude]
+                if not admitted:
+                    return None
+            if not admitted:
+                # Everything is ejected: try the one closest to re-admission
+                admitted = [min(self.backends, key=lambda b: b.ejected_until)]
+
+            candidates = [b for b in admitted if b.has_model(model)] or admitted
+            backend = self._affinity.get(affinity) if affinity else None
+            if backend not in candidates:
+                backend = min(candidates, key=lambda b: b.outstanding)
+            if affinity:
+                self._affinity[affinity] = backend
+                self._affinity.move_to_end(affinity)
+                if len(self._affinity) > self.MAX_AFFINITY:
+                    self._affinity.popitem(last=False)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: OllamaBackend, success: bool = True) -> None:
+        """Mark a call finished and update the backend's health."""
+        with self._lock:
+            backend.outstanding -= 1
+            self._record(backend, success)
+
+    def record_health(self, backend: OllamaBackend, healthy: bool,
+                      models: Optional[Iterable[str]] = None) -> None:
+        """Apply the result of a health probe to a backend."""
+        with self._lock:
+            if models is not None:
+                backend.models = {_normalize_model(m) for m in models}
+            if healthy and backend.ejected:
+                # Still backing off; wait for the window before re-admitting
+                return
+            self._record(backend, healthy)
+
+    def _record(self, backend: OllamaBackend, success: bool) -> None:
+        alpha = self.ERROR_RATE_ALPHA
+        backend.error_rate = (1 - alpha) * backend.error_rate + alpha * (0.0 if success else 1.0)
+
+        if success:
+            backend.consecutive_failures = 0
+            backend.backoff = 0.0
+            return
+
+        backend.errors += 1
+        if backend.ejected:
+            return
+        backend.consecutive_failures += 1
+        if (backend.consecutive_failures >= self.failure_threshold
+                or backend.error_rate >= self.error_rate_threshold):
+            backend.backoff = min(self.max_backoff, (backend.backoff * 2) or self.base_backoff)
+            backend.ejected_until = time.monotonic() + backend.backoff
+            backend.consecutive_failures = 0
+            logger.warning(f"Ejected Ollama backend {backend.url} for {backend.backoff:.0f}s")
+
+    def start_monitor(self, probe, interval: float = 15.0) -> None:
+        """Periodically call ``probe(backend)`` -> (healthy, models) on a daemon thread."""
+        if self._monitor is not None:
+            return
+
+        def run():
+            while True:
+                for backend in self.backends:
+                    try:
+                        healthy, models = probe(backend)
+                    except Exception as e:
+                        logger.debug(f"Health probe for {backend.url} failed: {e}")
+                        healthy, models = False, None
+                    self.record_health(backend, healthy, models)
+                time.sleep(interval)
+
+        self._monitor = threading.Thread(target=run, name='ollama-backend-monitor', daemon=True)
+        self._monitor.start()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return per-backend routing state."""
+        with self._lock:
+            return {'backends': [b.to_dict() for b in self.backends]}
@@ -0,0 +1,80 @@
+"""Text embeddings from Ollama's embedding models."""
+import logging
+from typing import List, Optional
+
+from .ollama_transport import OllamaTransport
+from .admission import AdmissionScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaEmbeddingFunction:
+    """Custom embedding function using Ollama instead of sentence-transformers."""
+    
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "nomic-embed-text",
+                 transport: Optional[OllamaTransport] = None,
+                 scheduler: Optional[AdmissionScheduler] = None, keep_alive: Optional[str] = None):
+        self.base_url = base_url
+        self.model = model
+        self.transport = transport or OllamaTransport()
+        self.scheduler = scheduler
+        self.keep_alive = keep_alive
+    
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        """Generate embeddings using Ollama."""
+        embeddings = []
+        for text in input:
+            embedding = self.embed(text)
+            if embedding is None:
+                # Fallback to simple hash-based embedding if Ollama fails
+                embedding = self._fallback_embedding(text)
+            embeddings.append(embedding)
+        return embeddings
+    
+    def embed(self, text: str, priority: str = 'embedding',
+              timeout: Optional[float] = None) -> Optional[List[float]]:
+        """Embed one text, or return None if Ollama fails or ``timeout`` passes.
+        
+        Callers on a request path pass their own ``priority`` and a short
+        ``timeout`` (covering both the admission wait and the HTTP call) so
+        an embedding never queues behind background work.
+        """
+        try:
+            response = self._post_embedding(text, priority, timeout)
+            if response.status_code == 200:
+                return response.json().get("embedding", [])
+            logger.warning(f"Ollama embedding returned {response.status_code}")
+        except Exception as e:
+            logger.warning(f"Ollama embedding failed: {e}")
+        return None
+    
+    def _post_embedding(self, text: str, priority: str = 'embedding', timeout: Optional[float] = None):
+        """Request one embedding, waiting for a ``priority`` slot if scheduled."""
+        url = f"{self.base_url}/api/embeddings"
+        payload = {"model": self.model, "prompt": text}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        kwargs = {} if timeout is None else {'timeout': timeout}
+        if self.scheduler is None:
+            return self.transport.post(url, json=payload, **kwargs)
+        with self.scheduler.slot(priority, timeout):
+            return self.transport.post(url, json=payload, **kwargs)
+    
+    def _fallback_embedding(self, text: str, dim: int = 384) -> List[float]:
+        """Create a simple deterministic embedding from text."""
+        # This is a very basic fallback - not great for similarity but works
+        import hashlib
+        hash_obj = hashlib.sha256(text.encode())
+        hash_bytes = hash_obj.digest()
+        
+        # Convert to floats between -1 and 1
+        embedding = []
+        for i in range(0, min(len(hash_bytes), dim)):
+            value = (hash_bytes[i] - 128) / 128.0
+            embedding.append(value)
+        
+        # Pad if necessary
+        while len(embedding) < dim:
+            embedding.append(0.0)
+        
+        return embedding[:dim]
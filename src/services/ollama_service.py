@@ -1,8 +1,20 @@
 """Service for interacting with Ollama API."""
 import requests
-import json
 import logging
-from typing import Generator, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Generator, Dict, Any, List, Optional, Tuple
+
+from .ollama_transport import OllamaTransport
+from .single_flight import SingleFlight, request_key
+from .llm_cache import LLMResponseCache
+from .ollama_backends import BackendPool, OllamaBackend
+from .admission import AdmissionScheduler, AdmissionTimeout
+from .resilience import CircuitBreaker, LatencyWindow
+from src.utils.stream_framing import loads
+from src.utils.token_calibrator import TokenCalibrator
 
 logger = logging.getLogger(__name__)
 
@@ -10,39 +22,175 @@ logger = logging.getLogger(__name__)
 class OllamaService:
     """Handles all Ollama API interactions."""
     
-    def __init__(self, base_url: str, model_name: str):
+    def __init__(self, base_url: str, model_name: str, transport: Optional[OllamaTransport] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 cache: Optional[LLMResponseCache] = None, backends: Optional[BackendPool] = None,
+                 scheduler: Optional[AdmissionScheduler] = None, admission_timeout: Optional[float] = None,
+                 keep_alive: Optional[str] = None, default_options: Optional[Dict[str, Any]] = None,
+                 max_concurrency: Optional[int] = None, generate_timeout: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None, hedge_max_prompt_chars: Optional[int] = None,
+                 hedge_min_samples: int = 20, calibrator: Optional[TokenCalibrator] = None):
         self.base_url = base_url
         self.model_name = model_name
-        
-    def check_health(self) -> Dict[str, Any]:
-        """Check if Ollama service is available."""
+        self.transport = transport or OllamaTransport()
+        self.single_flight = single_flight or SingleFlight()
+        self.cache = cache
+        self.backends = backends or BackendPool([base_url])
+        self.scheduler = scheduler
+        self.admission_timeout = admission_timeout
+        # How long Ollama keeps the model resident after each call (e.g. '30m')
+        self.keep_alive = keep_alive
+        # Model-specific defaults for options a call does not set itself
+        self.default_options = dict(default_options or {})
+        # Optional cap on concurrent calls to this model, on top of the scheduler
+        self.max_concurrency = max_concurrency
+        self._model_slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._model_lock = threading.Lock()
+        self._model_active = 0
+        # Read deadline for non-streaming calls; None uses the transport default
+        self.generate_timeout = generate_timeout
+        self.breaker = breaker
+        # Short prompts get a second request on another backend after the p95 latency
+        self.hedge_max_prompt_chars = hedge_max_prompt_chars
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyWindow()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedges = 0
+        self._hedge_wins = 0
+        # Learns chars-per-token from the eval counts of finished calls
+        self.calibrator = calibrator
+    
+    def _options(self, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fill in this model's defaults underneath the per-call options."""
+        if not self.default_options:
+            return options or {}
+        return {**self.default_options, **(options or {})}
+    
+    @contextmanager
+    def _admit(self, priority: str):
+        """Hold this model's concurrency budget and an admission slot for the call."""
+        if self._model_slots is not None:
+            # Wait for our own model budget first so we never sit on a shared slot
+            if not self._model_slots.acquire(timeout=self.admission_timeout):
+                raise AdmissionTimeout(
+                    f"Timed out after {self.admission_timeout}s waiting for a {self.model_name} slot"
+                )
+        with self._model_lock:
+            self._model_active += 1
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
-            if response.status_code == 200:
-                models = response.json().get('models', [])
-                model_names = [m['name'] for m in models]
-                return {
-                    'status': 'connected',
-                    'model_available': self.model_name in model_names,
-                    'models': model_names
-                }
+            if self.scheduler is None:
+                yield
             else:
-                return {'status': 'error', 'message': 'Failed to connect'}
-        except Exception as e:
-            logger.error(f"Health check failed: {e}")
-            return {'status': 'disconnected', 'message': str(e)}
+                with self.scheduler.slot(priority, self.admission_timeout):
+                    yield
+        finally:
+            with self._model_lock:
+                self._model_active -= 1
+            if self._model_slots is not None:
+                self._model_slots.release()
     
-    def generate_stream(self, prompt: str, options: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None) -> Generator[Dict[str, Any], None, None]:
-        """Generate streaming response from Ollama using chat endpoint."""
-        url = f"{self.base_url}/api/chat"
+    def get_stats(self) -> Dict[str, Any]:
+        """Return this model handle's concurrency budget and defaults."""
+        with self._model_lock:
+            stats = {
+                'active': self._model_active,
+                'max_concurrency': self.max_concurrency,
+                'default_options': dict(self.default_options),
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins
+            }
+        p95 = self.latency.percentile(0.95)
+        stats['generate_p95_ms'] = round(p95 * 1000, 1) if p95 is not None else None
+        return stats
+    
+    def probe_backend(self, backend: OllamaBackend) -> Tuple[bool, Optional[List[str]]]:
+        """Query one backend's model list; returns (healthy, model names)."""
+        response = self.transport.get(f"{backend.url}/api/tags", timeout=2)
+        if response.status_code != 200:
+            return False, None
+        return True, [m['name'] for m in response.json().get('models', [])]
+    
+    def check_health(self) -> Dict[str, Any]:
+        """Check if Ollama service is available on any backend."""
+        model_names: List[str] = []
+        healthy_count = 0
+        last_error = None
+        
+        for backend in self.backends.backends:
+            try:
+                healthy, models = self.probe_backend(backend)
+            except Exception as e:
+                logger.error(f"Health check failed for {backend.url}: {e}")
+                healthy, models, last_error = False, None, str(e)
+            self.backends.record_health(backend, healthy, models)
+            if healthy:
+                healthy_count += 1
+                model_names.extend(m for m in models if m not in model_names)
         
-        # Build messages array
+        if healthy_count:
+            result = {
+                'status': 'connected',
+                'model_available': self.model_name in model_names,
+                'models': model_names
+            }
+            if len(self.backends.backends) > 1:
+                result['backends_healthy'] = healthy_count
+                result['backends_total'] = len(self.backends.backends)
+            return result
+        if last_error:
+            return {'status': 'disconnected', 'message': last_error}
+        return {'status': 'error', 'message': 'Failed to connect'}
+    
+    def generate_stream(self, prompt: str, options: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None,
+                        priority: str = 'interactive', history: Optional[List[Dict[str, str]]] = None,
+                        session_id: Optional[str] = None) -> Generator[Dict[str, Any], None, None]:
+        """Generate streaming response from Ollama using chat endpoint.
+        
+        ``history`` holds earlier turns as chat messages; they are sent
+        ahead of the new prompt unchanged, and ``session_id`` pins the
+        conversation to one backend so the shared prefix stays cached.
+        """
+        options = self._options(options)
+        try:
+            with self._admit(priority):
+                backend = self.backends.acquire(self.model_name, affinity=session_id)
+                stream = self._stream_from(backend, prompt, options, system_prompt, history)
+                success = True
+                chars = 0
+                try:
+                    for chunk in stream:
+                        if 'error' in chunk:
+                            success = False
+                        elif self.calibrator is not None:
+                            chars += len(chunk.get('response', ''))
+                            if chunk.get('done'):
+                                self.calibrator.observe(self.model_name, chars, chunk.get('eval_count'))
+                        yield chunk
+                except Exception:
+                    success = False
+                    raise
+                finally:
+                    # Closing early (e.g. the client went away) drops the upstream response
+                    stream.close()
+                    self.backends.release(backend, success)
+        except AdmissionTimeout as e:
+            logger.warning(str(e))
+            yield {"error": str(e), "done": True}
+    
+    def _stream_from(self, backend: OllamaBackend, prompt: str, options: Optional[Dict[str, Any]],
+                     system_prompt: Optional[str],
+                     history: Optional[List[Dict[str, str]]] = None) -> Generator[Dict[str, Any], None, None]:
+        """Stream a chat completion from one backend."""
+        url = f"{backend.url}/api/chat"
+        
+        # Build messages array: system prompt, earlier turns, then the new message
         messages = []
         if system_prompt:
             messages.append({
                 "role": "system",
                 "content": system_prompt
             })
+        messages.extend(history or [])
         messages.append({
             "role": "user",
             "content": prompt
@@ -54,14 +202,16 @@ class OllamaService:
             "stream": True,
             "options": options or {}
         }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
         
         try:
-            with requests.post(url, json=payload, stream=True) as response:
+            with self.transport.post(url, json=payload, stream=True) as response:
                 response.raise_for_status()
                 
                 for line in response.iter_lines():
                     if line:
-                        chunk = json.loads(line)
+                        chunk = loads(line)
                         # The chat endpoint returns message.content instead of response
                         if 'message' in chunk and 'content' in chunk['message']:
                             chunk['response'] = chunk['message']['content']
@@ -71,21 +221,140 @@ class OllamaService:
             logger.error(f"Ollama request failed: {e}")
             yield {"error": str(e), "done": True}
     
-    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Generate non-streaming response from Ollama."""
-        url = f"{self.base_url}/api/generate"
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 use_cache: bool = True, priority: str = 'query',
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Generate non-streaming response from Ollama.
+        
+        Low-temperature calls are served from the response cache when one is
+        configured; pass ``use_cache=False`` to always hit the model.
+        Concurrent calls with the same model, prompt and options share a
+        single upstream generation, which waits for an admission slot of the
+        given priority class. ``timeout`` overrides the read deadline; when
+        the circuit breaker is open an error is returned immediately.
+        """
+        model = self.model_name
+        options = self._options(options)
+        cacheable = use_cache and self.cache is not None and self.cache.accepts(options)
+        
+        if cacheable:
+            cached = self.cache.get(model, prompt, options)
+            if cached is not None:
+                cached['cached'] = True
+                return cached
+        
+        if self.breaker is not None and not self.breaker.allow():
+            return {"error": "Ollama is unavailable (circuit open)", "circuit_open": True}
+        
+        key = request_key(model, prompt, options)
+        result, shared = self.single_flight.do(
+            key, lambda: self._admitted_generate(model, prompt, options, priority, timeout)
+        )
+        
+        if shared:
+            return dict(result)
+        if cacheable and 'error' not in result:
+            self.cache.put(model, prompt, options, result)
+        return result
+    
+    def _admitted_generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]],
+                           priority: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run one upstream generation once an admission slot is free."""
+        try:
+            with self._admit(priority):
+                result = self._generate(model, prompt, options, timeout)
+        except AdmissionTimeout as e:
+            logger.warning(str(e))
+            return {"error": str(e)}
         
+        if self.breaker is not None:
+            if 'error' in result:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        if self.calibrator is not None and 'error' not in result:
+            self.calibrator.observe(model, len(result.get('response', '')), result.get('eval_count'))
+        return result
+    
+    def _generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send one non-streaming generate request, hedging short prompts."""
         payload = {
-            "model": self.model_name,
+            "model": model,
             "prompt": prompt,
             "stream": False,
             "options": options or {}
         }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        timeout = timeout or self.generate_timeout
+        
+        backend = self.backends.acquire(model)
+        hedge_delay = self._hedge_delay(prompt)
+        if hedge_delay is None:
+            return self._post_generate(backend, payload, timeout)
+        return self._hedged_generate(backend, payload, timeout, hedge_delay)
+    
+    def _hedge_delay(self, prompt: str) -> Optional[float]:
+        """Return how long to wait before hedging, or None to not hedge."""
+        if (self.hedge_max_prompt_chars is None or len(prompt) > self.hedge_max_prompt_chars
+                or len(self.backends.backends) < 2 or len(self.latency) < self.hedge_min_samples):
+            return None
+        return self.latency.percentile(0.95)
+    
+    def _hedged_generate(self, backend: OllamaBackend, payload: Dict[str, Any],
+                         timeout: Optional[float], delay: float) -> Dict[str, Any]:
+        """Race a second backend against a primary request that outlives ``delay``."""
+        if self._hedge_pool is None:
+            with self._model_lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ollama-hedge')
+        
+        primary = self._hedge_pool.submit(self._post_generate, backend, payload, timeout)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        
+        hedge_backend = self.backends.acquire(payload['model'], exclude=backend)
+        if hedge_backend is None:
+            return primary.result()
+        with self._model_lock:
+            self._hedges += 1
+        hedge = self._hedge_pool.submit(self._post_generate, hedge_backend, payload, timeout)
+        
+        # First good answer wins; the loser finishes in the background
+        pending = {primary, hedge}
+        result: Dict[str, Any] = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if 'error' not in result:
+                    if future is hedge:
+                        with self._model_lock:
+                            self._hedge_wins += 1
+                    return result
+        return result
+    
+    def _post_generate(self, backend: OllamaBackend, payload: Dict[str, Any],
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST one generate request to an acquired backend and release it."""
+        kwargs = {}
+        if timeout:
+            kwargs['timeout'] = (self.transport.timeout[0], timeout)
         
+        start = time.monotonic()
+        success = False
         try:
-            response = requests.post(url, json=payload)
+            response = self.transport.post(f"{backend.url}/api/generate", json=payload, **kwargs)
             response.raise_for_status()
-            return response.json()
+            result = response.json()
+            success = True
+            self.latency.record(time.monotonic() - start)
+            return result
         except requests.exceptions.RequestException as e:
             logger.error(f"Ollama request failed: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+        finally:
+            self.backends.release(backend, success)
@@ -0,0 +1,104 @@
+"""Shared, connection-pooled HTTP transport for Ollama traffic."""
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class OllamaTransport:
+    """Thread-safe HTTP transport with a keep-alive connection pool.
+
+    Every thread gets its own lightweight ``requests.Session`` but all of
+    them mount the same ``HTTPAdapter``, so TCP connections to Ollama are
+    pooled and reused process-wide.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0,
+                 read_timeout: float = 300.0, keep_alive: bool = True):
+        self.pool_size = pool_size
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.keep_alive = keep_alive
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._error_count = 0
+
+    @property
+    def session(self) -> requests.Session:
+        """Return the calling thread's session bound to the shared pool."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            if not self.keep_alive:
+                session.headers['Connection'] = 'close'
+            self._local.session = session
+        return session
+
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None,
+                **kwargs: Any) -> requests.Response:
+        """Send a request through the pool, applying the default timeouts."""
+        with self._lock:
+            self._request_count += 1
+        try:
+            return self.session.request(
+                method, url,
+                timeout=self.timeout if timeout is None else timeout,
+                **kwargs
+            )
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._error_count += 1
+            raise
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a POST request."""
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return request and connection reuse counters."""
+        connections_opened = 0
+        pooled_requests = 0
+
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            connections_opened += pool.num_connections
+            pooled_requests += pool.num_requests
+
+        with self._lock:
+            request_count = self._request_count
+            error_count = self._error_count
+
+        return {
+            'pool_size': self.pool_size,
+            'keep_alive': self.keep_alive,
+            'requests': request_count,
+            'errors': error_count,
+            'connections_opened': connections_opened,
+            'connections_reused': max(0, pooled_requests - connections_opened)
+        }
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self._adapter.close()
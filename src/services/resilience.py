@@ -0,0 +1,100 @@
+"""Circuit breaking and latency tracking for Ollama calls."""
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Fails fast once Ollama keeps failing, then probes for recovery.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected without touching the network. Once ``reset_timeout``
+    seconds have passed a single trial call is let through (half-open); its
+    outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may go ahead."""
+        with self._lock:
+            if self._state == 'closed':
+                return True
+            now = time.monotonic()
+            if self._state == 'open' and now - self._opened_at >= self.reset_timeout:
+                self._state = 'half_open'
+                self._trial_started = now
+                return True
+            if self._state == 'half_open' and now - self._trial_started >= self.reset_timeout:
+                # The previous trial never reported back; allow another
+                self._trial_started = now
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != 'closed':
+                logger.info("Ollama circuit closed")
+            self._state = 'closed'
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == 'half_open' or (self._state == 'closed'
+                                              and self._failures >= self.failure_threshold):
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+                self._times_opened += 1
+                logger.warning(f"Ollama circuit opened after {self._failures} failures")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'times_opened': self._times_opened,
+                'rejected': self._rejected
+            }
+
+
+class LatencyWindow:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile in seconds, or None with no samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[int(q * (len(samples) - 1))]
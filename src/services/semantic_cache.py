@@ -0,0 +1,247 @@
+"""In-memory cache of streamed answers, matched by prompt embedding similarity."""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Lower bounds of the best-match similarity histogram
+SIMILARITY_BUCKETS = (0.5, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99)
+
+_WORD = re.compile(r'\s*\S+|\s+$')
+
+
+def replay_tokens(text: str) -> List[str]:
+    """Split a cached answer into word-sized tokens for replay as a stream."""
+    return _WORD.findall(text) or [text]
+
+
+def replay_frames(framer, text: str) -> Iterator[bytes]:
+    """Frame a cached answer through ``framer`` as if it were being generated."""
+    for token in replay_tokens(text):
+        frame = framer.push(token)
+        if frame:
+            yield frame
+    frame = framer.flush()
+    if frame:
+        yield frame
+
+
+def _normalize(vector: List[float]) -> Optional[List[float]]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        return None
+    return [x / norm for x in vector]
+
+
+def _bucket(similarity: float) -> str:
+    label = f"<{SIMILARITY_BUCKETS[0]}"
+    for edge in SIMILARITY_BUCKETS:
+        if similarity >= edge:
+            label = f">={edge}"
+    return label
+
+
+class SemanticLookup:
+    """Result of a cache lookup; pass it back to ``store`` after a miss."""
+
+    __slots__ = ('namespace', 'key', 'vector', 'response', 'similarity')
+
+    def __init__(self, namespace: str, key: str, vector: Optional[List[float]] = None,
+                 response: Optional[str] = None, similarity: float = 0.0):
+        self.namespace = namespace
+        self.key = key
+        self.vector = vector
+        self.response = response
+        self.similarity = similarity
+
+    @property
+    def hit(self) -> bool:
+        return self.response is not None
+
+
+class _Entry:
+    __slots__ = ('namespace', 'key', 'vector', 'response', 'created_at')
+
+    def __init__(self, namespace: str, key: str, vector: List[float], response: str):
+        self.namespace = namespace
+        self.key = key
+        self.vector = vector
+        self.response = response
+        self.created_at = time.time()
+
+
+class _Shelf:
+    """Entries of one namespace with their vectors stacked for one matrix product."""
+
+    __slots__ = ('entries', 'matrix')
+
+    def __init__(self):
+        self.entries: List[_Entry] = []
+        self.matrix = None
+
+    def similarities(self, vector: List[float]) -> List[float]:
+        if np is not None:
+            if self.matrix is None:
+                self.matrix = np.array([e.vector for e in self.entries], dtype=np.float32)
+            return (self.matrix @ np.asarray(vector, dtype=np.float32)).tolist()
+        return [sum(a * b for a, b in zip(e.vector, vector)) for e in self.entries]
+
+
+class SemanticCache:
+    """Answers to earlier prompts, reused when a new prompt means the same thing.
+
+    Prompts are embedded (by ``embed``, e.g. ``OllamaEmbeddingFunction.embed``)
+    and compared by cosine similarity against earlier prompts in the same
+    namespace -- the endpoint, model, system prompt and options -- so an
+    answer is only reused under identical generation settings. Identical
+    prompts match on a content hash without calling the embedding model.
+    Entries are dropped least recently used first beyond ``max_entries``
+    and after ``ttl_seconds``. Lookups embed at the caller's ``priority``
+    and give up after ``embed_timeout`` seconds, which counts as a miss.
+    """
+
+    def __init__(self, embed: Callable[..., Optional[List[float]]], threshold: float = 0.95,
+                 max_entries: int = 2048, ttl_seconds: float = 24 * 3600, max_chars: int = 8000,
+                 embed_timeout: float = 0.5):
+        self.embed = embed
+        self.embed_timeout = embed_timeout
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[tuple, _Entry]' = OrderedDict()
+        self._shelves: Dict[str, _Shelf] = {}
+        self._lookups = 0
+        self._hits = 0
+        self._exact_hits = 0
+        self._stores = 0
+        self._expired = 0
+        self._embed_errors = 0
+        self._embed_ms = 0.0
+        self._embeds = 0
+        self._histogram: Dict[str, int] = {}
+        self._hit_similarity = 0.0
+
+    @staticmethod
+    def namespace(endpoint: str, model: str, system_prompt: Optional[str],
+                  options: Optional[Dict[str, Any]] = None) -> str:
+        """Key the settings an answer depends on besides the prompt itself."""
+        raw = json.dumps([endpoint, model, system_prompt or '', options or {}], sort_keys=True)
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def lookup(self, namespace: str, text: str, priority: str = 'interactive') -> Optional[SemanticLookup]:
+        """Find a cached answer for ``text``; None if the text cannot be cached."""
+        if not text or len(text) > self.max_chars:
+            return None
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+        with self._lock:
+            self._lookups += 1
+            entry = self._live((namespace, key))
+            if entry is not None:
+                self._exact_hits += 1
+                self._record(1.0, hit=True)
+                return SemanticLookup(namespace, key, entry.vector, entry.response, 1.0)
+
+        start = time.time()
+        vector = self.embed(text, priority=priority, timeout=self.embed_timeout)
+        vector = _normalize(vector) if vector else None
+        with self._lock:
+            self._embeds += 1
+            self._embed_ms += (time.time() - start) * 1000
+            if vector is None:
+                self._embed_errors += 1
+                return SemanticLookup(namespace, key)
+
+            best, similarity = self._nearest(namespace, vector)
+            self._record(similarity, hit=best is not None and similarity >= self.threshold)
+            if best is None or similarity < self.threshold:
+                return SemanticLookup(namespace, key, vector, similarity=similarity)
+            return SemanticLookup(namespace, key, vector, best.response, similarity)
+
+    def store(self, lookup: Optional[SemanticLookup], response: str) -> None:
+        """Cache the answer generated after a miss."""
+        if lookup is None or lookup.hit or lookup.vector is None or not response:
+            return
+        entry = _Entry(lookup.namespace, lookup.key, lookup.vector, response)
+        with self._lock:
+            self._remove((entry.namespace, entry.key))
+            self._entries[(entry.namespace, entry.key)] = entry
+            shelf = self._shelves.setdefault(entry.namespace, _Shelf())
+            shelf.entries.append(entry)
+            shelf.matrix = None
+            self._stores += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _live(self, entry_id: tuple) -> Optional[_Entry]:
+        entry = self._entries.get(entry_id)
+        if entry is not None and time.time() - entry.created_at > self.ttl_seconds:
+            self._remove(entry_id)
+            self._expired += 1
+            return None
+        if entry is not None:
+            self._entries.move_to_end(entry_id)
+        return entry
+
+    def _nearest(self, namespace: str, vector: List[float]):
+        shelf = self._shelves.get(namespace)
+        if shelf is None or not shelf.entries:
+            return None, 0.0
+        similarities = shelf.similarities(vector)
+        index = max(range(len(similarities)), key=similarities.__getitem__)
+        best = shelf.entries[index]
+        if self._live((best.namespace, best.key)) is None:
+            return None, 0.0
+        return best, similarities[index]
+
+    def _remove(self, entry_id: tuple) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        shelf = self._shelves[entry.namespace]
+        shelf.entries.remove(entry)
+        shelf.matrix = None
+        if not shelf.entries:
+            del self._shelves[entry.namespace]
+
+    def _record(self, similarity: float, hit: bool) -> None:
+        bucket = _bucket(similarity)
+        self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+        if hit:
+            self._hits += 1
+            self._hit_similarity += similarity
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit rate, embedding cost and the distribution of best-match similarity."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'namespaces': len(self._shelves),
+                'threshold': self.threshold,
+                'lookups': self._lookups,
+                'hits': self._hits,
+                'exact_hits': self._exact_hits,
+                'misses': self._lookups - self._hits,
+                'hit_rate': round(self._hits / self._lookups, 3) if self._lookups else 0.0,
+                'mean_hit_similarity': round(self._hit_similarity / self._hits, 4) if self._hits else None,
+                'stores': self._stores,
+                'expired': self._expired,
+                'embed_errors': self._embed_errors,
+                'avg_embed_ms': round(self._embed_ms / self._embeds, 1) if self._embeds else 0.0,
+                'similarity': {label: self._histogram[label]
+                               for label in [f"<{SIMILARITY_BUCKETS[0]}"] + [f">={e}" for e in SIMILARITY_BUCKETS]
+                               if label in self._histogram}
+            }
@@ -0,0 +1,197 @@
+"""Bounded in-memory store for conversation sessions."""
+import sys
+import threading
+import time
+import logging
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Turn:
+    """One user/assistant exchange, stored without a per-turn dict."""
+
+    __slots__ = ('user', 'assistant', 'tokens')
+
+    def __init__(self, user: str, assistant: str, tokens: Optional[int] = None):
+        self.user = user
+        self.assistant = assistant
+        self.tokens = tokens
+
+    @classmethod
+    def from_value(cls, value: Any) -> 'Turn':
+        if isinstance(value, Turn):
+            return value
+        return cls(value['user'], value['assistant'], value.get('tokens'))
+
+    def __getitem__(self, key: str) -> Any:
+        # Dict-style access for callers written against the old records
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, dict):
+            other = Turn.from_value(other)
+        if not isinstance(other, Turn):
+            return NotImplemented
+        return self.user == other.user and self.assistant == other.assistant
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.user) + sys.getsizeof(self.assistant)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'user': self.user, 'assistant': self.assistant, 'tokens': self.tokens}
+
+
+def trim_count(tokens: Iterable[Optional[int]], count: int, total: int, max_turns: int,
+               max_tokens: Optional[int] = None) -> int:
+    """Number of oldest turns to drop from ``count`` turns holding ``total`` tokens.
+
+    Nothing is dropped until ``max_turns`` or ``max_tokens`` is passed; then
+    the history is cut to half of that limit in one step, so it stays
+    prefix-stable for many turns between trims. The newest turn is kept.
+    ``tokens`` gives per-turn counts oldest first and is only read as far
+    as the turns dropped.
+    """
+    if count <= max_turns and (max_tokens is None or total <= max_tokens):
+        return 0
+    keep_turns = max(1, max_turns // 2)
+    keep_tokens = max_tokens // 2 if max_tokens is not None else None
+    drop = 0
+    for tokens_of_turn in tokens:
+        if count - drop <= 1 or (count - drop <= keep_turns
+                                 and (keep_tokens is None or total <= keep_tokens)):
+            break
+        total -= tokens_of_turn or 0
+        drop += 1
+    return drop
+
+
+class SessionStore(MutableMapping):
+    """Session id -> list of turns, bounded by count, bytes and idle time.
+
+    Sessions are kept in least-recently-used order. Idle sessions expire
+    after ``idle_ttl`` seconds and the least recently used are evicted
+    whenever the store exceeds ``max_sessions`` or ``max_bytes``. Writes
+    should go through ``append`` or item assignment so sizes stay exact.
+    """
+
+    def __init__(self, max_sessions: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 idle_ttl: Optional[float] = 86400.0,
+                 on_evict: Optional[Callable[[str, List[Turn]], None]] = None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._lock = threading.RLock()
+        self._sessions: 'OrderedDict[str, List[Turn]]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._accessed: Dict[str, float] = {}
+        self._bytes = 0
+        self._evicted = 0
+        self._expired = 0
+
+    def _expired_at(self, session_id: str, now: float) -> bool:
+        return self.idle_ttl is not None and now - self._accessed[session_id] > self.idle_ttl
+
+    def _touch(self, session_id: str) -> None:
+        self._sessions.move_to_end(session_id)
+        self._accessed[session_id] = time.monotonic()
+
+    def _remove(self, session_id: str) -> List[Turn]:
+        turns = self._sessions.pop(session_id)
+        self._bytes -= self._sizes.pop(session_id)
+        del self._accessed[session_id]
+        return turns
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Expire idle sessions, then drop the least recently used over the caps.
+
+        ``keep`` (the session just written) is never evicted, even if it
+        alone is over ``max_bytes``, so the caller's view of it stays valid.
+        """
+        now = time.monotonic()
+        removed = []
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            if self._expired_at(oldest, now):
+                self._expired += 1
+            elif len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+                self._evicted += 1
+            else:
+                break
+            removed.append((oldest, self._remove(oldest)))
+        if self.on_evict is not None:
+            for session_id, turns in removed:
+                self.on_evict(session_id, turns)
+
+    def __getitem__(self, session_id: str) -> List[Turn]:
+        with self._lock:
+            if session_id not in self._sessions or self._expired_at(session_id, time.monotonic()):
+                self._evict()
+                raise KeyError(session_id)
+            self._touch(session_id)
+            return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, turns: List[Any]) -> None:
+        turns = [Turn.from_value(t) for t in turns]
+        size = sys.getsizeof(session_id) + sum(t.nbytes for t in turns)
+        with self._lock:
+            if session_id in self._sessions:
+                self._bytes -= self._sizes[session_id]
+            self._sessions[session_id] = turns
+            self._sizes[session_id] = size
+            self._bytes += size
+            self._touch(session_id)
+            self._evict(keep=session_id)
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            self._remove(session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        with self._lock:
+            return session_id in self._sessions and not self._expired_at(session_id, time.monotonic())
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def append(self, session_id: str, turn: Turn) -> List[Turn]:
+        """Add a turn to a session (creating it) and return the session's turns."""
+        with self._lock:
+            if session_id not in self:
+                self[session_id] = []
+            turns = self._sessions[session_id]
+            turns.append(turn)
+            self._sizes[session_id] += turn.nbytes
+            self._bytes += turn.nbytes
+            self._touch(session_id)
+            self._evict(keep=session_id)
+            return turns
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return live session count, bytes held and eviction counters."""
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._bytes,
+                'max_sessions': self.max_sessions,
+                'max_bytes': self.max_bytes,
+                'evicted': self._evicted,
+                'expired': self._expired
+            }
@@ -0,0 +1,75 @@
+"""Coalescing of identical in-flight requests."""
+import hashlib
+import json
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Build a stable key for a generate call from model, prompt and options."""
+    raw = json.dumps(
+        {'model': model, 'prompt': prompt, 'options': options or {}},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    """A single upstream call that other callers can wait on."""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its result."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Call ``fn`` unless an identical call is running; return (result, shared)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of calls in flight."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'in_flight': len(self._flights)
+            }
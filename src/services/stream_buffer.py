@@ -0,0 +1,122 @@
+"""Ring buffers that let clients reconnect to a running token stream."""
+import itertools
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, ContextManager, Deque, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetExpired(Exception):
+    """Raised when the frames a reader asks for have left the ring buffer."""
+
+
+class StreamBuffer:
+    """The most recent encoded frames of one generation, readable from any offset.
+
+    Offsets count frames from the start of the stream. The producer appends
+    frames whether or not anyone is reading; readers tail the buffer from
+    an offset and block for new frames until it is closed. Once more than
+    ``capacity`` frames exist the oldest are dropped, and readers asking
+    for them get ``OffsetExpired``.
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self.generation_id: Optional[str] = None
+        self._frames: Deque[bytes] = deque(maxlen=capacity)
+        self._first = 0
+        self._next = 0
+        self._cond = threading.Condition()
+        self.closed = False
+        self.closed_at: Optional[float] = None
+        self._readers = 0
+        self._detached_at = time.monotonic()
+
+    @property
+    def length(self) -> int:
+        """Frames produced so far."""
+        with self._cond:
+            return self._next
+
+    def append(self, frame: bytes) -> None:
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self._first += 1
+            self._frames.append(frame)
+            self._next += 1
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self.closed_at = time.monotonic()
+            self._cond.notify_all()
+
+    def check_offset(self, offset: int) -> None:
+        """Raise if a reader could not start at ``offset``."""
+        with self._cond:
+            if offset < self._first:
+                raise OffsetExpired(f"Frames before {self._first} are no longer buffered")
+            if offset > self._next:
+                raise ValueError(f"Offset {offset} is past the {self._next} frames produced")
+
+    def read(self, offset: int = 0, poll: float = 1.0) -> Iterator[bytes]:
+        """Yield frames from ``offset`` until the stream is closed."""
+        self.check_offset(offset)
+        with self._cond:
+            self._readers += 1
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._next > offset or self.closed, poll)
+                    if offset < self._first:
+                        raise OffsetExpired(f"Reader fell behind; frames before {self._first} were dropped")
+                    # Take the new frames from the right end; cost tracks what is new
+                    frames = list(itertools.islice(reversed(self._frames), self._next - offset))
+                    frames.reverse()
+                    finished = self.closed and offset + len(frames) == self._next
+                offset += len(frames)
+                yield from frames
+                if finished:
+                    return
+        finally:
+            with self._cond:
+                self._readers -= 1
+                self._detached_at = time.monotonic()
+
+    def abandoned(self, grace: float) -> bool:
+        """True if the stream is still running but nobody has read it for ``grace`` seconds."""
+        with self._cond:
+            return (not self.closed and self._readers == 0
+                    and time.monotonic() - self._detached_at > grace)
+
+
+def run_detached(frames: Iterable[bytes], buffer: StreamBuffer,
+                 context: Callable[[], ContextManager], on_abandon: Callable[[], None],
+                 abandon_after: float) -> threading.Thread:
+    """Produce ``frames`` into ``buffer`` on a background thread.
+
+    The generation keeps running while clients come and go; if nobody
+    reads it for ``abandon_after`` seconds ``on_abandon`` is called once
+    (typically to cancel it).
+    """
+    def run():
+        abandoned = False
+        try:
+            with context():
+                for frame in frames:
+                    buffer.append(frame)
+                    if not abandoned and buffer.abandoned(abandon_after):
+                        abandoned = True
+                        logger.info(f"Resumable stream {buffer.generation_id} abandoned; cancelling")
+                        on_abandon()
+        except Exception as e:
+            logger.error(f"Resumable stream {buffer.generation_id} failed: {e}")
+        finally:
+            buffer.close()
+
+    thread = threading.Thread(target=run, name='resumable-stream', daemon=True)
+    thread.start()
+    return thread
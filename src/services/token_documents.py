@@ -0,0 +1,192 @@
+"""Incremental token counts for documents edited a little at a time."""
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.token_counter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Documents are counted in chunks of about this many characters, cut at newlines
+CHUNK_CHARS = 4096
+
+
+def split_chunks(text: str, size: int = CHUNK_CHARS) -> List[str]:
+    """Split text into chunks of at most ``size`` characters, preferring newline cuts."""
+    chunks = []
+    start = 0
+    while len(text) - start > size:
+        cut = text.rfind('\n', start, start + size)
+        cut = cut + 1 if cut > start else start + size
+        chunks.append(text[start:cut])
+        start = cut
+    if start < len(text) or not chunks:
+        chunks.append(text[start:])
+    return chunks
+
+
+class TokenDocument:
+    """A document held as chunks with a token count per chunk."""
+
+    __slots__ = ('chunks', 'counts', 'total', 'length')
+
+    def __init__(self, text: str, counter: TokenCounter):
+        self.chunks = split_chunks(text)
+        self.counts = [counter.count(chunk) for chunk in self.chunks]
+        self.total = sum(self.counts)
+        self.length = len(text)
+
+    def copy(self) -> 'TokenDocument':
+        """A copy whose chunk lists can be edited without touching this one."""
+        document = TokenDocument.__new__(TokenDocument)
+        document.chunks = list(self.chunks)
+        document.counts = list(self.counts)
+        document.total = self.total
+        document.length = self.length
+        return document
+
+    def apply(self, start: int, end: int, text: str, counter: TokenCounter) -> None:
+        """Replace characters ``start:end`` with ``text``, recounting only the chunks touched.
+
+        Offsets count code points, as Python indexes strings.
+        """
+        if not 0 <= start <= end <= self.length:
+            raise ValueError(f"Edit {start}:{end} is outside a document of {self.length} characters")
+
+        # Find the chunks containing the start and end of the edit
+        offset = 0
+        first = first_offset = None
+        for i, chunk in enumerate(self.chunks):
+            chunk_end = offset + len(chunk)
+            if first is None and start <= chunk_end:
+                first, first_offset = i, offset
+            if end <= chunk_end:
+                last, last_offset = i, offset
+                break
+            offset = chunk_end
+
+        merged = (self.chunks[first][:start - first_offset] + text
+                  + self.chunks[last][end - last_offset:])
+        chunks = split_chunks(merged)
+        counts = [counter.count(chunk) for chunk in chunks]
+        self.total += sum(counts) - sum(self.counts[first:last + 1])
+        self.chunks[first:last + 1] = chunks
+        self.counts[first:last + 1] = counts
+        self.length += len(text) - (end - start)
+
+
+class TokenDocumentStore:
+    """Per-client documents whose token counts are updated from edits.
+
+    The client sends the full text once, then only ``{start, end, text}``
+    edits; each edit recounts the few chunks it touches, so the cost tracks
+    the size of the change instead of the document. Documents are kept in
+    least-recently-used order up to ``max_documents`` and ``max_chars``.
+    """
+
+    def __init__(self, token_counter: Optional[TokenCounter] = None, max_documents: int = 1000,
+                 max_chars: int = 64 * 1024 * 1024):
+        self.token_counter = token_counter or TokenCounter()
+        self.max_documents = max_documents
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._documents: 'OrderedDict[str, TokenDocument]' = OrderedDict()
+        self._chars = 0
+        self._prefixes: Dict[str, int] = {}
+        self._full_counts = 0
+        self._edits = 0
+
+    def prefix_tokens(self, system_prompt: Optional[str]) -> int:
+        """Tokens of the system prompt framing ahead of the user text, counted once."""
+        if not system_prompt:
+            return 0
+        tokens = self._prefixes.get(system_prompt)
+        if tokens is None:
+            tokens = self.token_counter.count(f"System: {system_prompt}\n\nUser: ")
+            if len(self._prefixes) > 64:
+                self._prefixes.clear()
+            self._prefixes[system_prompt] = tokens
+        return tokens
+
+    def set(self, document_id: str, text: str) -> int:
+        """Store a document's full text and return its token count."""
+        document = TokenDocument(text, self.token_counter)
+        with self._lock:
+            self._discard(document_id)
+            self._documents[document_id] = document
+            self._chars += document.length
+            self._full_counts += 1
+            self._evict()
+        return document.total
+
+    def apply(self, document_id: str, edits: Iterable[Dict[str, Any]],
+              length: Optional[int] = None) -> int:
+        """Apply edits in order and return the new token count.
+
+        Raises KeyError for an unknown (or evicted) document and ValueError
+        for a malformed edit or when the result is not ``length`` long; in
+        both cases the client should resend the full text.
+        """
+        with self._lock:
+            stored = self._documents[document_id]
+            self._documents.move_to_end(document_id)
+
+        # Edit a copy outside the lock so a long recount does not stall
+        # other documents; every change stores a new object, so identity
+        # tells whether this one changed meanwhile
+        document = stored.copy()
+        applied = 0
+        try:
+            for edit in edits:
+                document.apply(int(edit['start']), int(edit['end']), str(edit.get('text', '')),
+                               self.token_counter)
+                applied += 1
+            if length is not None and document.length != length:
+                raise ValueError(f"Document is {document.length} characters, client has {length}")
+        except (KeyError, TypeError, ValueError) as e:
+            # The document no longer matches the client's copy
+            with self._lock:
+                if self._documents.get(document_id) is stored:
+                    self._discard(document_id)
+            raise ValueError(str(e)) from e
+
+        with self._lock:
+            if self._documents.get(document_id) is not stored:
+                raise ValueError("Document changed while the edit was counted")
+            self._documents[document_id] = document
+            self._chars += document.length - stored.length
+            self._edits += applied
+            self._evict()
+        return document.total
+
+    def count(self, text: str = '', document_id: Optional[str] = None,
+              edits: Optional[Iterable[Dict[str, Any]]] = None, length: Optional[int] = None) -> int:
+        """Count a /tokens request: edits to a stored document, a full document, or plain text."""
+        if edits is not None:
+            if not document_id:
+                raise ValueError("Edits need a document_id")
+            return self.apply(document_id, edits, length)
+        if document_id:
+            return self.set(document_id, text)
+        return self.token_counter.count(text)
+
+    def _discard(self, document_id: str) -> None:
+        document = self._documents.pop(document_id, None)
+        if document is not None:
+            self._chars -= document.length
+
+    def _evict(self) -> None:
+        while len(self._documents) > 1 and (len(self._documents) > self.max_documents
+                                            or self._chars > self.max_chars):
+            _, document = self._documents.popitem(last=False)
+            self._chars -= document.length
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'chars': self._chars,
+                'full_counts': self._full_counts,
+                'edits': self._edits
+            }
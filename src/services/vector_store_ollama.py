@@ -9,56 +9,12 @@ import logging
 from typing import List, Dict, Any, Optional
 import hashlib
 import json
-import requests
-
-logger = logging.getLogger(__name__)
 
+from .ollama_transport import OllamaTransport
+from .admission import AdmissionScheduler
+from .ollama_embeddings import OllamaEmbeddingFunction
 
-class OllamaEmbeddingFunction:
-    """Custom embedding function using Ollama instead of sentence-transformers."""
-    
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "nomic-embed-text"):
-        self.base_url = base_url
-        self.model = model
-    
-    def __call__(self, input: List[str]) -> List[List[float]]:
-        """Generate embeddings using Ollama."""
-        embeddings = []
-        for text in input:
-            try:
-                response = requests.post(
-                    f"{self.base_url}/api/embeddings",
-                    json={"model": self.model, "prompt": text}
-                )
-                if response.status_code == 200:
-                    embedding = response.json().get("embedding", [])
-                    embeddings.append(embedding)
-                else:
-                    # Fallback to simple hash-based embedding if Ollama fails
-                    embeddings.append(self._fallback_embedding(text))
-            except Exception as e:
-                logger.warning(f"Ollama embedding failed, using fallback: {e}")
-                embeddings.append(self._fallback_embedding(text))
-        return embeddings
-    
-    def _fallback_embedding(self, text: str, dim: int = 384) -> List[float]:
-        """Create a simple deterministic embedding from text."""
-        # This is a very basic fallback - not great for similarity but works
-        import hashlib
-        hash_obj = hashlib.sha256(text.encode())
-        hash_bytes = hash_obj.digest()
-        
-        # Convert to floats between -1 and 1
-        embedding = []
-        for i in range(0, min(len(hash_bytes), dim)):
-            value = (hash_bytes[i] - 128) / 128.0
-            embedding.append(value)
-        
-        # Pad if necessary
-        while len(embedding) < dim:
-            embedding.append(0.0)
-        
-        return embedding[:dim]
+logger = logging.getLogger(__name__)
 
 
 class VectorStoreOllama:
@@ -66,11 +22,15 @@ class VectorStoreOllama:
     
     def __init__(self, persist_directory: str = "./chroma_db", 
                  ollama_base_url: str = "http://localhost:11434",
-                 embedding_model: str = "nomic-embed-text"):
+                 embedding_model: str = "nomic-embed-text",
+                 transport: Optional[OllamaTransport] = None,
+                 scheduler: Optional[AdmissionScheduler] = None,
+                 keep_alive: Optional[str] = None):
         """Initialize ChromaDB with Ollama embeddings."""
         try:
             # Try to use Ollama for embeddings
-            embedding_function = OllamaEmbeddingFunction(ollama_base_url, embedding_model)
+            embedding_function = OllamaEmbeddingFunction(ollama_base_url, embedding_model, transport,
+                                                          scheduler, keep_alive)
             
             self.client = chromadb.PersistentClient(
                 path=persist_directory,
@@ -1,6 +1,6 @@
 // Main application entry point
 
-import { checkHealth, clearConversation, getTokenCount } from './modules/api.js';
+import { checkHealth, getTokenCount } from './modules/api.js';
 import { StatusManager } from './modules/status.js';
 import { TokenManager } from './modules/tokens.js';
 import { ChatManager } from './modules/chat.js';
@@ -157,8 +157,9 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     async function handleClearConversation() {
-        // Clear the output area
+        // Clear the output area and start a new conversation
         chatManager.clearOutput();
+        chatManager.resetSession();
         elements.userInput.focus();
         updateTokenCount();
     }
@@ -1,5 +1,7 @@
 // API communication module
 
+import { TokenDocumentSync } from './tokens.js';
+
 // Generic API call function for all endpoints
 export async function apiCall(url, method = 'GET', data = null) {
     const options = {
@@ -27,7 +29,22 @@ export async function checkHealth() {
     return await response.json();
 }
 
-export async function sendChatMessage(message, abortSignal) {
+export async function cancelGeneration(generationId) {
+    // Tell the server to stop generating; failures are harmless
+    try {
+        await fetch('/api/chat/cancel', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ generation_id: generationId })
+        });
+    } catch (error) {
+        console.debug('Cancel request failed:', error);
+    }
+}
+
+export async function sendChatMessage(message, abortSignal, sessionId) {
     // Create a timeout promise for very long responses (5 minutes)
     const timeoutMs = 300000; // 5 minutes
     const timeoutPromise = new Promise((_, reject) => {
@@ -43,7 +60,8 @@ export async function sendChatMessage(message, abortSignal) {
             'Content-Type': 'application/json',
         },
         body: JSON.stringify({ 
-            message: message
+            message: message,
+            session_id: sessionId
         }),
         signal: abortSignal
     });
@@ -73,15 +91,8 @@ export async function clearConversation(sessionId) {
     return response;
 }
 
+const chatTokens = new TokenDocumentSync('/api/chat/tokens', 'message');
+
 export async function getTokenCount(message) {
-    const response = await fetch('/api/chat/tokens', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-            message: message || ''
-        })
-    });
-    return await response.json();
+    return await chatTokens.count(message || '');
 }
\ No newline at end of file
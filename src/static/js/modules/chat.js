@@ -1,7 +1,8 @@
 // Chat functionality module
 
 import { escapeHtml, createElement, scrollToBottom } from '../utils/dom.js';
-import { sendChatMessage } from './api.js';
+import { sendChatMessage, cancelGeneration, clearConversation } from './api.js';
+import { getSessionId, setSessionId, randomId } from '../utils/storage.js';
 
 export class ChatManager {
     constructor(outputArea, userInput, sendButton) {
@@ -9,6 +10,26 @@ export class ChatManager {
         this.userInput = userInput;
         this.sendButton = sendButton;
         this.abortController = null;
+        this.generationId = null;
+        // Server-side conversation this chat continues; kept across reloads
+        this.sessionId = getSessionId() || this.newSession();
+    }
+
+    newSession() {
+        this.sessionId = randomId();
+        setSessionId(this.sessionId);
+        return this.sessionId;
+    }
+
+    async resetSession() {
+        // Start a new conversation and drop the old one's history on the server
+        const previous = this.sessionId;
+        this.newSession();
+        try {
+            await clearConversation(previous);
+        } catch (error) {
+            console.debug('Clear conversation failed:', error);
+        }
     }
 
     addUserMessage(message) {
@@ -41,7 +62,7 @@ export class ChatManager {
         this.abortController = new AbortController();
         
         try {
-            const response = await sendChatMessage(message, this.abortController.signal);
+            const response = await sendChatMessage(message, this.abortController.signal, this.sessionId);
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
             let buffer = '';
@@ -98,6 +119,10 @@ export class ChatManager {
                             }
                         }
                         
+                        if (data.generation_id) {
+                            this.generationId = data.generation_id;
+                        }
+                        
                         if (data.full_prompt) {
                             onPromptDisplay(data.full_prompt);
                         }
@@ -134,6 +159,7 @@ export class ChatManager {
             }
         } finally {
             this.abortController = null;
+            this.generationId = null;
         }
     }
 
@@ -163,6 +189,9 @@ export class ChatManager {
     
     stopResponse() {
         if (this.abortController) {
+            if (this.generationId) {
+                cancelGeneration(this.generationId);
+            }
             this.abortController.abort();
             return true;
         }
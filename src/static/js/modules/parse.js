@@ -1,5 +1,10 @@
 // Parse module
 
+import { cancelGeneration } from './api.js';
+
+// Reconnect attempts after a dropped parse stream
+const MAX_RESUME_ATTEMPTS = 5;
+
 export class ParseManager {
     constructor(elements) {
         this.parseInput = elements.parseInput;
@@ -8,6 +13,7 @@ export class ParseManager {
         this.parseStopButton = elements.parseStopButton;
         this.parseClearButton = elements.parseClearButton;
         this.abortController = null;
+        this.generationId = null;
     }
 
     setupEventListeners() {
@@ -48,47 +54,25 @@ export class ParseManager {
 
         try {
             this.abortController = new AbortController();
+            this.generationId = null;
+            
+            // Resumable: the server keeps generating if we drop, so we can pick up again
+            let request = { url: '/api/parse/stream', body: { text: text, resumable: true } };
+            let received = 0;
+            let attempts = 0;
             
-            const response = await fetch('/api/parse/stream', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ text: text }),
-                signal: this.abortController.signal
-            });
-
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-
-            const reader = response.body.getReader();
-            const decoder = new TextDecoder();
-            let buffer = '';
-
             while (true) {
-                const { done, value } = await reader.read();
-                if (done) break;
-
-                buffer += decoder.decode(value, { stream: true });
-                const lines = buffer.split('\n');
-                buffer = lines.pop() || '';
-
-                for (const line of lines) {
-                    if (line.trim()) {
-                        try {
-                            const data = JSON.parse(line);
-                            if (data.content) {
-                                this.appendToResponse(responseDiv, data.content);
-                            }
-                            if (data.error) {
-                                this.displayError(data.error);
-                            }
-                        } catch (e) {
-                            console.error('Failed to parse JSON:', e);
-                        }
+                try {
+                    const finished = await this.readStream(request, responseDiv, () => received++);
+                    if (finished || !this.generationId) break;
+                } catch (error) {
+                    if (error.name === 'AbortError' || !this.generationId || attempts >= MAX_RESUME_ATTEMPTS) {
+                        throw error;
                     }
                 }
+                attempts++;
+                await new Promise(resolve => setTimeout(resolve, 500 * attempts));
+                request = { url: '/api/parse/resume', body: { generation_id: this.generationId, offset: received } };
             }
         } catch (error) {
             if (error.name === 'AbortError') {
@@ -104,10 +88,71 @@ export class ParseManager {
             this.enableInput();
             this.scrollToBottom();
             this.abortController = null;
+            this.generationId = null;
+        }
+    }
+
+    // Read one stream response; returns true once the final frame arrives
+    async readStream(request, responseDiv, onFrame) {
+        const response = await fetch(request.url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(request.body),
+            signal: this.abortController.signal
+        });
+
+        if (!response.ok) {
+            if (response.status === 404 || response.status === 410) {
+                // Nothing left to resume
+                this.generationId = null;
+            }
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) return false;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() || '';
+
+            for (const line of lines) {
+                if (line.trim()) {
+                    onFrame();
+                    try {
+                        const data = JSON.parse(line);
+                        if (data.generation_id) {
+                            this.generationId = data.generation_id;
+                        }
+                        if (data.content) {
+                            this.appendToResponse(responseDiv, data.content);
+                        }
+                        if (data.error) {
+                            this.displayError(data.error);
+                        }
+                        if (data.done) {
+                            return true;
+                        }
+                    } catch (e) {
+                        console.error('Failed to parse JSON:', e);
+                    }
+                }
+            }
         }
     }
 
     handleStop() {
+        if (this.generationId) {
+            // The generation outlives the connection, so stop it explicitly
+            cancelGeneration(this.generationId).catch(() => {});
+        }
         if (this.abortController) {
             this.abortController.abort();
         }
@@ -1,6 +1,7 @@
 // Summarization module
 
 import { escapeHtml, createElement } from '../utils/dom.js';
+import { TokenDocumentSync } from './tokens.js';
 
 export class SummarizeManager {
     constructor(elements) {
@@ -10,6 +11,7 @@ export class SummarizeManager {
         this.clearButton = elements.clearSummarizeButton;
         this.tokenCount = elements.summarizeTokenCount;
         this.tokenLimit = elements.summarizeTokenLimit;
+        this.tokenSync = new TokenDocumentSync('/api/summarize/tokens', 'text');
     }
 
     setupEventListeners() {
@@ -125,17 +127,7 @@ export class SummarizeManager {
 
     async updateTokenCount() {
         try {
-            const response = await fetch('/api/summarize/tokens', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    text: this.input.value || ''
-                })
-            });
-            
-            const data = await response.json();
+            const data = await this.tokenSync.count(this.input.value || '');
             
             if (data.count !== undefined) {
                 this.tokenCount.textContent = data.count;
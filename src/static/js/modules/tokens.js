@@ -1,5 +1,7 @@
 // Token counter module
 
+import { randomId } from '../utils/storage.js';
+
 export class TokenManager {
     constructor(tokenCount, tokenLimit, tokenBarFill) {
         this.tokenCount = tokenCount;
@@ -26,4 +28,90 @@ export class TokenManager {
             }
         }
     }
-}
\ No newline at end of file
+}
+
+// Keeps a draft in sync with the server so token counts only send edits
+export class TokenDocumentSync {
+    constructor(url, field) {
+        this.url = url;
+        this.field = field;
+        this.documentId = randomId();
+        this.synced = null;
+        this.queue = Promise.resolve();
+    }
+
+    count(text) {
+        // Requests run one at a time so each edit applies to the text the server has
+        const result = this.queue.then(() => this.send(text));
+        this.queue = result.catch(() => {});
+        return result;
+    }
+
+    async send(text) {
+        let response = await this.post(this.synced === null
+            ? { [this.field]: text, document_id: this.documentId }
+            : { document_id: this.documentId, edits: [diffEdit(this.synced, text)], length: codePoints(text) });
+
+        if (response.status === 409) {
+            // Server lost or disagrees with its copy; send the whole text again
+            response = await this.post({ [this.field]: text, document_id: this.documentId });
+        }
+        this.synced = response.ok ? text : null;
+        return await response.json();
+    }
+
+    post(body) {
+        return fetch(this.url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body)
+        });
+    }
+}
+
+// Single replaced range between two versions of a text, in code points
+// (the server indexes by code point; JS strings index by UTF-16 unit)
+export function diffEdit(before, after) {
+    let start = 0;
+    const maxStart = Math.min(before.length, after.length);
+    while (start < maxStart && before[start] === after[start]) {
+        start++;
+    }
+    if (start > 0 && isHighSurrogate(before.charCodeAt(start - 1))) {
+        start--;  // don't split a surrogate pair
+    }
+    let suffix = 0;
+    const maxSuffix = maxStart - start;
+    while (suffix < maxSuffix && before[before.length - 1 - suffix] === after[after.length - 1 - suffix]) {
+        suffix++;
+    }
+    if (suffix > 0 && isLowSurrogate(before.charCodeAt(before.length - suffix))) {
+        suffix--;
+    }
+    return {
+        start: codePoints(before, start),
+        end: codePoints(before, before.length - suffix),
+        text: after.slice(start, after.length - suffix)
+    };
+}
+
+// Number of code points in the first `end` UTF-16 units of text
+export function codePoints(text, end = text.length) {
+    let count = end;
+    for (let i = 1; i < end; i++) {
+        if (isLowSurrogate(text.charCodeAt(i)) && isHighSurrogate(text.charCodeAt(i - 1))) {
+            count--;
+        }
+    }
+    return count;
+}
+
+function isHighSurrogate(code) {
+    return code >= 0xD800 && code <= 0xDBFF;
+}
+
+function isLowSurrogate(code) {
+    return code >= 0xDC00 && code <= 0xDFFF;
+}
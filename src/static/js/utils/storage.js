@@ -1,5 +1,12 @@
 // Local storage utility functions
 
+// Random id for chat sessions and synced drafts
+export function randomId() {
+    return typeof crypto !== 'undefined' && crypto.randomUUID
+        ? crypto.randomUUID()
+        : Math.random().toString(36).slice(2) + Date.now().toString(36);
+}
+
 export function getSessionId() {
     return localStorage.getItem('chat-session-id');
 }
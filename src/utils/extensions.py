@@ -1,21 +1,240 @@
 """Application extensions and service instances."""
 from flask import current_app
+import atexit
+import os
+from typing import Optional
 from src.services import OllamaService, ConversationService
+from src.services.ollama_transport import OllamaTransport
+from src.services.cassette import CassetteTransport
+from src.services.llm_cache import LLMResponseCache
+from src.services.ollama_backends import BackendPool
+from src.services.admission import AdmissionScheduler
+from src.services.resilience import CircuitBreaker
+from src.services.model_warmup import ModelWarmer
+from src.services.model_registry import ModelRegistry
+from src.services.generation_registry import GenerationRegistry
+from src.services.conversation_service import context_budget
+from src.services.session_store import SessionStore
+from src.services.conversation_backend import SQLiteConversationBackend
+from src.services.conversation_compactor import ConversationCompactor
+from src.utils.token_counter import TokenCounter
+from src.utils.token_calibrator import TokenCalibrator
+from src.services.token_documents import TokenDocumentStore
+from src.services.ollama_embeddings import OllamaEmbeddingFunction
+from src.services.semantic_cache import SemanticCache
 
 # Service instances
-_ollama_service = None
+_ollama_transport = None
+_llm_cache = None
+_backend_pool = None
+_admission_scheduler = None
+_circuit_breaker = None
+_model_registry = None
 _conversation_service = None
+_model_warmer = None
+_generation_registry = None
+_token_counter = None
+_token_calibrator = None
+_token_documents = None
+_semantic_cache = None
 
 
-def get_ollama_service() -> OllamaService:
-    """Get or create Ollama service instance."""
-    global _ollama_service
-    if _ollama_service is None:
-        _ollama_service = OllamaService(
+def get_ollama_transport() -> OllamaTransport:
+    """Get or create the shared Ollama HTTP transport (wrapped by a cassette if configured)."""
+    global _ollama_transport
+    if _ollama_transport is None:
+        _ollama_transport = OllamaTransport(
+            pool_size=current_app.config.get('OLLAMA_POOL_SIZE', 10),
+            connect_timeout=current_app.config.get('OLLAMA_CONNECT_TIMEOUT', 5.0),
+            read_timeout=current_app.config.get('OLLAMA_READ_TIMEOUT', 300.0),
+            keep_alive=current_app.config.get('OLLAMA_HTTP_KEEP_ALIVE', True)
+        )
+        mode = current_app.config.get('OLLAMA_CASSETTE_MODE')
+        if mode:
+            _ollama_transport = CassetteTransport(
+                current_app.config.get('OLLAMA_CASSETTE_PATH', 'data/ollama_cassette.jsonl.gz'),
+                mode=mode,
+                inner=_ollama_transport,
+                speed=current_app.config.get('OLLAMA_REPLAY_SPEED', 1.0)
+            )
+    return _ollama_transport
+
+
+def _data_path(filename: str) -> str:
+    """Default location for a data file: next to the SQLite database, else under ./data."""
+    db_uri = current_app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    db_dir = os.path.dirname(db_uri.replace('sqlite:///', '')) if db_uri.startswith('sqlite:///') else 'data'
+    return os.path.join(db_dir, filename)
+
+
+def get_llm_cache():
+    """Get or create the LLM response cache, or None when caching is disabled."""
+    global _llm_cache
+    if _llm_cache is None and current_app.config.get('LLM_CACHE_ENABLED', False):
+        _llm_cache = LLMResponseCache(
+            current_app.config.get('LLM_CACHE_PATH') or _data_path('llm_cache.db'),
+            max_bytes=current_app.config.get('LLM_CACHE_MAX_MB', 64) * 1024 * 1024,
+            ttl_seconds=current_app.config.get('LLM_CACHE_TTL_HOURS', 168) * 3600,
+            max_temperature=current_app.config.get('LLM_CACHE_MAX_TEMPERATURE', 0.3)
+        )
+    return _llm_cache
+
+
+def get_backend_pool() -> BackendPool:
+    """Get or create the pool of Ollama inference backends."""
+    global _backend_pool
+    if _backend_pool is None:
+        urls = current_app.config.get('OLLAMA_BASE_URLS') or [current_app.config['OLLAMA_BASE_URL']]
+        _backend_pool = BackendPool(
+            urls,
+            failure_threshold=current_app.config.get('OLLAMA_BACKEND_FAILURE_THRESHOLD', 3),
+            base_backoff=current_app.config.get('OLLAMA_BACKEND_BACKOFF', 5.0),
+            max_backoff=current_app.config.get('OLLAMA_BACKEND_MAX_BACKOFF', 300.0)
+        )
+    return _backend_pool
+
+
+def get_admission_scheduler() -> AdmissionScheduler:
+    """Get or create the priority scheduler in front of Ollama."""
+    global _admission_scheduler
+    if _admission_scheduler is None:
+        _admission_scheduler = AdmissionScheduler(
+            max_concurrency=current_app.config.get('OLLAMA_MAX_CONCURRENCY', 4),
+            class_limits=current_app.config.get('OLLAMA_CLASS_LIMITS'),
+            interactive_reserved=current_app.config.get('OLLAMA_INTERACTIVE_RESERVED', 1)
+        )
+    return _admission_scheduler
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get or create the circuit breaker guarding non-streaming Ollama calls."""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker(
+            failure_threshold=current_app.config.get('OLLAMA_BREAKER_THRESHOLD', 5),
+            reset_timeout=current_app.config.get('OLLAMA_BREAKER_RESET', 30.0)
+        )
+    return _circuit_breaker
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the registry of per-model Ollama handles."""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry(
             base_url=current_app.config['OLLAMA_BASE_URL'],
-            model_name=current_app.config['MODEL_NAME']
+            model_options=current_app.config.get('MODEL_OPTIONS'),
+            model_concurrency=current_app.config.get('MODEL_MAX_CONCURRENCY'),
+            transport=get_ollama_transport(),
+            cache=get_llm_cache(),
+            backends=get_backend_pool(),
+            scheduler=get_admission_scheduler(),
+            admission_timeout=current_app.config.get('OLLAMA_ADMISSION_TIMEOUT', 120.0),
+            keep_alive=current_app.config.get('MODEL_KEEP_ALIVE'),
+            generate_timeout=current_app.config.get('OLLAMA_GENERATE_TIMEOUT', 120.0),
+            breaker=get_circuit_breaker(),
+            hedge_max_prompt_chars=current_app.config.get('OLLAMA_HEDGE_MAX_PROMPT_CHARS') or None,
+            hedge_min_samples=current_app.config.get('OLLAMA_HEDGE_MIN_SAMPLES', 20),
+            calibrator=get_token_calibrator()
+        )
+        backends = _model_registry.shared['backends']
+        if len(backends.backends) > 1:
+            backends.start_monitor(
+                _model_registry.get(current_app.config['MODEL_NAME']).probe_backend,
+                interval=current_app.config.get('OLLAMA_HEALTH_INTERVAL', 15.0)
+            )
+    return _model_registry
+
+
+def get_ollama_service(model_name: Optional[str] = None) -> OllamaService:
+    """Get the Ollama service handle for a model (defaults to MODEL_NAME)."""
+    return get_model_registry().get(model_name or current_app.config['MODEL_NAME'])
+
+
+def get_model_warmer() -> ModelWarmer:
+    """Get or create the model warm-up stage."""
+    global _model_warmer
+    if _model_warmer is None:
+        models = []
+        for key, kind in (('MODEL_NAME', 'generate'), ('SUMMARIZE_MODEL_NAME', 'generate'),
+                          ('EXTRACTION_MODEL', 'generate'), ('EMBEDDING_MODEL', 'embed')):
+            name = current_app.config.get(key)
+            if name and name not in [m for m, _ in models]:
+                models.append((name, kind))
+        _model_warmer = ModelWarmer(
+            get_ollama_service(),
+            models,
+            keep_alive=current_app.config.get('MODEL_KEEP_ALIVE', '30m'),
+            interval=current_app.config.get('WARMUP_INTERVAL', 600.0)
+        )
+    return _model_warmer
+
+
+def get_generation_registry() -> GenerationRegistry:
+    """Get or create the registry of in-flight streaming generations."""
+    global _generation_registry
+    if _generation_registry is None:
+        _generation_registry = GenerationRegistry(
+            buffer_ttl=current_app.config.get('RESUME_BUFFER_TTL', 300.0)
+        )
+    return _generation_registry
+
+
+def get_token_counter() -> TokenCounter:
+    """Get or create the shared token counter (exact when a tokenizer file is configured)."""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = TokenCounter(
+            model=current_app.config.get('MODEL_NAME', 'gemma'),
+            tokenizer_path=current_app.config.get('TOKENIZER_PATH'),
+            cache_size=current_app.config.get('TOKEN_COUNT_CACHE_SIZE', 4096),
+            calibrator=get_token_calibrator()
+        )
+    return _token_counter
+
+
+def get_token_documents() -> TokenDocumentStore:
+    """Get or create the store of incrementally counted documents."""
+    global _token_documents
+    if _token_documents is None:
+        _token_documents = TokenDocumentStore(
+            get_token_counter(),
+            max_documents=current_app.config.get('TOKEN_DOCUMENTS_MAX', 1000)
+        )
+    return _token_documents
+
+
+def get_token_calibrator() -> Optional[TokenCalibrator]:
+    """Get or create the chars-per-token calibrator, or None when calibration is disabled."""
+    global _token_calibrator
+    if _token_calibrator is None and current_app.config.get('TOKEN_CALIBRATION_ENABLED', False):
+        _token_calibrator = TokenCalibrator(
+            current_app.config.get('TOKEN_CALIBRATION_PATH') or _data_path('token_calibration.json'),
+            min_samples=current_app.config.get('TOKEN_CALIBRATION_MIN_SAMPLES', 20)
+        )
+        atexit.register(_token_calibrator.save)
+    return _token_calibrator
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get or create the embedding-matched answer cache, or None when it is disabled."""
+    global _semantic_cache
+    if _semantic_cache is None and current_app.config.get('SEMANTIC_CACHE_ENABLED', False):
+        embeddings = OllamaEmbeddingFunction(
+            current_app.config['OLLAMA_BASE_URL'],
+            current_app.config.get('EMBEDDING_MODEL', 'nomic-embed-text'),
+            transport=get_ollama_transport(),
+            scheduler=get_admission_scheduler(),
+            keep_alive=current_app.config.get('MODEL_KEEP_ALIVE')
+        )
+        _semantic_cache = SemanticCache(
+            embeddings.embed,
+            threshold=current_app.config.get('SEMANTIC_CACHE_THRESHOLD', 0.95),
+            max_entries=current_app.config.get('SEMANTIC_CACHE_MAX_ENTRIES', 2048),
+            ttl_seconds=current_app.config.get('SEMANTIC_CACHE_TTL_HOURS', 24) * 3600,
+            embed_timeout=current_app.config.get('SEMANTIC_CACHE_EMBED_TIMEOUT', 0.5)
         )
-    return _ollama_service
+    return _semantic_cache
 
 
 def get_conversation_service() -> ConversationService:
@@ -23,6 +242,37 @@ def get_conversation_service() -> ConversationService:
     global _conversation_service
     if _conversation_service is None:
         _conversation_service = ConversationService(
-            max_history=current_app.config.get('MAX_CONVERSATION_HISTORY', 10)
+            max_history=current_app.config.get('MAX_CONVERSATION_HISTORY', 10),
+            token_counter=get_token_counter(),
+            token_budget=current_app.config.get('CONTEXT_TOKEN_BUDGET') or context_budget(
+                current_app.config.get('NUM_CTX', 8192),
+                current_app.config.get('MAX_TOKENS', 1000),
+                current_app.config.get('SYSTEM_PROMPT'),
+                get_token_counter()
+            ),
+            store=SessionStore(
+                max_sessions=current_app.config.get('SESSION_MAX_COUNT', 10000),
+                max_bytes=current_app.config.get('SESSION_MAX_MB', 64) * 1024 * 1024,
+                idle_ttl=current_app.config.get('SESSION_IDLE_TTL_HOURS', 24) * 3600
+            ),
+            backend=_conversation_backend(),
+            compactor=ConversationCompactor(
+                get_ollama_service(current_app.config.get('SUMMARIZE_MODEL_NAME', 'phi3:mini')),
+                max_summary_tokens=current_app.config.get('CONVERSATION_SUMMARY_MAX_TOKENS', 256),
+                token_counter=get_token_counter()
+            ) if current_app.config.get('CONVERSATION_SUMMARY_ENABLED', False) else None
         )
-    return _conversation_service
\ No newline at end of file
+    return _conversation_service
+
+
+def _conversation_backend():
+    """Create the configured conversation backend, or None to keep history in memory."""
+    if current_app.config.get('CONVERSATION_BACKEND', 'memory') != 'sqlite':
+        return None
+    backend = SQLiteConversationBackend(
+        current_app.config.get('CONVERSATION_DB_PATH') or _data_path('conversations.db'),
+        flush_interval=current_app.config.get('CONVERSATION_FLUSH_MS', 50) / 1000
+    )
+    # Write out queued turns on shutdown
+    atexit.register(backend.close)
+    return backend
\ No newline at end of file
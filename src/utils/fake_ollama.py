@@ -0,0 +1,271 @@
+"""Stand-in Ollama server for offline load testing.
+
+Implements enough of the Ollama HTTP API (``/api/chat``, ``/api/generate``,
+``/api/embeddings``, ``/api/embed``, ``/api/tags`` and ``/api/ps``) to drive
+OllamaService, OllamaEmbeddingFunction or the whole app without a GPU.
+Latency is simulated from a time-to-first-token and a token rate, so the
+numbers measured against it are our own serving overhead.
+
+Run standalone and point ``OLLAMA_BASE_URL`` at it::
+
+    python -m src.utils.fake_ollama --port 11435 --ttft-ms 150 --tps 40
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import logging
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORDS = ('the quick brown fox jumps over the lazy dog while the model keeps '
+         'generating plausible filler text for benchmarking purposes').split()
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server that imitates Ollama's API and timing."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, models: Optional[Iterable[str]] = None,
+                 ttft: float = 0.05, tokens_per_second: float = 50.0, response_tokens: int = 32,
+                 embedding_dim: int = 768, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.models = list(models or ['gemma3:12b-it-qat', 'phi3:latest', 'phi3:mini', 'nomic-embed-text:latest'])
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.embedding_dim = embedding_dim
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._loaded: Dict[str, float] = {}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeOllamaServer':
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name='fake-ollama', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'FakeOllamaServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return request counts per endpoint."""
+        with self._lock:
+            return dict(self._counts)
+
+    # -- behaviour ---------------------------------------------------------
+
+    def _count(self, path: str) -> None:
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+
+    def _should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _load(self, model: str) -> float:
+        """Mark a model resident; return a simulated load duration in seconds."""
+        with self._lock:
+            first = model not in self._loaded
+            self._loaded[model] = time.time()
+        return 0.5 if first else 0.0
+
+    def tokens_for(self, prompt: str, limit: Optional[int]) -> List[str]:
+        """Deterministic response tokens for a prompt."""
+        count = self.response_tokens if not limit or limit < 0 else min(limit, self.response_tokens)
+        offset = int(hashlib.md5(prompt.encode('utf-8')).hexdigest(), 16) % len(WORDS)
+        return [(' ' if i else '') + WORDS[(offset + i) % len(WORDS)] for i in range(count)]
+
+    def embedding_for(self, text: str) -> List[float]:
+        """Deterministic unit-length embedding for a text."""
+        rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+        vector = [rng.uniform(-1, 1) for _ in range(self.embedding_dim)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send_json(self, body: Dict[str, Any], status: int = 200) -> None:
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_GET(self):
+                server._count(self.path)
+                if self.path == '/api/tags':
+                    self._send_json({'models': [{'name': m, 'model': m} for m in server.models]})
+                elif self.path == '/api/ps':
+                    with server._lock:
+                        loaded = list(server._loaded)
+                    self._send_json({'models': [{'name': m, 'model': m} for m in loaded]})
+                else:
+                    self._send_json({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                server._count(self.path)
+                body = self._read_json()
+                if self.path not in ('/api/chat', '/api/generate', '/api/embeddings', '/api/embed'):
+                    self._send_json({'error': 'not found'}, 404)
+                    return
+                if server._should_fail():
+                    self._send_json({'error': 'injected failure'}, 500)
+                    return
+
+                model = body.get('model', '')
+                load_duration = server._load(model)
+
+                if self.path == '/api/embeddings':
+                    self._send_json({'embedding': server.embedding_for(body.get('prompt', ''))})
+                elif self.path == '/api/embed':
+                    inputs = body.get('input', '')
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    self._send_json({
+                        'model': model,
+                        'embeddings': [server.embedding_for(t) for t in inputs],
+                        'load_duration': int(load_duration * 1e9)
+                    })
+                else:
+                    self._generate(body, model, load_duration)
+
+            def _generate(self, body: Dict[str, Any], model: str, load_duration: float) -> None:
+                chat = self.path == '/api/chat'
+                if chat:
+                    messages = body.get('messages', [])
+                    prompt = '\n'.join(m.get('content', '') for m in messages)
+                else:
+                    prompt = body.get('prompt', '')
+
+                # An empty prompt only loads the model (used for warm-up)
+                limit = (body.get('options') or {}).get('num_predict')
+                tokens = server.tokens_for(prompt, limit) if (prompt or chat) else []
+                start = time.time()
+
+                def chunk(token: str) -> Dict[str, Any]:
+                    out = {'model': model, 'created_at': datetime.utcnow().isoformat() + 'Z', 'done': False}
+                    if chat:
+                        out['message'] = {'role': 'assistant', 'content': token}
+                    else:
+                        out['response'] = token
+                    return out
+
+                def final() -> Dict[str, Any]:
+                    out = chunk('')
+                    elapsed = time.time() - start
+                    out.update({
+                        'done': True,
+                        'done_reason': 'stop',
+                        'total_duration': int(elapsed * 1e9),
+                        'load_duration': int(load_duration * 1e9),
+                        'prompt_eval_count': max(1, len(prompt) // 4),
+                        'prompt_eval_duration': int(server.ttft * 1e9),
+                        'eval_count': len(tokens),
+                        'eval_duration': int(max(0.0, elapsed - server.ttft) * 1e9)
+                    })
+                    return out
+
+                delay = 1.0 / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+                if tokens:
+                    time.sleep(server.ttft)
+
+                if not body.get('stream', True):
+                    time.sleep(delay * max(0, len(tokens) - 1))
+                    result = final()
+                    text = ''.join(tokens)
+                    if chat:
+                        result['message'] = {'role': 'assistant', 'content': text}
+                    else:
+                        result['response'] = text
+                    self._send_json(result)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for i, token in enumerate(tokens):
+                        if i:
+                            time.sleep(delay)
+                        self._write_chunk(json.dumps(chunk(token)).encode('utf-8') + b'\n')
+                    self._write_chunk(json.dumps(final()).encode('utf-8') + b'\n')
+                    self._write_chunk(b'')
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client went away mid-stream, as a real Ollama would see it
+                    server._count('disconnects')
+                    self.close_connection = True
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fake Ollama server for offline benchmarking')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--ttft-ms', type=float, default=50, help='time to first token')
+    parser.add_argument('--tps', type=float, default=50, help='tokens per second per stream')
+    parser.add_argument('--tokens', type=int, default=32, help='tokens per response')
+    parser.add_argument('--embedding-dim', type=int, default=768)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that return 500')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeOllamaServer(
+        host=args.host, port=args.port, ttft=args.ttft_ms / 1000, tokens_per_second=args.tps,
+        response_tokens=args.tokens, embedding_dim=args.embedding_dim,
+        error_rate=args.error_rate, seed=args.seed
+    )
+    logger.info(f"Fake Ollama listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
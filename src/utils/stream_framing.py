@@ -0,0 +1,157 @@
+"""Low-overhead NDJSON framing for token streams."""
+import json
+import time
+import logging
+from typing import Any, Dict, Generator, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+except ImportError:
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    _decoder = json.JSONDecoder()
+
+    def dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj).encode('utf-8')
+
+    def loads(data):
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8')
+        return _decoder.decode(data)
+
+
+# Upper bounds for client-requested coalescing
+MAX_COALESCE_MS = 1000
+MAX_COALESCE_TOKENS = 256
+
+
+def encode_frame(obj: Dict[str, Any]) -> bytes:
+    """Encode one NDJSON frame."""
+    return dumps(obj) + b'\n'
+
+
+class TokenFramer:
+    """Coalesces streamed tokens into frames and buffers the full response.
+
+    With the defaults every token becomes its own frame. A time window
+    (``window_ms``) and/or token count (``max_tokens``) batch several tokens
+    into one frame so a stream costs fewer encodes and writes.
+    """
+
+    def __init__(self, key: str = 'token', window_ms: float = 0, max_tokens: int = 1):
+        self.key = key
+        self.window = window_ms / 1000.0
+        self.max_tokens = max(1, max_tokens)
+        self.parts: List[str] = []
+        self._pending: List[str] = []
+        self._pending_since = 0.0
+        self.frames = 0
+
+    @classmethod
+    def from_request(cls, data: Optional[Dict[str, Any]], key: str = 'token',
+                     default_ms: float = 0, default_tokens: int = 1) -> 'TokenFramer':
+        """Build a framer from the request's ``coalesce_ms``/``coalesce_tokens`` fields."""
+        data = data or {}
+        try:
+            window_ms = float(data.get('coalesce_ms', default_ms) or 0)
+            max_tokens = int(data.get('coalesce_tokens', default_tokens) or 1)
+        except (TypeError, ValueError):
+            window_ms, max_tokens = default_ms, default_tokens
+        return cls(
+            key=key,
+            window_ms=min(max(window_ms, 0), MAX_COALESCE_MS),
+            max_tokens=min(max(max_tokens, 1), MAX_COALESCE_TOKENS)
+        )
+
+    @property
+    def coalescing(self) -> bool:
+        return self.window > 0 or self.max_tokens > 1
+
+    def push(self, token: str) -> Optional[bytes]:
+        """Add a token; return a frame if the current window is complete."""
+        self.parts.append(token)
+        if not self.coalescing:
+            self.frames += 1
+            return encode_frame({self.key: token, 'done': False})
+
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append(token)
+
+        if (len(self._pending) >= self.max_tokens
+                or (self.window and time.monotonic() - self._pending_since >= self.window)):
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        """Emit any pending tokens as one frame."""
+        if not self._pending:
+            return None
+        text = ''.join(self._pending)
+        self._pending = []
+        self.frames += 1
+        return encode_frame({self.key: text, 'done': False})
+
+    @property
+    def text(self) -> str:
+        """The full response streamed so far."""
+        return ''.join(self.parts)
+
+
+def relay_tokens(generation, framer: TokenFramer, stream: Iterable[Dict[str, Any]],
+                 cancelled_frame: Optional[Dict[str, Any]] = None
+                 ) -> Generator[bytes, None, Optional[Dict[str, Any]]]:
+    """Frame an upstream generation's tokens for a tracked ``generation``.
+
+    Yields token frames as the framer emits them. On cancellation the
+    pending tokens are flushed and ``cancelled_frame`` closes the stream;
+    an upstream error, or a stream that stops without a ``done`` chunk,
+    sends an error frame instead. Either way the generation's outcome is
+    set. Returns the final ``done`` chunk, or None once a closing frame has
+    been sent; use with ``yield from``.
+    """
+    for chunk in generation.attach(stream):
+        token = chunk.get('response')
+        if token:
+            generation.tokens_received += 1
+
+        if generation.cancelled:
+            generation.outcome = 'cancelled'
+            frame = framer.flush()
+            if frame:
+                yield frame
+                generation.tokens_delivered = len(framer.parts)
+            yield encode_frame(cancelled_frame or {'cancelled': True, 'done': True})
+            return None
+
+        if 'error' in chunk:
+            generation.outcome = 'error'
+            yield encode_frame({'error': chunk['error'], 'done': True})
+            return None
+
+        if token:
+            frame = framer.push(token)
+            if frame:
+                yield frame
+                generation.tokens_delivered = len(framer.parts)
+
+        if chunk.get('done', False):
+            break
+    else:
+        chunk = None
+
+    frame = framer.flush()
+    if frame:
+        yield frame
+        generation.tokens_delivered = len(framer.parts)
+    if chunk is None:
+        # Upstream dropped the connection mid-answer
+        generation.outcome = 'error'
+        yield encode_frame({'error': 'stream ended unexpectedly', 'done': True})
+    return chunk
@@ -0,0 +1,115 @@
+"""Online calibration of characters-per-token from Ollama's own counts."""
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# The fixed ratio TokenCounter assumes, kept to report how much calibration helps
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+
+class TokenCalibrator:
+    """Learns each model's characters-per-token ratio from completed calls.
+
+    Every finished generation reports how many tokens Ollama produced
+    (``eval_count``) for a response of known length. The ratio is tracked
+    as an exponential moving average per model, together with the error
+    the current ratio would have made, and saved to a JSON file so it
+    survives restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.05, min_samples: int = 20,
+                 save_interval: float = 60.0):
+        self.path = path
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, float]] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._models = json.load(f)
+            logger.info(f"Loaded token calibration for {len(self._models)} models from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable token calibration {self.path}: {e}")
+
+    def observe(self, model: str, chars: int, tokens: Optional[int]) -> None:
+        """Record that ``chars`` characters of output came to ``tokens`` tokens."""
+        if not tokens or chars <= 0:
+            return
+        sample = chars / tokens
+        with self._lock:
+            state = self._models.get(model)
+            if state is None:
+                state = self._models[model] = {
+                    'ratio': sample, 'samples': 0, 'abs_error': 0.0, 'bias': 0.0, 'default_abs_error': 0.0
+                }
+            else:
+                # Score the ratio we would have used before learning from this sample
+                error = (chars / state['ratio'] - tokens) / tokens
+                default_error = abs(chars / DEFAULT_CHARS_PER_TOKEN - tokens) / tokens
+                state['abs_error'] += self.alpha * (abs(error) - state['abs_error'])
+                state['bias'] += self.alpha * (error - state['bias'])
+                state['default_abs_error'] += self.alpha * (default_error - state['default_abs_error'])
+                # Weight by length so short replies do not swing the ratio
+                weight = min(1.0, self.alpha * tokens / 50)
+                state['ratio'] += weight * (sample - state['ratio'])
+            state['samples'] += 1
+            self._dirty = True
+            due = self.path and time.monotonic() - self._saved_at >= self.save_interval
+        if due:
+            self.save()
+
+    def ratio(self, model: str) -> Optional[float]:
+        """Return the learned chars-per-token ratio, or None until enough samples."""
+        with self._lock:
+            state = self._models.get(model)
+            if state is None or state['samples'] < self.min_samples:
+                return None
+            return state['ratio']
+
+    def save(self) -> None:
+        """Write the calibration to disk if it changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._models, indent=2)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save token calibration to {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-model ratio, sample count and mean/bias error in percent."""
+        with self._lock:
+            return {
+                model: {
+                    'chars_per_token': round(state['ratio'], 3),
+                    'samples': int(state['samples']),
+                    'calibrated': state['samples'] >= self.min_samples,
+                    'mean_abs_error_pct': round(state['abs_error'] * 100, 2),
+                    'bias_pct': round(state['bias'] * 100, 2),
+                    'default_mean_abs_error_pct': round(state['default_abs_error'] * 100, 2)
+                }
+                for model, state in self._models.items()
+            }
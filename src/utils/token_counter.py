@@ -1,38 +1,135 @@
 """Token counting utilities."""
+import hashlib
+import threading
 import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+PUNCTUATION = '.,!?;:()[]{}"\'-'
+# str.translate table deleting punctuation, so it can be counted in C
+_DELETE_PUNCTUATION = str.maketrans('', '', PUNCTUATION)
+
+# Texts shorter than this are cheaper to count than to hash
+MIN_CACHED_CHARS = 256
+
+
+def _load_tokenizer(path: str):
+    """Load a Hugging Face ``tokenizer.json``; None if unavailable."""
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        logger.warning("tokenizers is not installed; using estimated token counts")
+        return None
+    try:
+        return Tokenizer.from_file(path)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer from {path}, using estimated token counts: {e}")
+        return None
+
 
 class TokenCounter:
-    """Handles token counting for conversation context."""
-    
-    def __init__(self, model: str = "gemma"):
+    """Handles token counting for conversation context.
+
+    With ``tokenizer_path`` pointing at the model's ``tokenizer.json`` counts
+    are exact; otherwise (or if the ``tokenizers`` package is missing) they
+    are estimated from characters, whitespace and punctuation. Counts of
+    longer texts are kept in an LRU keyed by content hash, so recounting an
+    unchanged message or document is a dictionary lookup. Without a
+    tokenizer, a ``calibrator`` that has learned this model's
+    characters-per-token ratio from Ollama's eval counts replaces the
+    fixed heuristic.
+    """
+
+    def __init__(self, model: str = "gemma", tokenizer_path: Optional[str] = None,
+                 cache_size: int = 4096, calibrator=None):
         """Initialize token counter for Ollama models."""
         self.model = model
         # Approximate tokens per character for estimation
         # Most models average around 3-4 characters per token
         self.chars_per_token = 4
-    
+        self.tokenizer = _load_tokenizer(tokenizer_path) if tokenizer_path else None
+        self.calibrator = calibrator
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[bytes, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def exact(self) -> bool:
+        """True when counts come from the model's tokenizer."""
+        return self.tokenizer is not None
+
     def count(self, text: str) -> int:
+        """Count (or estimate) the tokens in text."""
+        if not text:
+            return 0
+        if self.tokenizer is None and self.calibrator is not None:
+            ratio = self.calibrator.ratio(self.model)
+            if ratio:
+                return max(1, round(len(text) / ratio))
+        if self.cache_size <= 0 or len(text) < MIN_CACHED_CHARS:
+            return self._count(text)
+
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        tokens = self._count(text)
+        with self._lock:
+            self._cache[key] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def _count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return max(1, len(self.tokenizer.encode(text, add_special_tokens=False).ids))
+        return self.estimate(text)
+
+    def estimate(self, text: str) -> int:
         """
         Estimate token count for text.
-        
-        For Ollama models, we use character-based estimation
-        since tiktoken is specific to OpenAI models.
+
+        For Ollama models without a local tokenizer, we use character-based
+        estimation since tiktoken is specific to OpenAI models.
         """
         if not text:
             return 0
-        
+
         # Basic estimation: ~4 characters per token on average
         # This is a reasonable approximation for most LLMs
         estimated_tokens = len(text) // self.chars_per_token
-        
+
         # Account for whitespace and punctuation which often become separate tokens
         whitespace_count = text.count(' ') + text.count('\n') + text.count('\t')
-        punctuation_count = sum(1 for char in text if char in '.,!?;:()[]{}"\'-')
-        
+        punctuation_count = len(text) - len(text.translate(_DELETE_PUNCTUATION))
+
         # Adjust estimate based on whitespace and punctuation
         estimated_tokens += (whitespace_count + punctuation_count) // 4
-        
-        return max(1, estimated_tokens)  # Ensure at least 1 token for non-empty text
\ No newline at end of file
+
+        return max(1, estimated_tokens)  # Ensure at least 1 token for non-empty text
+
+    def _mode(self) -> str:
+        if self.exact:
+            return 'tokenizer'
+        if self.calibrator is not None and self.calibrator.ratio(self.model):
+            return 'calibrated'
+        return 'estimate'
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return counting mode and cache hit rates."""
+        with self._lock:
+            return {
+                'mode': self._mode(),
+                'cached': len(self._cache),
+                'hits': self._hits,
+                'misses': self._misses
+            }
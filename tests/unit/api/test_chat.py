@@ -1,7 +1,9 @@
 """Unit tests for chat API endpoint."""
 import pytest
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, Mock
+
+from src.services.semantic_cache import SemanticCache
 
 
 class TestChatAPI:
@@ -101,4 +103,239 @@ class TestChatAPI:
             # Should still return 200 but with error in stream
             assert response.status_code == 200
             data = response.data.decode('utf-8')
-            assert 'error' in data.lower() or 'API Error' in data
\ No newline at end of file
+            assert 'error' in data.lower() or 'API Error' in data
+    
+    def test_chat_stream_coalesces_tokens(self, client):
+        """Test per-request token coalescing batches tokens into fewer frames."""
+        with patch('src.api.chat.get_ollama_service') as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.return_value = [
+                {'response': 'a', 'done': False},
+                {'response': 'b', 'done': False},
+                {'response': 'c', 'done': False},
+                {'response': '', 'done': True, 'eval_count': 3}
+            ]
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/chat/stream',
+                                 json={'message': 'Hi', 'coalesce_tokens': 2},
+                                 headers={'Content-Type': 'application/json'})
+            
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+            tokens = [f['token'] for f in frames if 'token' in f]
+            
+            assert tokens == ['ab', 'c']
+            assert frames[-1]['done'] is True
+            assert frames[-1]['eval_count'] == 3
+    
+    def test_chat_stream_sends_generation_id(self, client):
+        """Test the first frame carries the generation id used for cancelling."""
+        with patch('src.api.chat.get_ollama_service') as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.return_value = [{'response': 'Hi', 'done': True}]
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/chat/stream', json={'message': 'Hi'})
+            first = json.loads(response.data.decode('utf-8').split('\n')[0])
+            
+            assert len(first['generation_id']) == 32
+    
+    def test_chat_stream_stops_when_cancelled(self, client):
+        """Test a cancelled generation stops streaming and closes the upstream."""
+        from src.services.generation_registry import GenerationRegistry
+        registry = GenerationRegistry()
+        closed = []
+        
+        def upstream(*args, **kwargs):
+            try:
+                yield {'response': 'a', 'done': False}
+                # Cancel arrives while the model is still generating
+                for generation_id in list(registry._active):
+                    registry.cancel(generation_id)
+                yield {'response': 'b', 'done': False}
+                yield {'response': 'c', 'done': True}
+            finally:
+                closed.append(True)
+        
+        with patch('src.api.chat.get_ollama_service') as mock_get_service, \
+             patch('src.api.chat.get_generation_registry', return_value=registry):
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.side_effect = upstream
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/chat/stream', json={'message': 'Hi'})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+        
+        assert [f['token'] for f in frames if 'token' in f] == ['a']
+        assert frames[-1] == {'cancelled': True, 'done': True}
+        assert closed == [True]
+        assert registry.get_stats()['cancelled'] == 1
+        assert registry.get_stats()['wasted_tokens'] == 1
+    
+    def test_cancel_unknown_generation(self, client):
+        """Test cancelling an id that is not running returns 404."""
+        response = client.post('/api/chat/cancel', json={'generation_id': 'nope'})
+        
+        assert response.status_code == 404
+    
+    def test_cancel_requires_generation_id(self, client):
+        """Test cancelling without an id returns 400."""
+        response = client.post('/api/chat/cancel', json={})
+        
+        assert response.status_code == 400
+    
+    def test_chat_stream_multi_turn_messages(self, client):
+        """Test a session sends earlier turns as a growing, prefix-stable messages array."""
+        from src.services.conversation_service import ConversationService
+        with patch('src.api.chat.get_ollama_service') as mock_get_service, \
+             patch('src.api.chat.get_conversation_service', return_value=ConversationService()):
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.side_effect = [
+                [{'response': 'First answer', 'done': True, 'prompt_eval_count': 20}],
+                [{'response': 'Second answer', 'done': True, 'prompt_eval_count': 5}]
+            ]
+            mock_get_service.return_value = mock_service
+            
+            client.post('/api/chat/stream', json={'message': 'One', 'session_id': 'multi-turn'}).get_data()
+            response = client.post('/api/chat/stream', json={'message': 'Two', 'session_id': 'multi-turn'})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+            
+            first_call, second_call = mock_service.generate_stream.call_args_list
+            assert first_call.kwargs['history'] == []
+            assert second_call.kwargs['history'] == [
+                {'role': 'user', 'content': 'One'},
+                {'role': 'assistant', 'content': 'First answer'}
+            ]
+            assert second_call.kwargs['session_id'] == 'multi-turn'
+            assert frames[0]['session_id'] == 'multi-turn'
+            assert frames[0]['full_prompt'].endswith('Human: One\n\nFirst answer\n\nHuman: Two\n\n')
+            assert frames[-1]['turn'] == 2
+            assert frames[-1]['prompt_eval_count'] == 5
+    
+    def test_chat_tokens_incremental(self, client):
+        """Test token counting from edits against a stored draft."""
+        full = client.post('/api/chat/tokens', json={'message': 'Hello there', 'document_id': 'draft-1'})
+        edited = client.post('/api/chat/tokens', json={
+            'document_id': 'draft-1',
+            'edits': [{'start': 11, 'end': 11, 'text': ', how are you today?'}],
+            'length': 31
+        })
+        direct = client.post('/api/chat/tokens', json={'message': 'Hello there, how are you today?'})
+        
+        assert full.status_code == 200
+        assert edited.get_json()['count'] == direct.get_json()['count']
+        assert edited.get_json()['count'] > full.get_json()['count']
+    
+    def test_chat_tokens_resync(self, client):
+        """Test edits to an unknown draft ask for the full text."""
+        response = client.post('/api/chat/tokens', json={
+            'document_id': 'never-sent',
+            'edits': [{'start': 0, 'end': 0, 'text': 'a'}]
+        })
+        
+        assert response.status_code == 409
+        assert response.get_json()['resync'] is True
+    
+    def test_chat_batch_streams_results_by_index(self, client):
+        """Test batch items come back tagged by index with timing."""
+        def upstream(prompt, *args, **kwargs):
+            return iter([{'response': prompt.upper(), 'done': False},
+                         {'response': '', 'done': True, 'eval_count': 3}])
+        
+        with patch('src.api.chat.get_ollama_service') as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.side_effect = upstream
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/chat/batch', json={
+                'template': 'say {input}', 'inputs': ['a', 'b', 'c'],
+                'options': {'temperature': 0}, 'concurrency': 2
+            })
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+            
+            assert frames[0]['count'] == 3
+            items = sorted((f for f in frames if 'index' in f), key=lambda f: f['index'])
+            assert [f['response'] for f in items] == ['SAY A', 'SAY B', 'SAY C']
+            assert all('total_ms' in f and 'queued_ms' in f for f in items)
+            assert frames[-1] == {**frames[-1], 'done': True, 'completed': 3, 'failed': 0}
+            options = mock_service.generate_stream.call_args[0][1]
+            assert options['temperature'] == 0
+            assert mock_service.generate_stream.call_args[1]['priority'] == 'query'
+    
+    def test_chat_batch_reports_item_errors(self, client):
+        """Test a failing item does not fail the batch."""
+        def upstream(prompt, *args, **kwargs):
+            if prompt == 'bad':
+                return iter([{'error': 'model crashed', 'done': True}])
+            return iter([{'response': 'ok', 'done': True}])
+        
+        with patch('src.api.chat.get_ollama_service') as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.side_effect = upstream
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/chat/batch', json={'prompts': ['good', 'bad']})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+            
+            errors = [f for f in frames if 'error' in f]
+            assert errors == [{**errors[0], 'index': 1, 'error': 'model crashed'}]
+            assert frames[-1]['failed'] == 1
+    
+    def test_chat_batch_validates_prompts(self, client):
+        """Test empty or oversized batches are rejected."""
+        assert client.post('/api/chat/batch', json={}).status_code == 400
+        assert client.post('/api/chat/batch', json={'prompts': ['ok', '']}).status_code == 400
+        assert client.post('/api/chat/batch', json={'prompts': ['x'] * 501}).status_code == 400
+    
+    def test_chat_batch_validates_options_and_inputs(self, client):
+        """Test non-object options and non-list inputs are rejected."""
+        response = client.post('/api/chat/batch', json={'prompts': ['ok'], 'options': ['temperature']})
+        assert response.status_code == 400
+        assert 'options' in response.get_json()['message']
+        response = client.post('/api/chat/batch', json={'template': 'say {input}', 'inputs': 'abc'})
+        assert response.status_code == 400
+        assert 'inputs' in response.get_json()['message']
+    
+    def test_chat_stream_replays_semantic_cache_hit(self, client):
+        """Test an equivalent stateless prompt is answered from the semantic cache."""
+        vectors = {'capital of France?': [1.0, 0.0], 'France capital?': [0.99, 0.05]}
+        cache = SemanticCache(Mock(side_effect=lambda text, **kwargs: vectors.get(text)), threshold=0.95)
+        with patch('src.api.chat.get_ollama_service') as mock_get_service, \
+                patch('src.api.chat.get_semantic_cache', return_value=cache):
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.return_value = [
+                {'response': 'Paris', 'done': False},
+                {'response': ' it is.', 'done': True}
+            ]
+            mock_get_service.return_value = mock_service
+            
+            client.post('/api/chat/stream', json={'message': 'capital of France?'}).data
+            response = client.post('/api/chat/stream', json={'message': 'France capital?'})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+        
+        assert mock_service.generate_stream.call_count == 1
+        assert ''.join(f.get('token', '') for f in frames) == 'Paris it is.'
+        assert frames[-1]['done'] and frames[-1]['cached']
+        assert frames[-1]['similarity'] >= 0.95
+    
+    def test_chat_stream_reports_truncated_upstream(self, client):
+        """Test an upstream stream that stops without done ends with an error frame."""
+        with patch('src.api.chat.get_ollama_service') as mock_get_service, \
+                patch('src.api.chat.get_semantic_cache', return_value=None):
+            mock_service = MagicMock()
+            mock_service.model_name = 'gemma3:12b-it-qat'
+            mock_service.generate_stream.return_value = [{'response': 'Half an', 'done': False}]
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/chat/stream', json={'message': 'Say hello'})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+        
+        assert frames[-2] == {'token': 'Half an', 'done': False}
+        assert frames[-1] == {'error': 'stream ended unexpectedly', 'done': True}
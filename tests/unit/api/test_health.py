@@ -67,4 +67,13 @@ class TestHealthAPI:
             assert 'gemma3:12b-it-qat' not in data['models']
             assert 'context_limit' in data
             assert 'context_limit_k' in data
-            assert 'current_model' in data
\ No newline at end of file
+            assert 'current_model' in data
+    
+    def test_health_metrics(self, client):
+        """Test that the metrics endpoint reports transport counters."""
+        response = client.get('/api/health/metrics')
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert 'connections_reused' in data['transport']
+        assert 'requests' in data['transport']
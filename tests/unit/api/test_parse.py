@@ -1,7 +1,10 @@
 """Unit tests for parse API endpoint."""
 import pytest
 import json
-from unittest.mock import patch, MagicMock
+import time
+from unittest.mock import patch, MagicMock, Mock
+
+from src.services.semantic_cache import SemanticCache
 
 
 class TestParseAPI:
@@ -65,4 +68,93 @@ class TestParseAPI:
             assert response.status_code == 200
             data = response.data.decode('utf-8')
             # The error will be caught and returned in the stream
-            assert 'error' in data.lower() or 'done' in data
\ No newline at end of file
+            assert 'error' in data.lower() or 'done' in data
+    
+    def test_parse_stream_resumable(self, client):
+        """Test a resumable parse can be re-read from an offset after it finishes."""
+        with patch('src.api.parse.get_ollama_service') as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.generate_stream.return_value = [
+                {'response': 'Parsed', 'done': False},
+                {'response': ' content', 'done': False},
+                {'response': '', 'done': True}
+            ]
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/parse/stream', json={'text': 'Parse this text', 'resumable': True})
+            lines = response.data.decode('utf-8').strip().split('\n')
+            first = json.loads(lines[0])
+            
+            resumed = client.post('/api/parse/resume', json={'generation_id': first['generation_id'], 'offset': 2})
+            
+            assert first['resumable'] is True
+            assert resumed.status_code == 200
+            assert resumed.data.decode('utf-8').strip().split('\n') == lines[2:]
+            mock_service.generate_stream.assert_called_once()
+    
+    def test_parse_resume_unknown_or_expired(self, client):
+        """Test resuming needs a buffered generation and offset."""
+        assert client.post('/api/parse/resume', json={'generation_id': 'nope'}).status_code == 404
+        
+        client.application.config['RESUME_BUFFER_FRAMES'] = 2
+        with patch('src.api.parse.get_ollama_service') as mock_get_service:
+            mock_service = MagicMock()
+            
+            def slow_upstream(*args, **kwargs):
+                for chunk in ({'response': 'a', 'done': False}, {'response': 'b', 'done': False},
+                              {'response': '', 'done': True}):
+                    time.sleep(0.05)
+                    yield chunk
+            
+            mock_service.generate_stream.side_effect = slow_upstream
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/parse/stream', json={'text': 'Parse this text', 'resumable': True})
+            generation_id = json.loads(response.data.decode('utf-8').split('\n')[0])['generation_id']
+        
+        expired = client.post('/api/parse/resume', json={'generation_id': generation_id, 'offset': 0})
+        assert expired.status_code == 410
+    
+    def test_parse_stream_caches_completed_parses(self, client):
+        """Test a repeated text replays the stored parse, and unfinished parses are not stored."""
+        cache = SemanticCache(Mock(return_value=[1.0, 0.0]))
+        with patch('src.api.parse.get_ollama_service') as mock_get_service, \
+                patch('src.api.parse.get_semantic_cache', return_value=cache):
+            mock_service = MagicMock()
+            mock_service.model_name = 'phi3:mini'
+            mock_service.generate_stream.return_value = [{'response': 'partial', 'done': False}]
+            mock_get_service.return_value = mock_service
+            
+            client.post('/api/parse/stream', json={'text': 'Parse this text'}).data
+            assert cache.get_stats()['entries'] == 0
+            
+            mock_service.generate_stream.return_value = [
+                {'response': 'Name: Ada', 'done': False},
+                {'response': '', 'done': True}
+            ]
+            client.post('/api/parse/stream', json={'text': 'Parse this text'}).data
+            response = client.post('/api/parse/stream', json={'text': 'Parse this text'})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+        
+        assert mock_service.generate_stream.call_count == 2
+        assert ''.join(f.get('content', '') for f in frames) == 'Name: Ada'
+        assert frames[-1] == {'content': '', 'done': True, 'cached': True, 'similarity': 1.0}
+    
+    def test_parse_stream_reports_upstream_error_without_caching(self, client):
+        """Test a mid-stream error reaches the client and the partial parse is not cached."""
+        cache = SemanticCache(Mock(return_value=[1.0, 0.0]))
+        with patch('src.api.parse.get_ollama_service') as mock_get_service, \
+                patch('src.api.parse.get_semantic_cache', return_value=cache):
+            mock_service = MagicMock()
+            mock_service.model_name = 'phi3:mini'
+            mock_service.generate_stream.return_value = [
+                {'response': 'Name:', 'done': False},
+                {'error': 'model crashed', 'done': True}
+            ]
+            mock_get_service.return_value = mock_service
+            
+            response = client.post('/api/parse/stream', json={'text': 'Parse this text'})
+            frames = [json.loads(line) for line in response.data.decode('utf-8').strip().split('\n')]
+        
+        assert frames[-1] == {'error': 'model crashed', 'done': True}
+        assert cache.get_stats()['entries'] == 0
@@ -350,4 +350,61 @@ class TestWorkAssistantAPI:
         
         response = client.get(f'/api/work/status-updates/{project_id}')
         assert response.status_code == 200
-        assert response.json == []  # Empty initially
\ No newline at end of file
+        assert response.json == []  # Empty initially
+    
+    def _seed_rows(self, app):
+        from src.models.database import db, Project, Email, StatusUpdate, Deliverable
+        with app.app_context():
+            projects = [Project(name=f'Project {i}') for i in range(3)]
+            db.session.add_all(projects)
+            db.session.flush()
+            for i in range(30):
+                project_id = projects[i % 3].id if i % 10 else None
+                db.session.add(Email(sender=f'user{i}@example.com', subject=f'Email {i}',
+                                     content='x' * (490 + i), recipients=['a@example.com'],
+                                     keywords=['k'], project_id=project_id,
+                                     received_date=datetime(2024, 1, 1) + timedelta(hours=i)))
+                db.session.add(Deliverable(project_id=projects[i % 3].id, title=f'Deliverable {i}',
+                                           due_date=datetime(2024, 2, 1) + timedelta(days=i)))
+                db.session.add(StatusUpdate(project_id=projects[0].id, content=f'Update {i}',
+                                            keywords=['k'], created_at=datetime(2024, 1, 1) + timedelta(minutes=i)))
+            db.session.commit()
+            return projects[0].id
+    
+    def test_list_endpoints_use_one_query(self, app, client):
+        """Test listing rows across projects costs one SELECT regardless of row count."""
+        from sqlalchemy import event
+        from src.models.database import db
+        project_id = self._seed_rows(app)
+        
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            for url in ('/api/work/emails?limit=30', '/api/work/deliverables',
+                        f'/api/work/status-updates/{project_id}'):
+                statements.clear()
+                response = client.get(url)
+                assert response.status_code == 200
+                assert len(response.json) == 30
+                assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 1
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+    
+    def test_list_serialization_matches_to_dict(self, app, client):
+        """Test projected rows serialize exactly like the ORM objects."""
+        from src.models.database import Email, StatusUpdate, Deliverable
+        project_id = self._seed_rows(app)
+        
+        emails = client.get('/api/work/emails?limit=30').json
+        deliverables = client.get('/api/work/deliverables').json
+        updates = client.get(f'/api/work/status-updates/{project_id}').json
+        
+        with app.app_context():
+            assert emails == [e.to_dict() for e in Email.query.order_by(Email.received_date.desc())]
+            assert deliverables == [d.to_dict() for d in Deliverable.query.order_by(Deliverable.due_date.asc())]
+            assert updates == [u.to_dict() for u in StatusUpdate.query.order_by(StatusUpdate.created_at.desc())]
+        assert any(e['project_name'] is None for e in emails)
+        assert any(e['content'].endswith('...') for e in emails)
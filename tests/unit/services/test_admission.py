@@ -0,0 +1,105 @@
+"""Unit tests for the priority admission scheduler."""
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.services.admission import AdmissionScheduler, AdmissionTimeout
+from src.services.ollama_service import OllamaService
+
+
+def _wait_for(predicate, timeout=2.0):
+    """Poll until predicate() is true."""
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+class TestAdmissionScheduler:
+    """Test cases for AdmissionScheduler."""
+    
+    def test_unknown_class_rejected(self):
+        """Test that only known request classes are accepted."""
+        scheduler = AdmissionScheduler()
+        with pytest.raises(ValueError):
+            scheduler.acquire('bulk')
+    
+    def test_class_limit_enforced(self):
+        """Test per-class limits cap concurrency below the global limit."""
+        scheduler = AdmissionScheduler(max_concurrency=4, class_limits={'extraction': 1},
+                                       interactive_reserved=0)
+        scheduler.acquire('extraction')
+        
+        with pytest.raises(AdmissionTimeout):
+            scheduler.acquire('extraction', timeout=0.05)
+        
+        stats = scheduler.get_stats()['classes']['extraction']
+        assert stats['active'] == 1
+        assert stats['timeouts'] == 1
+    
+    def test_reserved_slots_only_for_interactive(self):
+        """Test background work cannot take the reserved interactive slot."""
+        scheduler = AdmissionScheduler(max_concurrency=2, interactive_reserved=1)
+        scheduler.acquire('extraction')
+        
+        with pytest.raises(AdmissionTimeout):
+            scheduler.acquire('embedding', timeout=0.05)
+        scheduler.acquire('interactive', timeout=0.05)
+        assert scheduler.get_stats()['active'] == 2
+    
+    def test_interactive_served_before_queued_background(self):
+        """Test a waiting interactive request is admitted ahead of earlier background ones."""
+        scheduler = AdmissionScheduler(max_concurrency=1, interactive_reserved=0)
+        scheduler.acquire('extraction')
+        order = []
+        
+        def worker(request_class):
+            with scheduler.slot(request_class):
+                order.append(request_class)
+        
+        background = threading.Thread(target=worker, args=('extraction',))
+        background.start()
+        _wait_for(lambda: scheduler.get_stats()['queued'] == 1)
+        interactive = threading.Thread(target=worker, args=('interactive',))
+        interactive.start()
+        _wait_for(lambda: scheduler.get_stats()['queued'] == 2)
+        
+        scheduler.release('extraction')
+        background.join()
+        interactive.join()
+        
+        assert order == ['interactive', 'extraction']
+        assert scheduler.get_stats()['classes']['extraction']['wait_max_ms'] > 0
+
+
+class TestOllamaServiceAdmission:
+    """Test OllamaService integration with the scheduler."""
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_generate_returns_error_on_admission_timeout(self, mock_post):
+        """Test a call that cannot be admitted fails without reaching Ollama."""
+        scheduler = AdmissionScheduler(max_concurrency=1, interactive_reserved=0)
+        scheduler.acquire('query')
+        service = OllamaService('http://localhost:11434', 'phi3',
+                                scheduler=scheduler, admission_timeout=0.05)
+        
+        result = service.generate('prompt', use_cache=False)
+        
+        assert 'error' in result
+        mock_post.assert_not_called()
+    
+    def test_stream_yields_error_on_admission_timeout(self):
+        """Test a stream that cannot be admitted yields a terminal error chunk."""
+        scheduler = AdmissionScheduler(max_concurrency=1, interactive_reserved=0)
+        scheduler.acquire('interactive')
+        service = OllamaService('http://localhost:11434', 'gemma3',
+                                scheduler=scheduler, admission_timeout=0.05)
+        
+        chunks = list(service.generate_stream('prompt'))
+        
+        assert len(chunks) == 1
+        assert chunks[0]['done'] is True
+        assert 'error' in chunks[0]
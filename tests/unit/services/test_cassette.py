@@ -0,0 +1,70 @@
+"""Unit tests for the record/replay cassette transport."""
+import time
+
+import pytest
+import requests
+
+from src.services.cassette import CassetteTransport, interaction_key
+from src.services.ollama_service import OllamaService
+from src.utils.fake_ollama import FakeOllamaServer
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    return str(tmp_path / 'ollama.jsonl.gz')
+
+
+def record(path, **server_kwargs):
+    """Record a chat stream and a generate call against a fake server."""
+    with FakeOllamaServer(**server_kwargs) as server:
+        service = OllamaService(server.url, 'phi3:mini', transport=CassetteTransport(path, mode='record'))
+        chunks = list(service.generate_stream('Hello'))
+        result = service.generate('Summarize', use_cache=False)
+    return chunks, result
+
+
+class TestCassette:
+    """Test cases for CassetteTransport."""
+    
+    def test_key_ignores_host_and_key_order(self):
+        """Test interactions match across hosts and JSON key order."""
+        key = interaction_key('POST', 'http://a:11434/api/generate', {'model': 'x', 'prompt': 'p'})
+        
+        assert key == interaction_key('post', 'http://b:1/api/generate', {'prompt': 'p', 'model': 'x'})
+        assert key != interaction_key('POST', 'http://a:11434/api/chat', {'model': 'x', 'prompt': 'p'})
+    
+    def test_replay_matches_recording(self, cassette_path):
+        """Test replayed streams and generations equal what was recorded."""
+        chunks, result = record(cassette_path, ttft=0.0, tokens_per_second=0, response_tokens=4)
+        
+        replay = CassetteTransport(cassette_path, mode='replay', speed=0)
+        # Different host: replay never touches the network
+        service = OllamaService('http://offline:1', 'phi3:mini', transport=replay)
+        
+        assert list(service.generate_stream('Hello')) == chunks
+        assert service.generate('Summarize', use_cache=False) == result
+        assert replay.get_stats()['cassette']['replayed'] == 2
+    
+    def test_replay_preserves_stream_timing(self, cassette_path):
+        """Test replay at recorded speed keeps time-to-first-token."""
+        record(cassette_path, ttft=0.2, tokens_per_second=0, response_tokens=2)
+        service = OllamaService('http://offline:1', 'phi3:mini',
+                                transport=CassetteTransport(cassette_path, mode='replay', speed=2.0))
+        
+        start = time.monotonic()
+        next(service.generate_stream('Hello'))
+        
+        assert 0.08 <= time.monotonic() - start < 0.2
+    
+    def test_unrecorded_request_fails_like_connection_error(self, cassette_path):
+        """Test a request missing from the cassette surfaces as a connection error."""
+        record(cassette_path, ttft=0.0, tokens_per_second=0, response_tokens=1)
+        transport = CassetteTransport(cassette_path, mode='replay', speed=0)
+        service = OllamaService('http://offline:1', 'phi3:mini', transport=transport)
+        
+        result = service.generate('Never recorded', use_cache=False)
+        
+        assert 'error' in result
+        assert transport.get_stats()['cassette']['misses'] == 1
+        with pytest.raises(requests.exceptions.ConnectionError):
+            transport.get('http://offline:1/api/ps')
@@ -0,0 +1,128 @@
+"""Unit tests for the SQLite conversation backend."""
+from unittest.mock import patch
+
+import pytest
+
+from src.services.conversation_backend import ConversationBackend, SQLiteConversationBackend
+from src.services.conversation_service import ConversationService
+from src.services.session_store import SessionStore, Turn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'conversations.db')
+
+
+class TestSQLiteConversationBackend:
+    """Test cases for SQLiteConversationBackend."""
+    
+    def test_writes_are_batched_behind_the_caller(self, db_path):
+        """Test appends return immediately and land in one transaction."""
+        backend = SQLiteConversationBackend(db_path, flush_interval=0.2)
+        for i in range(5):
+            backend.append('s1', Turn(f'q{i}', f'a{i}', 10), max_turns=10)
+        
+        assert backend.pending('s1')
+        assert backend.flush(timeout=5)
+        assert not backend.pending('s1')
+        
+        version, turns = backend.load('s1')
+        assert version == 5
+        assert [t.user for t in turns] == ['q0', 'q1', 'q2', 'q3', 'q4']
+        assert turns[0].tokens == 10
+        assert backend.get_stats()['batches'] == 1
+        backend.close()
+    
+    def test_append_trims_and_replace_overwrites(self, db_path):
+        """Test passing max_turns trims stored turns to half and replace clears them."""
+        backend = SQLiteConversationBackend(db_path)
+        for i in range(5):
+            backend.append('s1', Turn(f'q{i}', 'a'), max_turns=4)
+        backend.flush(timeout=5)
+        assert [t.user for t in backend.load('s1')[1]] == ['q3', 'q4']
+        
+        backend.replace('s1', [])
+        backend.flush(timeout=5)
+        assert backend.load('s1') == (6, [])
+        backend.close()
+    
+    def test_close_writes_queued_turns(self, db_path):
+        """Test history survives a restart."""
+        backend = SQLiteConversationBackend(db_path, flush_interval=10)
+        backend.append('s1', Turn('Hello', 'Hi'), max_turns=10)
+        backend.close()
+        
+        reopened = SQLiteConversationBackend(db_path)
+        assert reopened.load('s1')[1] == [{'user': 'Hello', 'assistant': 'Hi'}]
+        reopened.close()
+    
+    def test_workers_share_sessions(self, db_path):
+        """Test a session written by one worker is served by another."""
+        worker_a = ConversationService(backend=SQLiteConversationBackend(db_path))
+        worker_b = ConversationService(backend=SQLiteConversationBackend(db_path))
+        
+        worker_a.add_exchange('s1', 'Hello', 'Hi')
+        worker_a.backend.flush(timeout=5)
+        assert worker_b.build_messages('s1')[0]['content'] == 'Hello'
+        
+        worker_b.add_exchange('s1', 'Again', 'Sure')
+        worker_b.backend.flush(timeout=5)
+        assert [t['user'] for t in worker_a.get_history('s1')] == ['Hello', 'Again']
+        
+        worker_a.backend.close()
+        worker_b.backend.close()
+    
+    def test_trim_uses_stored_turns_not_a_stale_worker_view(self, db_path):
+        """Test a worker that missed another's write does not delete that write when trimming."""
+        worker_a = ConversationService(max_history=10, backend=SQLiteConversationBackend(db_path))
+        worker_b = ConversationService(max_history=10, backend=SQLiteConversationBackend(db_path))
+        worker_a.add_exchange('s1', 'a1', 'r')
+        worker_a.add_exchange('s1', 'a2', 'r')
+        worker_a.backend.flush(timeout=5)
+        worker_b.build_messages('s1')
+        worker_b.add_exchange('s1', 'b1', 'r')
+        worker_b.backend.flush(timeout=5)
+        
+        # worker_a still holds two turns in memory and appends without reloading
+        worker_a.add_exchange('s1', 'a3', 'r')
+        worker_a.backend.flush(timeout=5)
+        
+        assert [t.user for t in worker_a.backend.load('s1')[1]] == ['a1', 'a2', 'b1', 'a3']
+        assert [t['user'] for t in worker_a.get_history('s1')] == ['a1', 'a2', 'b1', 'a3']
+        worker_a.backend.close()
+        worker_b.backend.close()
+    
+    def test_version_is_checked_once_per_chat_turn(self, db_path):
+        """Test building messages and recording the reply cost one version lookup."""
+        service = ConversationService(backend=SQLiteConversationBackend(db_path))
+        service.add_exchange('s1', 'Hello', 'Hi')
+        service.backend.flush(timeout=5)
+        
+        with patch.object(service.backend, 'version', wraps=service.backend.version) as version:
+            service.build_messages('s1', 'Again')
+            service.add_exchange('s1', 'Again', 'Sure')
+        
+        assert version.call_count == 1
+        service.backend.close()
+    
+    def test_backend_interface_is_abstract(self):
+        """Test a backend must implement the storage methods."""
+        class Partial(ConversationBackend):
+            def version(self, session_id):
+                return 0
+        
+        with pytest.raises(TypeError):
+            Partial()
+    
+    def test_evicted_session_reloads_from_backend(self, db_path):
+        """Test the in-memory store is only a hot set."""
+        service = ConversationService(store=SessionStore(max_sessions=1),
+                                      backend=SQLiteConversationBackend(db_path))
+        service.add_exchange('s1', 'Hello', 'Hi')
+        service.add_exchange('s2', 'Other', 'Reply')
+        service.backend.flush(timeout=5)
+        
+        assert 's1' not in service.conversations
+        assert service.get_history('s1')[0]['user'] == 'Hello'
+        assert service.get_token_total('s1') > 0
+        service.backend.close()
@@ -0,0 +1,151 @@
+"""Unit tests for background conversation compaction."""
+import threading
+from unittest.mock import Mock
+
+from src.services.conversation_backend import SQLiteConversationBackend
+from src.services.conversation_compactor import ConversationCompactor
+from src.services.conversation_service import ConversationService
+from src.services.session_store import Turn
+
+
+def make_ollama(response='They talked about the quarterly report.'):
+    ollama = Mock()
+    ollama.model_name = 'phi3:mini'
+    ollama.generate.return_value = {'response': response}
+    return ollama
+
+
+class TestConversationCompactor:
+    """Test cases for ConversationCompactor."""
+    
+    def test_folds_turns_into_summary(self):
+        """Test submitted turns become a summary with a token count."""
+        ollama = make_ollama()
+        compactor = ConversationCompactor(ollama)
+        compactor.submit('s1', [Turn('Can you check the report?', 'Sure')])
+        
+        assert compactor.flush(timeout=5)
+        text, tokens = compactor.get('s1')
+        assert text == 'They talked about the quarterly report.'
+        assert tokens > 0
+        prompt = ollama.generate.call_args[0][0]
+        assert 'Can you check the report?' in prompt
+        assert ollama.generate.call_args[1]['priority'] == 'extraction'
+    
+    def test_previous_summary_is_carried_forward(self):
+        """Test each compaction builds on the last summary."""
+        ollama = make_ollama()
+        compactor = ConversationCompactor(ollama)
+        compactor.submit('s1', [Turn('a', 'b')])
+        compactor.flush(timeout=5)
+        compactor.submit('s1', [Turn('c', 'd')])
+        compactor.flush(timeout=5)
+        
+        assert 'They talked about the quarterly report.' in ollama.generate.call_args[0][0]
+        assert compactor.get_stats()['turns_folded'] == 2
+    
+    def test_queued_turns_for_a_session_share_one_call(self):
+        """Test turns evicted while the worker is busy are folded together."""
+        release = threading.Event()
+        ollama = make_ollama()
+        ollama.generate.side_effect = lambda *a, **k: release.wait(5) and {'response': 'summary'}
+        compactor = ConversationCompactor(ollama)
+        compactor.submit('busy', [Turn('x', 'y')])
+        compactor.submit('s1', [Turn('a', 'b')])
+        compactor.submit('s1', [Turn('c', 'd')])
+        release.set()
+        
+        assert compactor.flush(timeout=5)
+        assert ollama.generate.call_count == 2
+    
+    def test_errors_keep_previous_summary(self):
+        """Test a failed model call leaves no broken summary behind."""
+        ollama = make_ollama()
+        ollama.generate.return_value = {'error': 'Ollama is unavailable (circuit open)'}
+        compactor = ConversationCompactor(ollama)
+        compactor.submit('s1', [Turn('a', 'b')])
+        compactor.flush(timeout=5)
+        
+        assert compactor.get('s1') is None
+        assert compactor.get_stats()['errors'] == 1
+    
+    def test_forget_during_compaction_discards_result(self):
+        """Test a session forgotten mid-summary does not get the stale summary back."""
+        started, release = threading.Event(), threading.Event()
+        ollama = make_ollama()
+        ollama.generate.side_effect = lambda *a, **k: (started.set(), release.wait(5)) and {'response': 'stale'}
+        compactor = ConversationCompactor(ollama)
+        compactor.submit('s1', [Turn('a', 'b')])
+        started.wait(5)
+        compactor.forget('s1')
+        for i in range(1000):
+            compactor.forget(f'evicted-{i}')
+        release.set()
+        
+        assert compactor.flush(timeout=5)
+        assert compactor.get('s1') is None
+        assert compactor.get_stats()['compactions'] == 0
+
+
+class TestConversationServiceCompaction:
+    """Test ConversationService with a compactor."""
+    
+    def test_trimmed_turns_are_summarized_and_sent_first(self):
+        """Test history trimmed by max_history comes back as a summary."""
+        compactor = ConversationCompactor(make_ollama())
+        service = ConversationService(max_history=4, compactor=compactor)
+        for i in range(5):
+            service.add_exchange('s1', f'Question {i}', f'Answer {i}')
+        compactor.flush(timeout=5)
+        
+        messages = service.build_messages('s1', 'Next')
+        assert messages[0]['role'] == 'system'
+        assert 'quarterly report' in messages[0]['content']
+        assert [m['content'] for m in messages[1:]] == ['Question 3', 'Answer 3', 'Question 4', 'Answer 4']
+        assert compactor.get_stats()['turns_folded'] == 3
+        assert 'quarterly report' in service.build_context('s1', 'Next')
+    
+    def test_summary_dropped_when_it_does_not_fit(self):
+        """Test the summary never pushes the prompt over budget."""
+        compactor = ConversationCompactor(make_ollama('word ' * 200))
+        service = ConversationService(max_history=1, compactor=compactor)
+        service.add_exchange('s1', 'a', 'b')
+        service.add_exchange('s1', 'c', 'd')
+        compactor.flush(timeout=5)
+        
+        assert service.build_messages('s1', budget=50)[0]['role'] == 'user'
+    
+    def test_clear_session_forgets_summary(self):
+        """Test clearing a session clears its summary."""
+        compactor = ConversationCompactor(make_ollama())
+        service = ConversationService(max_history=1, compactor=compactor)
+        service.add_exchange('s1', 'a', 'b')
+        service.add_exchange('s1', 'c', 'd')
+        compactor.flush(timeout=5)
+        service.clear_session('s1')
+        
+        assert compactor.get('s1') is None
+        assert service.build_messages('s1') == []
+    
+    def test_summaries_are_shared_through_the_backend(self, tmp_path):
+        """Test a summary written by one worker is used by another."""
+        path = str(tmp_path / 'conversations.db')
+        compactor = ConversationCompactor(make_ollama())
+        worker_a = ConversationService(max_history=1, compactor=compactor,
+                                       backend=SQLiteConversationBackend(path))
+        worker_b = ConversationService(max_history=1, compactor=ConversationCompactor(make_ollama()),
+                                       backend=SQLiteConversationBackend(path))
+        worker_a.add_exchange('s1', 'a', 'b')
+        worker_a.add_exchange('s1', 'c', 'd')
+        compactor.flush(timeout=5)
+        worker_a.backend.flush(timeout=5)
+        
+        messages = worker_b.build_messages('s1')
+        assert messages[0] == {'role': 'system',
+                               'content': 'Summary of earlier conversation: They talked about the quarterly report.'}
+        
+        worker_b.clear_session('s1')
+        worker_b.backend.flush(timeout=5)
+        assert worker_a.backend.load_summary('s1') is None
+        worker_a.backend.close()
+        worker_b.backend.close()
@@ -1,4 +1,6 @@
 """Unit tests for ConversationService."""
+from unittest.mock import Mock
+
 import pytest
 from src.services.conversation_service import ConversationService
 
@@ -39,17 +41,33 @@ class TestConversationService:
         assert history[0]['assistant'] == "Hi there!"
     
     def test_max_history_limit(self):
-        """Test that history respects max limit."""
+        """Test that history respects max limit, trimming to half of it at once."""
         session_id = "test-session"
         
+        lengths = []
         for i in range(10):
             self.service.add_exchange(session_id, f"Message {i}", f"Response {i}")
+            lengths.append(len(self.service.get_history(session_id)))
         
+        # max_history is 5: history grows to 5, then drops to 2 and grows again
+        assert lengths == [1, 2, 3, 4, 5, 2, 3, 4, 5, 2]
         history = self.service.get_history(session_id)
-        assert len(history) == 5  # max_history is 5
-        assert history[0]['user'] == "Message 5"
+        assert history[0]['user'] == "Message 8"
         assert history[-1]['user'] == "Message 9"
     
+    def test_messages_stay_prefix_stable_between_trims(self):
+        """Test each request's messages extend the previous request's until the next trim."""
+        session_id = "test-session"
+        self.service.add_exchange(session_id, "Message 0", "Response 0")
+        self.service.add_exchange(session_id, "Message 1", "Response 1")
+        previous = self.service.build_messages(session_id)
+        
+        for i in range(2, 5):
+            self.service.add_exchange(session_id, f"Message {i}", f"Response {i}")
+            messages = self.service.build_messages(session_id)
+            assert messages[:len(previous)] == previous
+            previous = messages
+    
     def test_build_context(self):
         """Test building conversation context."""
         session_id = "test-session"
@@ -105,4 +123,65 @@ class TestConversationService:
     def test_get_token_estimate_no_session(self):
         """Test token estimation for non-existent session."""
         estimate = self.service.get_token_estimate("nonexistent")
-        assert estimate == 0
\ No newline at end of file
+        assert estimate == 0
+    
+    def test_running_token_total(self):
+        """Test the per-session token total is kept up to date as turns are added."""
+        session_id = "test-session"
+        self.service.add_exchange(session_id, "Hello there", "Hi, how can I help?")
+        first = self.service.get_token_total(session_id)
+        self.service.add_exchange(session_id, "Tell me more", "Sure.")
+        
+        history = self.service.get_history(session_id)
+        assert first == history[0]['tokens']
+        assert self.service.get_token_total(session_id) == sum(m['tokens'] for m in history)
+    
+    def test_add_exchange_accounts_incrementally(self):
+        """Test adding a turn touches only the new turn and the turns it trims."""
+        service = ConversationService(max_history=100)
+        session_id = "test-session"
+        for i in range(40):
+            service.add_exchange(session_id, f"Message {i}", f"Response {i}")
+        service._turn_tokens = Mock(wraps=service._turn_tokens)
+        
+        service.add_exchange(session_id, "One more", "Reply")
+        
+        assert service._turn_tokens.call_count == 1
+        assert service.get_token_total(session_id) == sum(m['tokens'] for m in service.get_history(session_id))
+        for i in range(60):
+            service.add_exchange(session_id, f"Later {i}", f"Reply {i}")
+        # The 101st turn trims to half of max_history
+        assert len(service.get_history(session_id)) == 50
+        assert service.get_token_total(session_id) == sum(m['tokens'] for m in service.get_history(session_id))
+    
+    def test_token_budget_trims_oldest_turns(self):
+        """Test that history is trimmed by size, not only by turn count."""
+        service = ConversationService(max_history=10, token_budget=100)
+        session_id = "test-session"
+        service.add_exchange(session_id, "short", "reply")
+        service.add_exchange(session_id, "x " * 150, "a pasted log")
+        service.add_exchange(session_id, "short again", "reply")
+        
+        history = service.get_history(session_id)
+        assert [m['user'] for m in history] == ["short again"]
+        assert service.get_token_total(session_id) <= 100
+    
+    def test_build_messages_packs_to_budget(self):
+        """Test that only the newest turns that fit the budget are sent."""
+        session_id = "test-session"
+        for i in range(3):
+            self.service.add_exchange(session_id, f"Question {i}", f"Answer {i}")
+        per_turn = self.service.get_history(session_id)[0]['tokens']
+        
+        messages = self.service.build_messages(session_id, "Next", budget=2 * per_turn + 10)
+        
+        assert [m['content'] for m in messages] == ["Question 1", "Answer 1", "Question 2", "Answer 2"]
+        assert len(self.service.build_messages(session_id)) == 6
+    
+    def test_context_budget(self):
+        """Test the budget leaves room for the reply and the system prompt."""
+        from src.services.conversation_service import context_budget
+        
+        assert context_budget(4096, 1024) == 3072
+        assert context_budget(4096, 1024, "Be concise") < 3072
+        assert context_budget(512, 1024) == 0
@@ -0,0 +1,69 @@
+"""Unit tests for the generation registry."""
+import pytest
+
+from src.services.generation_registry import GenerationRegistry
+
+
+class TestGenerationRegistry:
+    """Test cases for GenerationRegistry."""
+    
+    def test_track_completed_generation(self):
+        """Test that a normal run is counted as completed and unregistered."""
+        registry = GenerationRegistry()
+        
+        with registry.track('chat') as generation:
+            assert registry.get(generation.id) is generation
+        
+        stats = registry.get_stats()
+        assert registry.get(generation.id) is None
+        assert stats['started'] == 1
+        assert stats['completed'] == 1
+        assert stats['active'] == 0
+    
+    def test_cancel_sets_event(self):
+        """Test that cancel flags a running generation and rejects unknown ids."""
+        registry = GenerationRegistry()
+        generation = registry.start('chat')
+        
+        assert registry.cancel(generation.id) is True
+        assert generation.cancelled
+        assert registry.cancel('missing') is False
+    
+    def test_disconnect_closes_upstream_and_counts_waste(self):
+        """Test that closing the response generator closes the upstream stream."""
+        registry = GenerationRegistry()
+        closed = []
+        
+        def upstream():
+            try:
+                while True:
+                    yield {'response': 'x'}
+            finally:
+                closed.append(True)
+        
+        def response():
+            with registry.track('chat') as generation:
+                for chunk in generation.attach(upstream()):
+                    generation.tokens_received += 1
+                    yield chunk
+                    generation.tokens_delivered += 1
+        
+        stream = response()
+        next(stream)
+        next(stream)
+        stream.close()
+        
+        stats = registry.get_stats()
+        assert closed == [True]
+        assert stats['disconnected'] == 1
+        assert stats['wasted_tokens'] == 1
+    
+    def test_exception_counts_as_error(self):
+        """Test that an exception inside the block is recorded as an error."""
+        registry = GenerationRegistry()
+        
+        with pytest.raises(RuntimeError):
+            with registry.track('parse'):
+                raise RuntimeError('boom')
+        
+        assert registry.get_stats()['error'] == 1
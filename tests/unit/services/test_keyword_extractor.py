@@ -270,4 +270,16 @@ class TestKeywordExtractor:
         result = self.extractor._fallback_extraction(content, None)
         
         assert len(result['summary']) < len(content)
-        assert '...' in result['summary']
\ No newline at end of file
+        assert '...' in result['summary']
+    
+    def test_extract_email_info_falls_back_on_error_response(self):
+        """Test that an error result (e.g. open circuit) uses the fallback extraction."""
+        self.mock_ollama.generate.return_value = {
+            'error': 'Ollama is unavailable (circuit open)',
+            'circuit_open': True
+        }
+        
+        result = self.extractor.extract_email_info('Quarterly budget review meeting', 'Budget')
+        
+        assert result['importance'] == 'medium'
+        assert 'budget' in result['keywords']
@@ -0,0 +1,119 @@
+"""Unit tests for the persistent LLM response cache."""
+import time
+from unittest.mock import patch, MagicMock
+
+from src.services.llm_cache import LLMResponseCache
+from src.services.ollama_service import OllamaService
+
+
+class TestLLMResponseCache:
+    """Test cases for LLMResponseCache."""
+    
+    def test_put_and_get(self, tmp_path):
+        """Test a stored response is returned for the same key only."""
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'))
+        cache.put('phi3', 'prompt', {'temperature': 0.3}, {'response': 'cached'})
+        
+        assert cache.get('phi3', 'prompt', {'temperature': 0.3}) == {'response': 'cached'}
+        assert cache.get('phi3', 'prompt', {'temperature': 0.2}) is None
+        assert cache.get('gemma3', 'prompt', {'temperature': 0.3}) is None
+        
+        stats = cache.get_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['entries'] == 1
+    
+    def test_persists_across_instances(self, tmp_path):
+        """Test entries survive reopening the cache file."""
+        path = str(tmp_path / 'cache.db')
+        LLMResponseCache(path).put('phi3', 'prompt', None, {'response': 'kept'})
+        
+        reopened = LLMResponseCache(path)
+        assert reopened.get('phi3', 'prompt') == {'response': 'kept'}
+        assert reopened.get_stats()['bytes'] > 0
+    
+    def test_ttl_expiry(self, tmp_path):
+        """Test expired entries are treated as misses."""
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'), ttl_seconds=0.01)
+        cache.put('phi3', 'prompt', None, {'response': 'old'})
+        time.sleep(0.05)
+        
+        assert cache.get('phi3', 'prompt') is None
+        assert cache.get_stats()['entries'] == 0
+    
+    def test_lru_eviction_over_size_cap(self, tmp_path):
+        """Test least recently used entries are evicted past the byte cap."""
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'), max_bytes=100)
+        cache.put('m', 'a', None, {'response': 'x' * 30})
+        cache.put('m', 'b', None, {'response': 'y' * 30})
+        cache.get('m', 'a')  # 'a' becomes most recently used
+        cache.put('m', 'c', None, {'response': 'z' * 30})
+        
+        assert cache.get('m', 'a') is not None
+        assert cache.get('m', 'b') is None
+        assert cache.get('m', 'c') is not None
+        assert cache.get_stats()['bytes'] <= 100
+    
+    def test_expired_entries_are_swept_periodically(self, tmp_path):
+        """Test writes sweep expired entries in bulk once per interval, by index."""
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'), ttl_seconds=0.01, sweep_interval=0.2)
+        cache.put('m', 'a', None, {'response': 'a'})
+        time.sleep(0.05)
+        cache.put('m', 'b', None, {'response': 'b'})
+        assert cache.get_stats()['entries'] == 2
+        
+        time.sleep(0.2)
+        cache.put('m', 'c', None, {'response': 'c'})
+        
+        stats = cache.get_stats()
+        assert stats['entries'] == 1
+        assert stats['evictions'] == 2
+        plan = cache._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM llm_cache WHERE created_at < 0"
+        ).fetchall()
+        assert 'idx_llm_cache_created' in str(plan)
+    
+    def test_accepts_only_low_temperature(self, tmp_path):
+        """Test that only near-deterministic calls are cacheable."""
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'), max_temperature=0.3)
+        
+        assert cache.accepts({'temperature': 0.3})
+        assert not cache.accepts(None)
+        assert not cache.accepts({'num_predict': 100})
+        assert not cache.accepts({'temperature': 0.7})
+
+
+class TestOllamaServiceCaching:
+    """Test that OllamaService.generate uses the cache."""
+    
+    def setup_method(self):
+        """Set up a mocked upstream response."""
+        self.upstream = MagicMock()
+        self.upstream.json.return_value = {'response': '{"a": 1}', 'done': True}
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_repeat_call_served_from_cache(self, mock_post, tmp_path):
+        """Test the second identical call does not reach Ollama."""
+        mock_post.return_value = self.upstream
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'))
+        service = OllamaService('http://localhost:11434', 'phi3', cache=cache)
+        
+        first = service.generate('Extract', {'temperature': 0.3})
+        second = service.generate('Extract', {'temperature': 0.3})
+        
+        assert mock_post.call_count == 1
+        assert second['response'] == first['response']
+        assert second['cached'] is True
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_opt_out_and_errors_bypass_cache(self, mock_post, tmp_path):
+        """Test use_cache=False and error responses are never cached."""
+        mock_post.return_value = self.upstream
+        cache = LLMResponseCache(str(tmp_path / 'cache.db'))
+        service = OllamaService('http://localhost:11434', 'phi3', cache=cache)
+        
+        service.generate('Extract', {'temperature': 0.3}, use_cache=False)
+        service.generate('Extract', {'temperature': 0.3}, use_cache=False)
+        
+        assert mock_post.call_count == 2
+        assert cache.get_stats()['entries'] == 0
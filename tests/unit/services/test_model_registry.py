@@ -0,0 +1,76 @@
+"""Unit tests for the per-model service registry."""
+import threading
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from src.services.admission import AdmissionTimeout
+from src.services.model_registry import ModelRegistry
+
+
+class TestModelRegistry:
+    """Test cases for ModelRegistry."""
+    
+    def test_handles_are_per_model_and_share_plumbing(self):
+        """Test each model gets one handle and all handles share transport and pool."""
+        registry = ModelRegistry('http://localhost:11434')
+        
+        chat = registry.get('gemma3')
+        summarize = registry.get('phi3:mini')
+        
+        assert registry.get('gemma3') is chat
+        assert chat.model_name == 'gemma3'
+        assert summarize.model_name == 'phi3:mini'
+        assert chat.transport is summarize.transport
+        assert chat.backends is summarize.backends
+        assert chat.single_flight is summarize.single_flight
+        assert sorted(registry.models) == ['gemma3', 'phi3:mini']
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_model_options_apply_to_requests(self, mock_post):
+        """Test a model's configured options fill in what a call leaves unset."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'response': 'ok'}
+        mock_post.return_value = mock_response
+        registry = ModelRegistry('http://localhost:11434',
+                                 model_options={'phi3': {'num_ctx': 2048, 'temperature': 0.9}})
+        
+        registry.get('phi3').generate('Hi', options={'temperature': 0.3})
+        
+        payload = mock_post.call_args[1]['json']
+        assert payload['model'] == 'phi3'
+        assert payload['options'] == {'temperature': 0.3, 'num_ctx': 2048}
+    
+    def test_concurrency_budget_is_per_model(self):
+        """Test a busy model times out without blocking other models."""
+        registry = ModelRegistry('http://localhost:11434', model_concurrency={'phi3': 1},
+                                 admission_timeout=0.05)
+        phi3 = registry.get('phi3')
+        
+        with phi3._admit('query'):
+            assert registry.get_stats()['phi3']['active'] == 1
+            with pytest.raises(AdmissionTimeout):
+                with phi3._admit('query'):
+                    pass
+            # Other models have their own budget
+            with registry.get('gemma3')._admit('query'):
+                pass
+        
+        assert registry.get_stats()['phi3']['active'] == 0
+    
+    def test_concurrent_models_keep_their_names(self):
+        """Test that handles used from many threads never switch models."""
+        registry = ModelRegistry('http://localhost:11434')
+        seen = []
+        
+        def worker(name):
+            for _ in range(50):
+                seen.append((name, registry.get(name).model_name))
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in ('gemma3', 'phi3:mini')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert all(name == model for name, model in seen)
@@ -0,0 +1,67 @@
+"""Unit tests for ModelWarmer."""
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from src.services.model_warmup import ModelWarmer
+from src.services.ollama_backends import BackendPool
+from src.services.ollama_service import OllamaService
+
+
+class TestModelWarmer:
+    """Test cases for ModelWarmer."""
+    
+    def setup_method(self):
+        """Set up a two-backend service and warmer."""
+        pool = BackendPool(['http://a:11434', 'http://b:11434'])
+        self.service = OllamaService('http://a:11434', 'gemma3', backends=pool)
+        self.warmer = ModelWarmer(
+            self.service,
+            [('gemma3', 'generate'), ('nomic-embed-text', 'embed')],
+            keep_alive='1h'
+        )
+    
+    @patch('src.services.ollama_transport.OllamaTransport.get')
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_warm_all_reports_load_latency(self, mock_post, mock_get):
+        """Test each model is warmed on each backend with keep_alive."""
+        warm_response = MagicMock()
+        warm_response.json.return_value = {'done': True, 'load_duration': 2_500_000_000}
+        mock_post.return_value = warm_response
+        ps_response = MagicMock(status_code=200)
+        ps_response.json.return_value = {'models': [{'name': 'gemma3:latest'}]}
+        mock_get.return_value = ps_response
+        
+        report = self.warmer.warm_all()
+        
+        assert len(report) == 4
+        gemma = report['http://a:11434|gemma3']
+        assert gemma['status'] == 'ok'
+        assert gemma['load_ms'] == 2500.0
+        assert gemma['loaded'] is True
+        assert report['http://b:11434|nomic-embed-text']['loaded'] is False
+        
+        urls = [call.args[0] for call in mock_post.call_args_list]
+        assert 'http://a:11434/api/generate' in urls
+        assert 'http://b:11434/api/embed' in urls
+        assert all(call.kwargs['json']['keep_alive'] == '1h' for call in mock_post.call_args_list)
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_warm_failure_recorded(self, mock_post):
+        """Test a failed warm-up is reported rather than raised."""
+        mock_post.side_effect = requests.exceptions.ConnectionError('down')
+        
+        result = self.warmer.warm_model('http://a:11434', 'gemma3')
+        
+        assert result['status'] == 'error'
+        assert result['loaded'] is False
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_service_pins_keep_alive(self, mock_post):
+        """Test generate requests carry the configured keep_alive."""
+        mock_post.return_value = MagicMock(**{'json.return_value': {'response': 'ok'}})
+        service = OllamaService('http://a:11434', 'gemma3', keep_alive='30m')
+        
+        service.generate('Hi', use_cache=False)
+        
+        assert mock_post.call_args.kwargs['json']['keep_alive'] == '30m'
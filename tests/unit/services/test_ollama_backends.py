@@ -0,0 +1,133 @@
+"""Unit tests for the Ollama backend pool."""
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+import requests
+
+from src.services.ollama_backends import BackendPool
+from src.services.ollama_service import OllamaService
+
+
+class TestBackendPool:
+    """Test cases for BackendPool routing and ejection."""
+    
+    def setup_method(self):
+        """Set up a two-backend pool."""
+        self.pool = BackendPool(['http://a:11434', 'http://b:11434/'],
+                                failure_threshold=2, base_backoff=0.05)
+        self.a, self.b = self.pool.backends
+    
+    def test_requires_backends(self):
+        """Test that an empty pool is rejected."""
+        with pytest.raises(ValueError):
+            BackendPool([])
+    
+    def test_least_outstanding_routing(self):
+        """Test calls go to the backend with fewest in-flight requests."""
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        
+        assert {first.url, second.url} == {'http://a:11434', 'http://b:11434'}
+        self.pool.release(first)
+        assert self.pool.acquire() is first
+    
+    def test_prefers_backend_with_model(self):
+        """Test routing skips backends that do not have the model."""
+        self.pool.record_health(self.a, True, ['llama2'])
+        self.pool.record_health(self.b, True, ['phi3:latest'])
+        
+        for _ in range(3):
+            assert self.pool.acquire('phi3') is self.b
+    
+    def test_ejection_and_readmission(self):
+        """Test a failing backend is ejected then re-admitted after backoff."""
+        for _ in range(2):
+            self.a.outstanding += 1
+            self.pool.release(self.a, success=False)
+        
+        assert self.a.ejected
+        assert all(self.pool.acquire() is self.b for _ in range(3))
+        
+        time.sleep(0.06)
+        assert not self.a.ejected
+        self.pool.record_health(self.a, True)
+        assert self.a.backoff == 0.0
+    
+    def test_health_success_does_not_cut_backoff_short(self):
+        """Test a healthy probe during backoff keeps the backend ejected."""
+        for _ in range(2):
+            self.a.outstanding += 1
+            self.pool.release(self.a, success=False)
+        
+        self.pool.record_health(self.a, True)
+        assert self.a.ejected
+    
+    def test_all_ejected_still_routes(self):
+        """Test that a request is still routed when every backend is ejected."""
+        for backend in self.pool.backends:
+            for _ in range(2):
+                backend.outstanding += 1
+                self.pool.release(backend, success=False)
+        
+        assert self.pool.acquire() in self.pool.backends
+
+
+class TestOllamaServiceRouting:
+    """Test OllamaService integration with the backend pool."""
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_generate_fails_over_after_ejection(self, mock_post):
+        """Test generate stops using a backend that keeps failing."""
+        pool = BackendPool(['http://a:11434', 'http://b:11434'], failure_threshold=1, base_backoff=60)
+        service = OllamaService('http://a:11434', 'phi3', backends=pool)
+        
+        ok = MagicMock()
+        ok.json.return_value = {'response': 'ok'}
+        
+        def post(url, **kwargs):
+            if url.startswith('http://a'):
+                raise requests.exceptions.ConnectionError('down')
+            return ok
+        mock_post.side_effect = post
+        
+        results = [service.generate(f'prompt {i}', use_cache=False) for i in range(4)]
+        
+        assert pool.backends[0].ejected
+        assert sum(1 for r in results if 'error' in r) == 1
+    
+    @patch('src.services.ollama_transport.OllamaTransport.get')
+    def test_check_health_aggregates_backends(self, mock_get):
+        """Test health reports models across all healthy backends."""
+        pool = BackendPool(['http://a:11434', 'http://b:11434'])
+        service = OllamaService('http://a:11434', 'phi3', backends=pool)
+        
+        def get(url, **kwargs):
+            if url.startswith('http://a'):
+                raise requests.exceptions.ConnectionError('down')
+            response = MagicMock(status_code=200)
+            response.json.return_value = {'models': [{'name': 'phi3'}]}
+            return response
+        mock_get.side_effect = get
+        
+        result = service.check_health()
+        
+        assert result['status'] == 'connected'
+        assert result['model_available'] is True
+        assert result['backends_healthy'] == 1
+        assert result['backends_total'] == 2
+    
+    def test_session_affinity_sticks_to_backend(self):
+        """Test calls with the same affinity key stay on one backend while it is healthy."""
+        pool = BackendPool(['http://a', 'http://b'], failure_threshold=1)
+        first = pool.acquire('phi3', affinity='session-1')
+        # The other backend is now less loaded, but the session stays put
+        second = pool.acquire('phi3', affinity='session-1')
+        
+        assert second is first
+        
+        pool.release(first, success=False)
+        pool.release(second, success=True)
+        third = pool.acquire('phi3', affinity='session-1')
+        
+        assert third is not first
@@ -16,7 +16,7 @@ class TestOllamaService:
         self.model_name = "gemma3:12b-it-qat"
         self.service = OllamaService(self.base_url, self.model_name)
     
-    @patch('src.services.ollama_service.requests.get')
+    @patch('src.services.ollama_transport.OllamaTransport.get')
     def test_check_health_success(self, mock_get):
         """Test successful health check."""
         mock_response = MagicMock()
@@ -36,7 +36,7 @@ class TestOllamaService:
         assert 'gemma3:12b-it-qat' in result['models']
         mock_get.assert_called_once_with(f"{self.base_url}/api/tags", timeout=2)
     
-    @patch('src.services.ollama_service.requests.get')
+    @patch('src.services.ollama_transport.OllamaTransport.get')
     def test_check_health_model_not_available(self, mock_get):
         """Test health check when model is not available."""
         mock_response = MagicMock()
@@ -51,7 +51,7 @@ class TestOllamaService:
         assert result['status'] == 'connected'
         assert result['model_available'] is False
     
-    @patch('src.services.ollama_service.requests.get')
+    @patch('src.services.ollama_transport.OllamaTransport.get')
     def test_check_health_connection_error(self, mock_get):
         """Test health check with connection error."""
         mock_get.side_effect = requests.exceptions.ConnectionError("Connection failed")
@@ -61,7 +61,7 @@ class TestOllamaService:
         assert result['status'] == 'disconnected'
         assert 'message' in result
     
-    @patch('src.services.ollama_service.requests.post')
+    @patch('src.services.ollama_transport.OllamaTransport.post')
     def test_generate_stream_success(self, mock_post):
         """Test successful streaming generation."""
         mock_response = MagicMock()
@@ -83,7 +83,7 @@ class TestOllamaService:
         assert responses[2]['response'] == '!'
         assert responses[2]['done'] is True
     
-    @patch('src.services.ollama_service.requests.post')
+    @patch('src.services.ollama_transport.OllamaTransport.post')
     def test_generate_stream_with_system_prompt(self, mock_post):
         """Test streaming generation with system prompt."""
         mock_response = MagicMock()
@@ -106,7 +106,7 @@ class TestOllamaService:
         assert payload['messages'][1]['role'] == 'user'
         assert payload['messages'][1]['content'] == 'Test'
     
-    @patch('src.services.ollama_service.requests.post')
+    @patch('src.services.ollama_transport.OllamaTransport.post')
     def test_generate_stream_error_handling(self, mock_post):
         """Test error handling in streaming generation."""
         mock_post.side_effect = requests.exceptions.RequestException("API Error")
@@ -117,7 +117,7 @@ class TestOllamaService:
         assert 'error' in responses[0]
         assert responses[0]['done'] is True
     
-    @patch('src.services.ollama_service.requests.post')
+    @patch('src.services.ollama_transport.OllamaTransport.post')
     def test_generate_non_streaming(self, mock_post):
         """Test non-streaming generation."""
         mock_response = MagicMock()
@@ -138,4 +138,81 @@ class TestOllamaService:
         assert payload['model'] == self.model_name
         assert payload['prompt'] == 'Test prompt'
         assert payload['stream'] is False
-        assert payload['options']['temperature'] == 0.7
\ No newline at end of file
+        assert payload['options']['temperature'] == 0.7
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_generate_stream_close_releases_upstream(self, mock_post):
+        """Test closing the stream early exits the upstream response and frees the backend."""
+        mock_response = MagicMock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.iter_lines.return_value = iter([
+            json.dumps({'message': {'content': 'Hello'}, 'done': False}).encode(),
+            json.dumps({'message': {'content': ' world'}, 'done': False}).encode()
+        ])
+        mock_response.__enter__ = MagicMock(return_value=mock_response)
+        mock_response.__exit__ = MagicMock(return_value=None)
+        mock_post.return_value = mock_response
+        
+        stream = self.service.generate_stream("Test prompt")
+        next(stream)
+        stream.close()
+        
+        mock_response.__exit__.assert_called_once()
+        backend = self.service.backends.backends[0]
+        assert backend.outstanding == 0
+        assert backend.errors == 0
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_generate_applies_deadline(self, mock_post):
+        """Test the configured read deadline is passed to the transport."""
+        mock_post.return_value.json.return_value = {'response': 'ok'}
+        service = OllamaService(self.base_url, self.model_name, generate_timeout=30)
+        
+        service.generate('Test', use_cache=False)
+        
+        assert mock_post.call_args[1]['timeout'] == (5.0, 30)
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_generate_fails_fast_when_circuit_open(self, mock_post):
+        """Test repeated failures open the circuit and later calls skip Ollama."""
+        from src.services.resilience import CircuitBreaker
+        mock_post.side_effect = requests.exceptions.ReadTimeout('stalled')
+        service = OllamaService(self.base_url, self.model_name,
+                                breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        
+        service.generate('a')
+        service.generate('b')
+        result = service.generate('c')
+        
+        assert result['circuit_open'] is True
+        assert mock_post.call_count == 2
+    
+    def test_generate_hedges_slow_short_prompts(self):
+        """Test a slow primary is raced by a second backend after the p95 delay."""
+        import threading
+        from src.services.ollama_backends import BackendPool
+        
+        release = threading.Event()
+        
+        def post(url, **kwargs):
+            response = MagicMock()
+            if url.startswith('http://slow'):
+                release.wait(2)
+                response.json.return_value = {'response': 'slow'}
+            else:
+                response.json.return_value = {'response': 'fast'}
+            return response
+        
+        transport = MagicMock()
+        transport.post.side_effect = post
+        service = OllamaService(self.base_url, self.model_name, transport=transport,
+                                backends=BackendPool(['http://slow:11434', 'http://fast:11434']),
+                                hedge_max_prompt_chars=100, hedge_min_samples=1)
+        service.latency.record(0.01)
+        
+        result = service.generate('short', use_cache=False)
+        release.set()
+        
+        assert result['response'] == 'fast'
+        assert service.get_stats()['hedges'] == 1
+        assert service.get_stats()['hedge_wins'] == 1
@@ -0,0 +1,89 @@
+"""Unit tests for OllamaTransport."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.services.ollama_transport import OllamaTransport
+
+
+class _TagsHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive HTTP handler returning an empty model list."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'models': []}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    """Run a throwaway HTTP server on an ephemeral port."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _TagsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestOllamaTransport:
+    """Test cases for OllamaTransport."""
+
+    def test_default_timeouts_applied(self):
+        """Test that connect/read timeouts come from the constructor."""
+        transport = OllamaTransport(connect_timeout=1.5, read_timeout=30)
+        assert transport.timeout == (1.5, 30)
+
+    def test_sessions_share_adapter_across_threads(self):
+        """Test that per-thread sessions mount the same connection pool."""
+        transport = OllamaTransport(pool_size=4)
+        sessions = []
+
+        def grab():
+            sessions.append(transport.session)
+
+        thread = threading.Thread(target=grab)
+        thread.start()
+        thread.join()
+        sessions.append(transport.session)
+
+        assert sessions[0] is not sessions[1]
+        assert sessions[0].get_adapter('http://x') is sessions[1].get_adapter('http://x')
+
+    def test_keep_alive_disabled_sends_connection_close(self):
+        """Test that disabling keep-alive sets the Connection header."""
+        transport = OllamaTransport(keep_alive=False)
+        assert transport.session.headers['Connection'] == 'close'
+
+    def test_connections_are_reused(self, local_server):
+        """Test that sequential requests reuse one pooled connection."""
+        transport = OllamaTransport(pool_size=2)
+
+        for _ in range(5):
+            response = transport.get(f"{local_server}/api/tags")
+            assert response.json() == {'models': []}
+
+        stats = transport.get_stats()
+        assert stats['requests'] == 5
+        assert stats['connections_opened'] == 1
+        assert stats['connections_reused'] == 4
+        transport.close()
+
+    def test_errors_are_counted(self):
+        """Test that failed requests increment the error counter."""
+        transport = OllamaTransport(connect_timeout=0.5, read_timeout=0.5)
+
+        with pytest.raises(requests.exceptions.RequestException):
+            transport.get("http://127.0.0.1:1/api/tags")
+
+        assert transport.get_stats()['errors'] == 1
@@ -0,0 +1,71 @@
+"""Unit tests for the circuit breaker and latency window."""
+import time
+
+from src.services.resilience import CircuitBreaker, LatencyWindow
+
+
+class TestCircuitBreaker:
+    """Test cases for CircuitBreaker."""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit opens at the threshold and rejects calls."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        
+        assert breaker.state == 'open'
+        assert not breaker.allow()
+        assert breaker.get_stats()['rejected'] == 1
+    
+    def test_success_resets_failure_count(self):
+        """Test a success between failures keeps the circuit closed."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == 'closed'
+    
+    def test_half_open_trial(self):
+        """Test one trial is allowed after the reset timeout and decides the state."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        
+        assert breaker.allow()
+        assert breaker.state == 'half_open'
+        assert not breaker.allow()
+        
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        
+        time.sleep(0.02)
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == 'closed'
+
+
+class TestLatencyWindow:
+    """Test cases for LatencyWindow."""
+    
+    def test_percentile(self):
+        """Test percentiles over the recorded samples."""
+        window = LatencyWindow(size=100)
+        assert window.percentile(0.95) is None
+        
+        for ms in range(1, 101):
+            window.record(ms / 1000)
+        
+        assert len(window) == 100
+        assert window.percentile(0.95) == 0.095
+    
+    def test_window_is_bounded(self):
+        """Test old samples fall out of the window."""
+        window = LatencyWindow(size=3)
+        for value in (10.0, 1.0, 1.0, 1.0):
+            window.record(value)
+        
+        assert window.percentile(1.0) == 1.0
@@ -0,0 +1,138 @@
+"""Unit tests for the semantic answer cache."""
+from unittest.mock import Mock
+
+from src.services.semantic_cache import SemanticCache, replay_frames, replay_tokens
+from src.utils.stream_framing import TokenFramer
+
+VECTORS = {
+    'What is the capital of France?': [1.0, 0.0, 0.0],
+    "What's the capital of France?": [0.99, 0.1, 0.0],
+    'How tall is Everest?': [0.0, 1.0, 0.0],
+}
+
+
+def make_cache(**kwargs):
+    embed = Mock(side_effect=lambda text, **kwargs: VECTORS.get(text))
+    return SemanticCache(embed, threshold=0.95, **kwargs), embed
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache."""
+    
+    def test_similar_prompt_hits(self):
+        """Test a paraphrase above the threshold reuses the stored answer."""
+        cache, _ = make_cache()
+        ns = cache.namespace('chat', 'gemma', 'Be brief.')
+        
+        miss = cache.lookup(ns, 'What is the capital of France?')
+        cache.store(miss, 'Paris.')
+        hit = cache.lookup(ns, "What's the capital of France?")
+        
+        assert not miss.hit
+        assert hit.hit and hit.response == 'Paris.'
+        assert 0.95 <= hit.similarity < 1.0
+        assert not cache.lookup(ns, 'How tall is Everest?').hit
+    
+    def test_exact_prompt_skips_embedding(self):
+        """Test a repeated prompt matches by hash without another embedding call."""
+        cache, embed = make_cache()
+        ns = cache.namespace('parse', 'gemma', None)
+        cache.store(cache.lookup(ns, 'What is the capital of France?'), 'Paris.')
+        
+        hit = cache.lookup(ns, 'What is the capital of France?')
+        
+        assert hit.hit and hit.similarity == 1.0
+        assert embed.call_count == 1
+        assert cache.get_stats()['exact_hits'] == 1
+    
+    def test_namespaces_are_isolated(self):
+        """Test a different system prompt or options never reuses an answer."""
+        cache, _ = make_cache()
+        cache.store(cache.lookup(cache.namespace('chat', 'gemma', 'Be brief.'),
+                                 'What is the capital of France?'), 'Paris.')
+        
+        assert not cache.lookup(cache.namespace('chat', 'gemma', 'Be verbose.'),
+                                'What is the capital of France?').hit
+        assert not cache.lookup(cache.namespace('chat', 'gemma', 'Be brief.', {'temperature': 0}),
+                                'What is the capital of France?').hit
+    
+    def test_embedding_failure_is_a_miss(self):
+        """Test prompts that cannot be embedded are neither served nor stored."""
+        cache, _ = make_cache()
+        ns = cache.namespace('chat', 'gemma', None)
+        
+        lookup = cache.lookup(ns, 'unknown prompt')
+        cache.store(lookup, 'answer')
+        
+        assert not lookup.hit
+        assert cache.get_stats()['entries'] == 0
+        assert cache.get_stats()['embed_errors'] == 1
+        assert cache.lookup(ns, 'x' * 10000) is None
+    
+    def test_lru_and_ttl_eviction(self):
+        """Test entries beyond max_entries or older than the TTL are dropped."""
+        cache, _ = make_cache(max_entries=1)
+        ns = cache.namespace('chat', 'gemma', None)
+        cache.store(cache.lookup(ns, 'What is the capital of France?'), 'Paris.')
+        cache.store(cache.lookup(ns, 'How tall is Everest?'), '8849 m.')
+        
+        assert cache.get_stats()['entries'] == 1
+        assert not cache.lookup(ns, "What's the capital of France?").hit
+        
+        cache.ttl_seconds = -1
+        assert not cache.lookup(ns, 'How tall is Everest?').hit
+        assert cache.get_stats()['expired'] == 1
+    
+    def test_stats_report_similarity_distribution(self):
+        """Test hit rate and the histogram of best-match similarity."""
+        cache, _ = make_cache()
+        ns = cache.namespace('chat', 'gemma', None)
+        cache.store(cache.lookup(ns, 'What is the capital of France?'), 'Paris.')
+        cache.lookup(ns, "What's the capital of France?")
+        cache.lookup(ns, 'How tall is Everest?')
+        
+        stats = cache.get_stats()
+        
+        assert stats['lookups'] == 3 and stats['hits'] == 1
+        assert stats['hit_rate'] == 0.333
+        assert stats['similarity'] == {'<0.5': 2, '>=0.99': 1}
+    
+    def test_replay_preserves_text(self):
+        """Test replayed frames reassemble to the cached answer."""
+        text = 'Paris is  the capital.\nIt is large. '
+        framer = TokenFramer('token')
+        
+        frames = list(replay_frames(framer, text))
+        
+        assert ''.join(replay_tokens(text)) == text
+        assert framer.text == text
+        assert len(frames) == len(replay_tokens(text))
+
+
+class TestCacheEmbeddingPriority:
+    """Test cases for embedding prompts on the request path."""
+    
+    def test_lookup_embeds_at_caller_priority(self):
+        """Test lookups pass the caller's priority and the short embed timeout."""
+        cache, embed = make_cache(embed_timeout=0.2)
+        
+        cache.lookup(cache.namespace('chat', 'gemma', None), 'How tall is Everest?', priority='query')
+        
+        embed.assert_called_once_with('How tall is Everest?', priority='query', timeout=0.2)
+    
+    def test_admission_timeout_is_a_miss(self):
+        """Test a prompt that cannot get an interactive slot in time falls through to generation."""
+        from src.services.admission import AdmissionScheduler
+        from src.services.ollama_embeddings import OllamaEmbeddingFunction
+        scheduler = AdmissionScheduler(max_concurrency=1, interactive_reserved=0)
+        transport = Mock()
+        embeddings = OllamaEmbeddingFunction('http://ollama', transport=transport, scheduler=scheduler)
+        cache = SemanticCache(embeddings.embed, embed_timeout=0.05)
+        
+        scheduler.acquire('interactive')
+        lookup = cache.lookup(cache.namespace('chat', 'gemma', None), 'How tall is Everest?')
+        
+        assert not lookup.hit
+        transport.post.assert_not_called()
+        assert cache.get_stats()['embed_errors'] == 1
+        assert scheduler.get_stats()['classes']['interactive']['timeouts'] == 1
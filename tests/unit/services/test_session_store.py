@@ -0,0 +1,84 @@
+"""Unit tests for the bounded session store."""
+import time
+
+from src.services.conversation_service import ConversationService
+from src.services.session_store import SessionStore, Turn
+
+
+class TestSessionStore:
+    """Test cases for SessionStore."""
+    
+    def test_turns_are_compact_and_dict_compatible(self):
+        """Test turns use slots but still read like the old dict records."""
+        turn = Turn('Hi', 'Hello', 3)
+        
+        assert not hasattr(turn, '__dict__')
+        assert turn['user'] == 'Hi'
+        assert turn == {'user': 'Hi', 'assistant': 'Hello'}
+        assert turn.to_dict() == {'user': 'Hi', 'assistant': 'Hello', 'tokens': 3}
+    
+    def test_lru_eviction_by_count(self):
+        """Test the least recently used session goes first."""
+        evicted = []
+        store = SessionStore(max_sessions=2, on_evict=lambda sid, turns: evicted.append(sid))
+        store['a'] = []
+        store['b'] = []
+        store['a']  # touch
+        store['c'] = []
+        
+        assert evicted == ['b']
+        assert 'a' in store and 'c' in store
+        assert store.get_stats()['evicted'] == 1
+    
+    def test_eviction_by_bytes(self):
+        """Test the byte cap bounds memory regardless of session count."""
+        store = SessionStore(max_sessions=100, max_bytes=20000)
+        for i in range(10):
+            store.append(f"s{i}", Turn('x' * 4000, 'y'))
+        
+        stats = store.get_stats()
+        assert stats['bytes'] <= 20000
+        assert stats['sessions'] < 10
+        assert 's9' in store
+    
+    def test_idle_sessions_expire(self):
+        """Test sessions idle past the TTL are dropped."""
+        store = SessionStore(idle_ttl=0.01)
+        store['old'] = [Turn('a', 'b')]
+        time.sleep(0.02)
+        store['new'] = []
+        
+        assert 'old' not in store
+        assert store.get_stats()['expired'] == 1
+    
+    def test_byte_accounting_follows_writes(self):
+        """Test live bytes track appends, replacement and deletion."""
+        store = SessionStore()
+        store.append('s', Turn('hello', 'world'))
+        after_append = store.get_stats()['bytes']
+        store['s'] = []
+        after_clear = store.get_stats()['bytes']
+        del store['s']
+        
+        assert after_append > after_clear > 0
+        assert store.get_stats()['bytes'] == 0
+    
+    def test_conversation_service_forgets_evicted_sessions(self):
+        """Test evicted sessions also drop their running token totals."""
+        service = ConversationService(store=SessionStore(max_sessions=1))
+        service.add_exchange('first', 'Hello', 'Hi')
+        service.add_exchange('second', 'Hello', 'Hi')
+        
+        assert 'first' not in service.conversations
+        assert 'first' not in service.token_totals
+        assert service.get_history('second')[0]['user'] == 'Hello'
+    
+    def test_oversized_session_is_not_evicted_by_its_own_write(self):
+        """Test a session over max_bytes on its own survives the write that grew it."""
+        service = ConversationService(store=SessionStore(max_bytes=1))
+        service.add_exchange('other', 'Hello', 'Hi')
+        service.add_exchange('big', 'x' * 1000, 'y' * 1000)
+        
+        assert list(service.conversations) == ['big']
+        assert set(service.token_totals) == {'big'}
+        assert service.get_history('big')[0]['user'] == 'x' * 1000
@@ -0,0 +1,79 @@
+"""Unit tests for SingleFlight request coalescing."""
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from src.services.ollama_service import OllamaService
+from src.services.single_flight import SingleFlight, request_key
+
+
+class TestSingleFlight:
+    """Test cases for SingleFlight."""
+    
+    def test_request_key_is_order_independent(self):
+        """Test that option ordering does not change the key."""
+        key1 = request_key('phi3', 'prompt', {'a': 1, 'b': 2})
+        key2 = request_key('phi3', 'prompt', {'b': 2, 'a': 1})
+        
+        assert key1 == key2
+        assert key1 != request_key('gemma3', 'prompt', {'a': 1, 'b': 2})
+    
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that identical concurrent calls run the function once."""
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+        
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return {'response': 'ok'}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.get_stats()['hits'] < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert all(result == {'response': 'ok'} for result, _ in results)
+        assert sum(1 for _, shared in results if shared) == 4
+        assert flight.get_stats() == {'hits': 4, 'misses': 1, 'in_flight': 0}
+    
+    def test_errors_propagate_and_clear(self):
+        """Test that a failing call raises and does not stay in flight."""
+        flight = SingleFlight()
+        
+        with pytest.raises(RuntimeError):
+            flight.do('k', MagicMock(side_effect=RuntimeError('boom')))
+        
+        result, shared = flight.do('k', lambda: 42)
+        assert result == 42
+        assert shared is False
+
+
+class TestOllamaServiceCoalescing:
+    """Test that OllamaService.generate coalesces identical prompts."""
+    
+    @patch('src.services.ollama_transport.OllamaTransport.post')
+    def test_sequential_calls_are_not_coalesced(self, mock_post):
+        """Test that calls only coalesce while the first is in flight."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'response': 'Hi', 'done': True}
+        mock_post.return_value = mock_response
+        service = OllamaService('http://localhost:11434', 'phi3')
+        
+        service.generate('Same prompt')
+        service.generate('Same prompt')
+        
+        assert mock_post.call_count == 2
+        assert service.single_flight.get_stats()['misses'] == 2
@@ -0,0 +1,76 @@
+"""Unit tests for resumable stream buffers."""
+import threading
+import time
+
+import pytest
+
+from src.services.generation_registry import GenerationRegistry
+from src.services.stream_buffer import OffsetExpired, StreamBuffer, run_detached
+
+
+class TestStreamBuffer:
+    """Test cases for StreamBuffer."""
+    
+    def test_reader_tails_producer(self):
+        """Test a reader receives frames as they are produced until close."""
+        buffer = StreamBuffer()
+        
+        def produce():
+            for i in range(3):
+                time.sleep(0.01)
+                buffer.append(b'%d\n' % i)
+            buffer.close()
+        
+        threading.Thread(target=produce).start()
+        assert list(buffer.read(0)) == [b'0\n', b'1\n', b'2\n']
+    
+    def test_resume_from_offset(self):
+        """Test a reconnecting reader only gets frames it has not seen."""
+        buffer = StreamBuffer()
+        for i in range(5):
+            buffer.append(b'%d' % i)
+        buffer.close()
+        
+        assert list(buffer.read(3)) == [b'3', b'4']
+        assert list(buffer.read(5)) == []
+    
+    def test_ring_drops_oldest_frames(self):
+        """Test offsets older than the capacity can no longer be read."""
+        buffer = StreamBuffer(capacity=2)
+        for i in range(4):
+            buffer.append(b'%d' % i)
+        buffer.close()
+        
+        with pytest.raises(OffsetExpired):
+            buffer.check_offset(1)
+        with pytest.raises(ValueError):
+            buffer.check_offset(5)
+        assert list(buffer.read(2)) == [b'2', b'3']
+    
+    def test_abandoned_stream_is_cancelled(self):
+        """Test nobody reading for the grace period triggers on_abandon."""
+        buffer = StreamBuffer()
+        abandoned = threading.Event()
+        
+        def frames():
+            for i in range(20):
+                time.sleep(0.01)
+                yield b'x'
+        
+        thread = run_detached(frames(), buffer, threading.Lock, abandoned.set, abandon_after=0.05)
+        thread.join(5)
+        
+        assert abandoned.is_set()
+        assert buffer.closed
+    
+    def test_registry_expires_finished_buffers(self):
+        """Test buffers are dropped once their TTL passes after completion."""
+        registry = GenerationRegistry(buffer_ttl=0.01)
+        buffer = StreamBuffer()
+        with registry.track('parse', buffer) as generation:
+            pass
+        buffer.close()
+        
+        assert registry.get_buffer(generation.id) is buffer
+        time.sleep(0.02)
+        assert registry.get_buffer(generation.id) is None
@@ -0,0 +1,157 @@
+"""Unit tests for incremental document token counting."""
+import random
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from src.services.token_documents import TokenDocumentStore, split_chunks
+from src.utils.token_counter import TokenCounter
+
+
+def document_text(lines=2000):
+    rng = random.Random(1)
+    words = ['alpha', 'beta', 'gamma,', 'delta.', 'epsilon', '(zeta)']
+    return '\n'.join(' '.join(rng.choice(words) for _ in range(12)) for _ in range(lines))
+
+
+class TestTokenDocumentStore:
+    """Test cases for TokenDocumentStore."""
+    
+    def test_split_chunks_prefers_newlines(self):
+        """Test chunks are bounded and cover the whole text."""
+        text = document_text()
+        chunks = split_chunks(text, 1000)
+        
+        assert ''.join(chunks) == text
+        assert all(len(c) <= 1000 for c in chunks)
+        assert all(c.endswith('\n') for c in chunks[:-1])
+    
+    def test_edits_match_full_recount(self):
+        """Test edited totals agree with a from-scratch count up to per-chunk rounding."""
+        store = TokenDocumentStore(TokenCounter(cache_size=0))
+        text = document_text()
+        store.set('doc', text)
+        
+        rng = random.Random(2)
+        for _ in range(200):
+            start = rng.randint(0, len(text))
+            end = min(len(text), start + rng.randint(0, 50))
+            insert = rng.choice(['', 'x', 'new words here. ', '\n' * 3])
+            text = text[:start] + insert + text[end:]
+            total = store.apply('doc', [{'start': start, 'end': end, 'text': insert}], len(text))
+        
+        fresh = TokenDocumentStore(TokenCounter(cache_size=0)).set('check', text)
+        assert abs(total - fresh) <= len(split_chunks(text))
+    
+    def test_edit_recounts_only_touched_chunks(self):
+        """Test a one-character edit does not rescan the document."""
+        counter = TokenCounter(cache_size=0)
+        store = TokenDocumentStore(counter)
+        text = document_text()
+        store.set('doc', text)
+        counter.count = Mock(wraps=counter.count)
+        
+        store.apply('doc', [{'start': 10, 'end': 10, 'text': 'x'}], len(text) + 1)
+        
+        assert sum(len(call.args[0]) for call in counter.count.call_args_list) < 5000
+    
+    def test_unknown_or_mismatched_document_needs_resync(self):
+        """Test out-of-sync clients are told to resend the text."""
+        store = TokenDocumentStore()
+        with pytest.raises(KeyError):
+            store.apply('missing', [{'start': 0, 'end': 0, 'text': 'a'}])
+        
+        store.set('doc', 'hello')
+        with pytest.raises(ValueError):
+            store.apply('doc', [{'start': 0, 'end': 0, 'text': 'a'}], length=99)
+        with pytest.raises(KeyError):
+            store.apply('doc', [])
+        assert store.get_stats()['chars'] == 0
+    
+    def test_documents_are_bounded(self):
+        """Test least recently used documents are dropped."""
+        store = TokenDocumentStore(max_documents=2)
+        for name in ('a', 'b', 'c'):
+            store.set(name, 'text')
+        
+        assert store.get_stats()['documents'] == 2
+        with pytest.raises(KeyError):
+            store.apply('a', [])
+    
+    def test_prefix_counted_once(self):
+        """Test the system prompt framing is counted once per prompt."""
+        counter = TokenCounter()
+        store = TokenDocumentStore(counter)
+        counter.count = Mock(wraps=counter.count)
+        
+        first = store.prefix_tokens('You are helpful.')
+        second = store.prefix_tokens('You are helpful.')
+        
+        assert first == second > 0
+        assert counter.count.call_count == 1
+        assert store.prefix_tokens('') == 0
+    
+    def test_non_bmp_draft_edits_by_code_point(self):
+        """Test a draft with emoji stays in sync when edits count code points."""
+        store = TokenDocumentStore(TokenCounter(cache_size=0))
+        text = 'hi \U0001F30D there'
+        store.set('doc', text)
+        
+        for start, end, insert in [(10, 10, '!'), (3, 4, '\U0001F30E'), (0, 0, '\U0001F600 ')]:
+            text = text[:start] + insert + text[end:]
+            total = store.apply('doc', [{'start': start, 'end': end, 'text': insert}], len(text))
+        
+        assert total == TokenDocumentStore(TokenCounter(cache_size=0)).set('check', text)
+        with pytest.raises(ValueError):
+            store.apply('doc', [{'start': len(text) + 1, 'end': len(text) + 1, 'text': 'x'}])
+    
+    def test_counting_does_not_hold_the_store_lock(self):
+        """Test other documents stay usable while an edit is being counted."""
+        counter = TokenCounter(cache_size=0)
+        store = TokenDocumentStore(counter)
+        store.set('slow', 'hello')
+        store.set('other', 'world')
+        counting, release = threading.Event(), threading.Event()
+        count = counter.count
+        
+        def slow_count(text):
+            if text.startswith('!'):
+                counting.set()
+                release.wait(5)
+            return count(text)
+        
+        counter.count = slow_count
+        worker = threading.Thread(target=store.apply, args=('slow', [{'start': 0, 'end': 0, 'text': '!'}]))
+        worker.start()
+        assert counting.wait(5)
+        other = threading.Thread(target=store.apply, args=('other', [{'start': 5, 'end': 5, 'text': 's'}], 6))
+        other.start()
+        other.join(1)
+        blocked = other.is_alive()
+        release.set()
+        worker.join(5)
+        other.join(5)
+        
+        assert not blocked
+        
+        assert store.get_stats()['chars'] == 12
+    
+    def test_concurrent_change_needs_resync(self):
+        """Test an edit counted against a replaced document is rejected."""
+        counter = TokenCounter(cache_size=0)
+        store = TokenDocumentStore(counter)
+        store.set('doc', 'hello')
+        count = counter.count
+        
+        def replace_then_count(text):
+            counter.count = count
+            replace = threading.Thread(target=store.set, args=('doc', 'something else'))
+            replace.start()
+            replace.join(1)
+            return count(text)
+        
+        counter.count = replace_then_count
+        with pytest.raises(ValueError):
+            store.apply('doc', [{'start': 0, 'end': 0, 'text': 'a'}])
+        assert store.get_stats()['chars'] == len('something else')
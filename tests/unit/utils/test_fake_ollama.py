@@ -0,0 +1,81 @@
+"""Unit tests for the fake Ollama server."""
+import pytest
+
+from src.services.ollama_service import OllamaService
+from src.utils.fake_ollama import FakeOllamaServer
+
+
+@pytest.fixture
+def fake_ollama():
+    """Run a fast fake server for the duration of a test."""
+    with FakeOllamaServer(ttft=0.0, tokens_per_second=0, response_tokens=5, embedding_dim=8) as server:
+        yield server
+
+
+class TestFakeOllamaServer:
+    """Test cases for FakeOllamaServer."""
+    
+    def test_health_lists_models(self, fake_ollama):
+        """Test /api/tags drives OllamaService.check_health."""
+        service = OllamaService(fake_ollama.url, 'phi3:mini')
+        
+        result = service.check_health()
+        
+        assert result['status'] == 'connected'
+        assert result['model_available'] is True
+    
+    def test_chat_stream(self, fake_ollama):
+        """Test a streamed chat yields tokens and a final stats chunk."""
+        service = OllamaService(fake_ollama.url, 'phi3:mini')
+        
+        chunks = list(service.generate_stream('Hello', system_prompt='Be brief'))
+        
+        assert len(chunks) == 6
+        assert ''.join(c['response'] for c in chunks[:-1]).strip()
+        assert chunks[-1]['done'] is True
+        assert chunks[-1]['eval_count'] == 5
+    
+    def test_generate_is_deterministic(self, fake_ollama):
+        """Test non-streaming generate returns the same text for the same prompt."""
+        service = OllamaService(fake_ollama.url, 'phi3:mini')
+        
+        first = service.generate('Same prompt', options={'num_predict': 3}, use_cache=False)
+        second = service.generate('Same prompt', options={'num_predict': 3}, use_cache=False)
+        
+        assert first['response'] == second['response']
+        assert len(first['response'].split()) == 3
+    
+    def test_embeddings(self, fake_ollama):
+        """Test OllamaEmbeddingFunction gets vectors of the configured dimension."""
+        from src.services.ollama_embeddings import OllamaEmbeddingFunction
+        embed = OllamaEmbeddingFunction(fake_ollama.url)
+        
+        vectors = embed(['alpha', 'beta', 'alpha'])
+        
+        assert len(vectors[0]) == 8
+        assert vectors[0] == vectors[2]
+        assert vectors[0] != vectors[1]
+        assert embed.embed('alpha') == vectors[0]
+    
+    def test_embed_batch_and_warm_up(self, fake_ollama):
+        """Test /api/embed batches and that warm-up loads show in /api/ps."""
+        service = OllamaService(fake_ollama.url, 'phi3:mini')
+        
+        response = service.transport.post(f"{fake_ollama.url}/api/embed",
+                                          json={'model': 'nomic-embed-text', 'input': ['a', 'b']})
+        service.transport.post(f"{fake_ollama.url}/api/generate",
+                               json={'model': 'phi3:mini', 'prompt': '', 'stream': False})
+        loaded = service.transport.get(f"{fake_ollama.url}/api/ps").json()['models']
+        
+        assert [len(v) for v in response.json()['embeddings']] == [8, 8]
+        assert {m['name'] for m in loaded} == {'nomic-embed-text', 'phi3:mini'}
+    
+    def test_error_injection(self):
+        """Test injected failures surface as error results."""
+        with FakeOllamaServer(error_rate=1.0, ttft=0.0) as server:
+            service = OllamaService(server.url, 'phi3:mini')
+            
+            result = service.generate('Hi', use_cache=False)
+            
+            assert 'error' in result
+            assert server.get_stats()['/api/generate'] == 1
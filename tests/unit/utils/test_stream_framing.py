@@ -0,0 +1,129 @@
+"""Unit tests for stream framing utilities."""
+import json
+import time
+
+from src.utils.stream_framing import TokenFramer, encode_frame, loads, relay_tokens, MAX_COALESCE_MS
+
+
+class TestStreamFraming:
+    """Test cases for TokenFramer and the JSON codec."""
+    
+    def test_encode_frame_is_ndjson(self):
+        """Test frames are single JSON lines."""
+        frame = encode_frame({'token': 'héllo\n', 'done': False})
+        
+        assert frame.endswith(b'\n')
+        assert frame.count(b'\n') == 1
+        assert json.loads(frame) == {'token': 'héllo\n', 'done': False}
+    
+    def test_loads_accepts_bytes_and_str(self):
+        """Test the codec decodes both bytes and text."""
+        assert loads(b'{"a": 1}') == {'a': 1}
+        assert loads('{"a": 1}') == {'a': 1}
+    
+    def test_no_coalescing_emits_every_token(self):
+        """Test the default framer emits one frame per token."""
+        framer = TokenFramer('token')
+        frames = [framer.push(t) for t in ['Hel', 'lo']]
+        
+        assert [json.loads(f)['token'] for f in frames] == ['Hel', 'lo']
+        assert framer.flush() is None
+        assert framer.text == 'Hello'
+    
+    def test_count_coalescing(self):
+        """Test tokens are batched by count and the remainder flushed."""
+        framer = TokenFramer('content', max_tokens=3)
+        frames = [f for f in (framer.push(t) for t in 'abcdefg') if f]
+        frames.append(framer.flush())
+        
+        assert [json.loads(f)['content'] for f in frames] == ['abc', 'def', 'g']
+        assert framer.frames == 3
+    
+    def test_time_window_coalescing(self):
+        """Test a frame is emitted once the time window has elapsed."""
+        framer = TokenFramer('token', window_ms=20, max_tokens=100)
+        
+        assert framer.push('a') is None
+        time.sleep(0.03)
+        frame = framer.push('b')
+        
+        assert json.loads(frame)['token'] == 'ab'
+    
+    def test_from_request_clamps_values(self):
+        """Test client-negotiated settings are bounded and validated."""
+        framer = TokenFramer.from_request({'coalesce_ms': 10 ** 6, 'coalesce_tokens': -5})
+        assert framer.window == MAX_COALESCE_MS / 1000.0
+        assert framer.max_tokens == 1
+        
+        fallback = TokenFramer.from_request({'coalesce_ms': 'fast'}, default_tokens=4)
+        assert fallback.max_tokens == 4
+
+
+class _Generation:
+    def __init__(self, cancel_after=None):
+        self.cancel_after = cancel_after
+        self.cancelled = False
+        self.outcome = 'completed'
+        self.tokens_received = 0
+        self.tokens_delivered = 0
+
+    def attach(self, stream):
+        for chunk in stream:
+            if self.cancel_after is not None and self.tokens_received >= self.cancel_after:
+                self.cancelled = True
+            yield chunk
+
+
+def _relay(generation, chunks, **kwargs):
+    frames = []
+    relay = relay_tokens(generation, TokenFramer('token', max_tokens=kwargs.pop('max_tokens', 1)),
+                         iter(chunks), **kwargs)
+    while True:
+        try:
+            frames.append(json.loads(next(relay)))
+        except StopIteration as stop:
+            return frames, stop.value
+
+
+class TestRelayTokens:
+    """Test cases for relaying an upstream generation through a framer."""
+    
+    def test_returns_final_chunk(self):
+        """Test tokens are framed and the done chunk is handed back."""
+        generation = _Generation()
+        frames, final = _relay(generation, [{'response': 'a'}, {'response': 'b'},
+                                            {'response': '', 'done': True, 'eval_count': 2}])
+        
+        assert [f['token'] for f in frames] == ['a', 'b']
+        assert final['eval_count'] == 2
+        assert generation.tokens_received == generation.tokens_delivered == 2
+    
+    def test_cancel_flushes_and_closes(self):
+        """Test a cancelled generation flushes delivered tokens then sends the cancel frame."""
+        generation = _Generation(cancel_after=2)
+        frames, final = _relay(generation, [{'response': t} for t in 'abcd'], max_tokens=4,
+                               cancelled_frame={'content': '', 'done': True, 'cancelled': True})
+        
+        assert final is None
+        assert generation.outcome == 'cancelled'
+        assert frames == [{'token': 'ab', 'done': False},
+                          {'content': '', 'done': True, 'cancelled': True}]
+    
+    def test_error_chunk_ends_stream(self):
+        """Test an upstream error becomes the last frame."""
+        generation = _Generation()
+        frames, final = _relay(generation, [{'response': 'a'}, {'error': 'boom', 'done': True}])
+        
+        assert final is None
+        assert generation.outcome == 'error'
+        assert frames[-1] == {'error': 'boom', 'done': True}
+    
+    def test_stream_ending_early_is_an_error(self):
+        """Test a stream that stops without a done chunk ends with an error frame."""
+        generation = _Generation()
+        frames, final = _relay(generation, [{'response': 'a'}, {'response': 'b'}], max_tokens=4)
+        
+        assert final is None
+        assert generation.outcome == 'error'
+        assert frames == [{'token': 'ab', 'done': False},
+                          {'error': 'stream ended unexpectedly', 'done': True}]
@@ -0,0 +1,72 @@
+"""Unit tests for TokenCalibrator."""
+from unittest.mock import Mock
+
+from src.utils.token_calibrator import TokenCalibrator
+from src.utils.token_counter import TokenCounter
+
+
+class TestTokenCalibrator:
+    """Test cases for TokenCalibrator."""
+    
+    def test_ratio_needs_min_samples(self):
+        """Test the learned ratio is only used once enough calls are seen."""
+        calibrator = TokenCalibrator(min_samples=3)
+        calibrator.observe('gemma', 300, 100)
+        calibrator.observe('gemma', 300, 100)
+        assert calibrator.ratio('gemma') is None
+        
+        calibrator.observe('gemma', 300, 100)
+        assert calibrator.ratio('gemma') == 3.0
+        assert calibrator.ratio('phi3') is None
+    
+    def test_learns_towards_observed_ratio(self):
+        """Test the ratio moves towards the model's real chars-per-token."""
+        calibrator = TokenCalibrator(min_samples=1, alpha=0.2)
+        calibrator.observe('gemma', 400, 100)
+        for _ in range(100):
+            calibrator.observe('gemma', 300, 100)
+        
+        assert abs(calibrator.ratio('gemma') - 3.0) < 0.05
+        stats = calibrator.get_stats()['gemma']
+        assert stats['mean_abs_error_pct'] < stats['default_mean_abs_error_pct']
+        assert stats['samples'] == 101
+    
+    def test_ignores_empty_observations(self):
+        """Test calls without an eval count are skipped."""
+        calibrator = TokenCalibrator()
+        calibrator.observe('gemma', 100, None)
+        calibrator.observe('gemma', 0, 10)
+        
+        assert calibrator.get_stats() == {}
+    
+    def test_persists_between_instances(self, tmp_path):
+        """Test learned ratios are saved and loaded back."""
+        path = str(tmp_path / 'calibration.json')
+        calibrator = TokenCalibrator(path, min_samples=1)
+        calibrator.observe('gemma', 350, 100)
+        calibrator.save()
+        
+        assert TokenCalibrator(path, min_samples=1).ratio('gemma') == 3.5
+    
+    def test_token_counter_uses_calibrated_ratio(self):
+        """Test TokenCounter switches from the heuristic once calibrated."""
+        calibrator = TokenCalibrator(min_samples=1)
+        counter = TokenCounter(model='gemma', calibrator=calibrator)
+        heuristic = counter.count('x' * 300)
+        calibrator.observe('gemma', 300, 100)
+        
+        assert heuristic == 75
+        assert counter.count('x' * 300) == 100
+        assert counter.get_stats()['mode'] == 'calibrated'
+    
+    def test_ollama_service_feeds_calibrator(self):
+        """Test completed generations report their eval counts."""
+        from src.services.ollama_service import OllamaService
+        
+        calibrator = Mock()
+        service = OllamaService('http://localhost:11434', 'gemma', calibrator=calibrator)
+        service.transport = Mock()
+        service.transport.post.return_value.json.return_value = {'response': 'x' * 90, 'eval_count': 30}
+        service.generate('Hello', use_cache=False)
+        
+        calibrator.observe.assert_called_once_with('gemma', 90, 30)
@@ -1,4 +1,7 @@
 """Unit tests for TokenCounter utility."""
+import random
+from unittest.mock import Mock
+
 import pytest
 from src.utils.token_counter import TokenCounter
 
@@ -82,4 +85,69 @@ class TestTokenCounter:
         
         # Both should work the same way for our estimation
         text = "Test message"
-        assert counter1.count(text) == counter2.count(text)
\ No newline at end of file
+        assert counter1.count(text) == counter2.count(text)
+    
+    def test_estimate_matches_character_scan(self):
+        """Test the translate-based punctuation count gives the old results."""
+        def reference(text):
+            tokens = len(text) // 4
+            whitespace = text.count(' ') + text.count('\n') + text.count('\t')
+            punctuation = sum(1 for char in text if char in '.,!?;:()[]{}"\'-')
+            return max(1, tokens + (whitespace + punctuation) // 4)
+        
+        rng = random.Random(0)
+        alphabet = 'abc XYZ\n\t.,!?;:()[]{}"\'-世🌍'
+        for _ in range(200):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 500)))
+            assert self.counter.count(text) == reference(text)
+    
+    def test_long_texts_are_cached_by_content(self):
+        """Test recounting an unchanged long text hits the cache."""
+        text = "Paragraph of a pasted document. " * 100
+        first = self.counter.count(text)
+        second = self.counter.count(text)
+        
+        stats = self.counter.get_stats()
+        assert first == second
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+    
+    def test_cache_is_bounded(self):
+        """Test the count cache evicts least recently used entries."""
+        counter = TokenCounter(cache_size=2)
+        for i in range(5):
+            counter.count(f"{i} " + "x" * 300)
+        
+        assert counter.get_stats()['cached'] == 2
+    
+    def test_missing_tokenizer_falls_back_to_estimate(self, tmp_path):
+        """Test an unusable tokenizer path keeps the heuristic."""
+        counter = TokenCounter(tokenizer_path=str(tmp_path / 'missing.json'))
+        
+        assert not counter.exact
+        assert counter.count("Hello world") == self.counter.count("Hello world")
+    
+    def test_tokenizer_counts_are_exact(self):
+        """Test counts come from the tokenizer when one is loaded."""
+        counter = TokenCounter()
+        counter.tokenizer = Mock()
+        counter.tokenizer.encode.return_value = Mock(ids=[1, 2, 3])
+        
+        assert counter.count("Hello world") == 3
+        assert counter.get_stats()['mode'] == 'tokenizer'
+        counter.tokenizer.encode.assert_called_once_with("Hello world", add_special_tokens=False)
+    
+    def test_loads_real_tokenizer_file(self, tmp_path):
+        """Test a saved tokenizer.json is loaded and counts by its vocabulary."""
+        tokenizers = pytest.importorskip('tokenizers')
+        vocab = {'[UNK]': 0, 'hello': 1, 'world': 2}
+        tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token='[UNK]'))
+        tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+        path = tmp_path / 'tokenizer.json'
+        tokenizer.save(str(path))
+        
+        counter = TokenCounter(tokenizer_path=str(path))
+        
+        assert counter.exact
+        assert counter.count("hello world hello") == 3
+        assert counter.get_stats()['mode'] == 'tokenizer'